@@ -0,0 +1,48 @@
+import threading
+
+"""
+* AdmissionControl membatasi jumlah koneksi yang sedang dilayani atau
+menunggu di antrean executor: kapasitas = jumlah worker + panjang antrean.
+Koneksi yang datang saat kapasitas penuh langsung ditolak (BUSY) alih-alih
+menumpuk di antrean executor yang tidak terbatas, sehingga latensi koneksi
+yang diterima tetap terkendali
+
+* pada mode asyncio yang dihitung adalah pekerjaan executor yang sedang
+berjalan atau mengantre, bukan koneksi, karena koneksi yang menganggur di
+event loop tidak memakai worker
+
+* counter admitted/shed dipakai untuk laporan stress test
+"""
+
+
+class Rejected(Exception):
+    # dilempar saat pekerjaan baru tidak mendapat tempat di kapasitas
+    pass
+
+
+class AdmissionControl:
+    def __init__(self, max_workers, max_queue):
+        self.capacity = max_workers + max_queue
+        self.lock = threading.Lock()
+        self.in_system = 0
+        self.admitted = 0
+        self.shed = 0
+
+    def try_admit(self):
+        with self.lock:
+            if self.in_system >= self.capacity:
+                self.shed += 1
+                return False
+            self.in_system += 1
+            self.admitted += 1
+            return True
+
+    def release(self, *args):
+        # bisa dipasang langsung sebagai done callback sebuah future
+        with self.lock:
+            self.in_system -= 1
+
+    def stats(self):
+        with self.lock:
+            return dict(in_system=self.in_system, capacity=self.capacity,
+                        admitted=self.admitted, shed=self.shed)
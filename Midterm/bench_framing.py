@@ -0,0 +1,85 @@
+import argparse
+import socket
+import threading
+import time
+
+from framing import FrameReader, TERMINATOR
+
+"""
+micro-benchmark biaya menerima satu pesan berukuran 1 MB - 100 MB
+yang diakhiri "\r\n\r\n" lewat socketpair lokal.
+
+- framereader : FrameReader.read_frame (bytearray + scan byte baru saja)
+- legacy      : pola lama `data_received += data.decode()` lalu
+                `"\r\n\r\n" in data_received` per recv 4 KB (kuadratik,
+                hanya dijalankan sampai --legacy_max_mb)
+
+kolom ms/MB yang konstan menunjukkan biaya yang tumbuh linear
+"""
+
+SIZES_MB = [1, 10, 50, 100]
+SEND_CHUNK = 64 * 1024
+
+
+def sender(sock, payload):
+    view = memoryview(payload)
+    for i in range(0, len(view), SEND_CHUNK):
+        sock.sendall(view[i:i + SEND_CHUNK])
+    sock.sendall(TERMINATOR)
+
+
+def receive_framereader(sock):
+    reader = FrameReader(sock)
+    frame = reader.read_frame()
+    return len(frame.decode())
+
+
+def receive_legacy(sock):
+    data_received = ""
+    while True:
+        data = sock.recv(4096)
+        if not data:
+            break
+        data_received += data.decode()
+        if "\r\n\r\n" in data_received:
+            break
+    return len(data_received.split("\r\n\r\n")[0])
+
+
+def measure(receive_func, size_mb):
+    # isi berupa karakter base64 agar menyerupai payload GET/UPLOAD
+    payload = b"QUJD" * (size_mb * 1024 * 1024 // 4)
+    a, b = socket.socketpair()
+    t = threading.Thread(target=sender, args=(a, payload))
+    start = time.perf_counter()
+    t.start()
+    received = receive_func(b)
+    duration = time.perf_counter() - start
+    t.join()
+    a.close()
+    b.close()
+    assert received == len(payload)
+    return duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark biaya receive FrameReader vs pola lama.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES_MB,
+                        help="Ukuran pesan dalam MB. Default: 1 10 50 100")
+    parser.add_argument('--legacy_max_mb', type=int, default=10,
+                        help="Ukuran terbesar untuk pola lama (kuadratik). Default: 10")
+    args = parser.parse_args()
+
+    print(f"{'metode':<12} {'ukuran (MB)':>12} {'waktu (s)':>10} {'ms/MB':>8}")
+    for size_mb in args.sizes:
+        duration = measure(receive_framereader, size_mb)
+        print(f"{'framereader':<12} {size_mb:>12} {duration:>10.4f} {duration * 1000 / size_mb:>8.2f}")
+    for size_mb in args.sizes:
+        if size_mb > args.legacy_max_mb:
+            continue
+        duration = measure(receive_legacy, size_mb)
+        print(f"{'legacy':<12} {size_mb:>12} {duration:>10.4f} {duration * 1000 / size_mb:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
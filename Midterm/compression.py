@@ -0,0 +1,122 @@
+import os
+import struct
+import zlib
+
+import tracing
+
+"""
+* kompresi payload per request untuk GETZ / UPLOADZ. Isi file dikirim
+sebagai rangkaian chunk berawalan panjang:
+  panjang (4 byte, big-endian) | data
+  diakhiri chunk dengan panjang 0
+sehingga pengirim bisa mengompresi sambil membaca file tanpa harus tahu
+ukuran hasil kompresinya lebih dulu
+
+* gabungan data semua chunk adalah satu stream zlib (compression 'zlib')
+atau isi file apa adanya (compression 'none'). File yang sudah terkompresi
+(.jpg, .pdf, ...) otomatis dikirim dengan 'none' karena zlib hanya
+membuang CPU tanpa mengecilkan ukurannya
+"""
+
+CHUNK_HEADER = struct.Struct('!I')
+END_OF_CHUNKS = CHUNK_HEADER.pack(0)
+
+COMPRESSION_ZLIB = 'zlib'
+COMPRESSION_NONE = 'none'
+COMPRESSIONS = (COMPRESSION_ZLIB, COMPRESSION_NONE)
+
+DEFAULT_LEVEL = 6
+# batas hasil decompress per potongan, agar satu chunk kecil yang sangat
+# mudah dikompresi tidak mengembang tanpa batas di memori penerima
+MAX_DECOMPRESS_CHUNK = 64 * 1024
+
+# ekstensi yang isinya sudah terkompresi
+COMPRESSED_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.pdf',
+                         '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar',
+                         '.mp3', '.mp4', '.mkv', '.avi', '.mov')
+
+
+def choose_compression(filename):
+    if os.path.splitext(filename)[1].lower() in COMPRESSED_EXTENSIONS:
+        return COMPRESSION_NONE
+    return COMPRESSION_ZLIB
+
+
+def parse_level(value):
+    # level zlib dari parameter request, dibatasi 1-9
+    if value in (None, ''):
+        return DEFAULT_LEVEL
+    return min(9, max(1, int(value)))
+
+
+def encode_chunks(chunks, compression=COMPRESSION_ZLIB, level=DEFAULT_LEVEL):
+    """
+    mengubah iterator potongan isi file menjadi iterator chunk berawalan
+    panjang (termasuk penanda akhir), dikompresi sambil jalan
+    """
+    compressor = zlib.compressobj(level) if compression == COMPRESSION_ZLIB else None
+    trace = tracing.current()
+    for chunk in chunks:
+        if compressor is not None:
+            with trace.phase('encode'):
+                chunk = compressor.compress(chunk)
+        if chunk:
+            yield CHUNK_HEADER.pack(len(chunk)) + chunk
+    if compressor is not None:
+        tail = compressor.flush()
+        if tail:
+            yield CHUNK_HEADER.pack(len(tail)) + tail
+    yield END_OF_CHUNKS
+
+
+def iter_chunks(reader):
+    # membaca chunk berawalan panjang dari FrameReader sampai penanda akhir
+    while True:
+        (size,) = CHUNK_HEADER.unpack(reader.read_exact(CHUNK_HEADER.size))
+        if size == 0:
+            return
+        yield from reader.iter_exact(size)
+
+
+class Decompressor:
+    """
+    kebalikan dari encode_chunks untuk sisi penerima: data chunk yang
+    datang di-decompress bertahap, finish() memastikan stream zlib lengkap
+    """
+    def __init__(self, compression=COMPRESSION_ZLIB):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Kompresi tidak dikenal: {compression}")
+        self.decompressor = zlib.decompressobj() if compression == COMPRESSION_ZLIB else None
+
+    def decompress(self, data):
+        if self.decompressor is None:
+            return data
+        return self.decompressor.decompress(data)
+
+    def iter_decompress(self, data, max_length=MAX_DECOMPRESS_CHUNK):
+        """
+        seperti decompress, tetapi hasilnya dikembalikan per potongan paling
+        besar max_length byte. Input yang belum diproses (unconsumed_tail)
+        dilanjutkan di iterasi berikutnya, jadi memori tetap terbatas
+        berapapun rasio kompresi data dari client
+        """
+        if self.decompressor is None:
+            if data:
+                yield data
+            return
+        while True:
+            out = self.decompressor.decompress(data, max_length)
+            data = self.decompressor.unconsumed_tail
+            if out:
+                yield out
+            # output yang tepat max_length bisa berarti masih ada sisa di zlib
+            if not data and len(out) < max_length:
+                return
+
+    def finish(self):
+        if self.decompressor is None:
+            return b''
+        tail = self.decompressor.flush()
+        if not self.decompressor.eof:
+            raise ValueError('Stream zlib tidak lengkap')
+        return tail
@@ -0,0 +1,249 @@
+import os
+import time
+import queue
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Executor, Future
+
+"""
+* ElasticPool adalah executor (thread atau proses) yang jumlah worker-nya
+menyesuaikan beban di antara min_workers dan max_workers, sehingga tidak
+perlu memilih satu ukuran pool yang hanya cocok untuk sebagian workload
+
+* pool tumbuh saat submit dan setiap SCALE_INTERVAL bila tugas yang antre
+lebih banyak dari worker yang menganggur, atau tugas tertua sudah menunggu
+lebih dari GROW_WAIT. Saat antrean kosong, pool menyusut setiap idle_timeout
+(cooldown): worker di atas puncak pemakaian selama jendela tersebut
+dihentikan dengan sentinel None di antrean tugas, tanpa mengganggu tugas
+yang sedang berjalan
+
+* worker proses dibuat dari forkserver agar tidak mewarisi socket client
+milik proses utama; socket diteruskan lewat multiprocessing.Queue seperti
+pada ProcessPoolExecutor
+
+* setiap perubahan ukuran dicatat ("Ukuran pool <nama>: N worker") agar
+orchestrator stress test bisa mengaitkannya dengan throughput
+"""
+
+SCALE_INTERVAL = 0.5
+GROW_WAIT = 0.05
+DEFAULT_IDLE_TIMEOUT = 10
+
+
+def run_task(fn, args):
+    try:
+        return fn(*args), None
+    except BaseException as e:
+        return None, e
+
+
+def process_worker(tasks, events, initializer, initargs):
+    if initializer is not None:
+        initializer(*initargs)
+    pid = os.getpid()
+    while True:
+        item = tasks.get()
+        if item is None:
+            return
+        task_id, fn, args = item
+        events.put(('start', task_id, pid, None))
+        result, error = run_task(fn, args)
+        del item, args
+        try:
+            events.put(('done', task_id, result, error))
+        except Exception as e:
+            events.put(('done', task_id, None, RuntimeError(f"Hasil tugas tidak dapat dikirim: {e}")))
+
+
+class ElasticPool(Executor):
+    def __init__(self, kind='thread', min_workers=1, max_workers=5, idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                 name='pool', log=logging.warning, initializer=None, initargs=()):
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.min_workers = max(0, min(min_workers, self.max_workers))
+        self.idle_timeout = idle_timeout
+        self.name = name
+        self.log = log
+        self.initializer = initializer
+        self.initargs = initargs
+
+        self.lock = threading.Lock()
+        self.next_id = 0
+        self.tasks_pending = {}   # task_id -> (future, tugas), dipegang sampai selesai
+        self.queued = {}          # task_id -> waktu submit, urut sesuai antrean
+        self.running = 0
+        self.size = 0
+        self.peak_running = 0
+        self.window_start = time.monotonic()
+        self.stopping = False
+        self.workers = []
+        self.running_by_pid = {}
+
+        if kind == 'process':
+            self.ctx = multiprocessing.get_context('forkserver')
+            self.tasks = self.ctx.Queue()
+            self.events = self.ctx.Queue()
+            threading.Thread(target=self.collect_events, daemon=True).start()
+        else:
+            self.tasks = queue.SimpleQueue()
+
+        self.grow(self.min_workers)
+        self.scaler = threading.Thread(target=self.scale_loop, daemon=True)
+        self.scaler.start()
+
+    def submit(self, fn, *args, **kwargs):
+        if kwargs:
+            raise TypeError("ElasticPool.submit tidak menerima keyword argument")
+        future = Future()
+        with self.lock:
+            if self.stopping:
+                raise RuntimeError("pool sudah dimatikan")
+            task_id = self.next_id
+            self.next_id += 1
+            self.tasks_pending[task_id] = (future, args)
+            self.queued[task_id] = time.monotonic()
+            tambah = self.workers_needed()
+        self.tasks.put((task_id, fn, args))
+        if tambah:
+            self.grow(tambah)
+        return future
+
+    def workers_needed(self):
+        # dipanggil dengan lock: jumlah worker yang perlu ditambah saat ini
+        if self.size >= self.max_workers or not self.queued:
+            return 0
+        kurang = len(self.queued) - (self.size - self.running)
+        if kurang <= 0:
+            oldest = next(iter(self.queued.values()))
+            kurang = 1 if time.monotonic() - oldest > GROW_WAIT else 0
+        return min(kurang, self.max_workers - self.size)
+
+    def grow(self, count):
+        with self.lock:
+            count = min(count, self.max_workers - self.size)
+            if count <= 0 or self.stopping:
+                return
+            self.size += count
+            self.report_size()
+        for _ in range(count):
+            if self.kind == 'process':
+                worker = self.ctx.Process(target=process_worker, daemon=True,
+                                          args=(self.tasks, self.events, self.initializer, self.initargs))
+            else:
+                worker = threading.Thread(target=self.thread_worker, daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def shrink(self):
+        # dipanggil dengan lock setiap akhir jendela cooldown saat antrean kosong
+        target = max(self.min_workers, self.peak_running)
+        berhenti = self.size - target
+        if berhenti > 0:
+            self.size -= berhenti
+            for _ in range(berhenti):
+                self.tasks.put(None)
+            self.report_size()
+        self.peak_running = self.running
+        self.window_start = time.monotonic()
+
+    def report_size(self):
+        self.log(f"Ukuran pool {self.name}: {self.size} worker (berjalan {self.running}, antrean {len(self.queued)})")
+
+    def scale_loop(self):
+        while True:
+            time.sleep(SCALE_INTERVAL)
+            with self.lock:
+                if self.stopping:
+                    return
+                tambah = self.workers_needed()
+                if not self.queued and time.monotonic() - self.window_start >= self.idle_timeout:
+                    self.shrink()
+            if tambah:
+                self.grow(tambah)
+            self.reap_workers()
+
+    def thread_worker(self):
+        if self.initializer is not None:
+            self.initializer(*self.initargs)
+        while True:
+            item = self.tasks.get()
+            if item is None:
+                return
+            task_id, fn, args = item
+            self.task_started(task_id)
+            result, error = run_task(fn, args)
+            del item, args
+            self.task_done(task_id, result, error)
+
+    def collect_events(self):
+        # menerima laporan dari worker proses
+        while True:
+            try:
+                event, task_id, value, error = self.events.get()
+            except (EOFError, OSError):
+                return
+            if event == 'start':
+                with self.lock:
+                    self.running_by_pid[value] = task_id
+                self.task_started(task_id)
+            elif event == 'done':
+                with self.lock:
+                    for pid, running_id in list(self.running_by_pid.items()):
+                        if running_id == task_id:
+                            del self.running_by_pid[pid]
+                self.task_done(task_id, value, error)
+            else:
+                return
+
+    def reap_workers(self):
+        # membuang worker yang sudah berhenti; worker proses yang mati tanpa
+        # sentinel (misalnya di-kill) diganti dan tugasnya digagalkan
+        for worker in [w for w in self.workers if not w.is_alive()]:
+            worker.join()
+            self.workers.remove(worker)
+            if self.kind != 'process' or worker.exitcode == 0:
+                continue
+            with self.lock:
+                task_id = self.running_by_pid.pop(worker.pid, None)
+                self.size -= 1
+                self.report_size()
+            if task_id is not None:
+                self.task_done(task_id, None, RuntimeError(f"Worker {worker.pid} berhenti dengan kode {worker.exitcode}"))
+            self.grow(max(0, self.min_workers - self.size))
+
+    def task_started(self, task_id):
+        with self.lock:
+            self.queued.pop(task_id, None)
+            self.running += 1
+            self.peak_running = max(self.peak_running, self.running)
+            future = self.tasks_pending[task_id][0]
+        future.set_running_or_notify_cancel()
+
+    def task_done(self, task_id, result, error):
+        with self.lock:
+            entry = self.tasks_pending.pop(task_id, None)
+            if entry is None:
+                return
+            self.running -= 1
+        future = entry[0]
+        if future.cancelled():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        with self.lock:
+            if self.stopping:
+                return
+            self.stopping = True
+            workers = self.size
+        for _ in range(workers):
+            self.tasks.put(None)
+        if wait:
+            for worker in list(self.workers):
+                worker.join()
+        if self.kind == 'process':
+            self.events.put(('stop', None, None, None))
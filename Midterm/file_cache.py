@@ -0,0 +1,81 @@
+import os
+import threading
+from collections import OrderedDict
+
+"""
+* FileCache adalah cache LRU yang dibatasi jumlah byte, dipakai untuk
+menyimpan isi file yang sudah di-encode (misalnya base64 untuk GET)
+sehingga request berulang ke file yang sama tidak membaca dan meng-encode
+ulang dari disk
+
+* key cache berupa (path absolut, mtime, ukuran) dari os.fstat file yang
+sedang dibuka, sehingga file yang berubah otomatis tidak memakai entry
+lama. upload/delete tetap memanggil invalidate() agar memori entry lama
+segera dilepas
+"""
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class FileCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.current_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key_for(path, stat_result):
+        return (os.path.abspath(path), stat_result.st_mtime_ns, stat_result.st_size)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, value):
+        # mengembalikan jumlah entry lama yang dibuang untuk memberi tempat
+        size = len(value)
+        if size > self.max_bytes:
+            return 0
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= len(old)
+            self.entries[key] = value
+            self.current_bytes += size
+            return self._evict()
+
+    def invalidate(self, path):
+        path = os.path.abspath(path)
+        with self.lock:
+            for key in [k for k in self.entries if k[0] == path]:
+                self.current_bytes -= len(self.entries.pop(key))
+
+    def set_max_bytes(self, max_bytes):
+        with self.lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _evict(self):
+        # dipanggil dengan lock terpegang
+        evicted = 0
+        while self.current_bytes > self.max_bytes and self.entries:
+            _, value = self.entries.popitem(last=False)
+            self.current_bytes -= len(value)
+            evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    def stats(self):
+        with self.lock:
+            return dict(hits=self.hits, misses=self.misses, evictions=self.evictions,
+                        entries=len(self.entries), bytes=self.current_bytes, max_bytes=self.max_bytes)
@@ -3,8 +3,18 @@ import json
 import base64
 import logging
 import os 
+import argparse
+
+from framing import FrameReader
+import compression
+
 server_address=('172.16.16.101',6666) 
 
+# diisi dari opsi --compress: get/upload memakai GETZ/UPLOADZ
+compress_enabled = False
+compress_level = compression.DEFAULT_LEVEL
+UPLOADZ_CHUNK_SIZE = 64 * 1024
+
 def send_command(command_str=""):
     global server_address
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -16,19 +26,11 @@ def send_command(command_str=""):
         command_to_send = (command_str + "\r\n\r\n").encode() 
         sock.sendall(command_to_send)
         
-        data_received=""
-        while True:
-            data = sock.recv(4096) 
-            if data:
-                data_received += data.decode()
-                if "\r\n\r\n" in data_received:
-                    break
-            else:
-                break
-
-        json_data = data_received.split("\r\n\r\n")[0]
+        reader = FrameReader(sock)
+        frame = reader.read_frame()
+        data_received = (frame if frame is not None else bytes(reader.buffer)).decode()
 
-        hasil = json.loads(json_data)
+        hasil = json.loads(data_received)
         logging.warning("data received from server:")
         return hasil
     except json.JSONDecodeError as e:
@@ -55,18 +57,84 @@ def remote_list():
         print(f"Gagal menampilkan daftar file: {hasil['data']}")
         return False
 
+def receive_stream(command_str, fp_out):
+    """
+    Mengirim request stream (GETSTREAM), membaca header JSON lalu
+    menulis isi file ke fp_out sepotong demi sepotong saat data tiba
+    """
+    global server_address
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.connect(server_address)
+        logging.warning(f"connecting to {server_address}")
+        logging.warning(f"sending message: {command_str}")
+        sock.sendall((command_str + "\r\n\r\n").encode())
+
+        reader = FrameReader(sock)
+        frame = reader.read_frame()
+        if frame is None:
+            return {"status": "ERROR", "data": "Koneksi ditutup sebelum header diterima."}
+
+        hasil = json.loads(frame.decode())
+        if hasil['status'] != 'OK':
+            return hasil
+
+        for chunk in reader.iter_exact(hasil['data_size']):
+            fp_out.write(chunk)
+        return hasil
+    except Exception as e:
+        logging.error(f"Error during stream receiving: {e}")
+        return {"status": "ERROR", "data": f"Client error: {e}"}
+    finally:
+        sock.close()
+
+def receive_stream_z(command_str, fp_out):
+    """
+    Mengirim GETZ, membaca header JSON lalu men-decompress chunk yang
+    diterima langsung ke fp_out
+    """
+    global server_address
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.connect(server_address)
+        logging.warning(f"connecting to {server_address}")
+        logging.warning(f"sending message: {command_str}")
+        sock.sendall((command_str + "\r\n\r\n").encode())
+
+        reader = FrameReader(sock)
+        frame = reader.read_frame()
+        if frame is None:
+            return {"status": "ERROR", "data": "Koneksi ditutup sebelum header diterima."}
+
+        hasil = json.loads(frame.decode())
+        if hasil['status'] != 'OK':
+            return hasil
+
+        decompressor = compression.Decompressor(hasil.get('compression', compression.COMPRESSION_ZLIB))
+        for chunk in compression.iter_chunks(reader):
+            fp_out.write(decompressor.decompress(chunk))
+        fp_out.write(decompressor.finish())
+        return hasil
+    except Exception as e:
+        logging.error(f"Error during compressed stream receiving: {e}")
+        return {"status": "ERROR", "data": f"Client error: {e}"}
+    finally:
+        sock.close()
+
 def remote_get(filename=""):
-    command_str=f"GET {filename}"
-    hasil = send_command(command_str)
+    namafile = os.path.basename(filename)
+    partfile = namafile + '.part'
+    with open(partfile,'wb+') as fp:
+        if compress_enabled:
+            hasil = receive_stream_z(f"GETZ {filename} {compress_level}", fp)
+        else:
+            hasil = receive_stream(f"GETSTREAM {filename}", fp)
     if (hasil['status']=='OK'):
-        namafile= hasil['data_namafile']
-        isifile = base64.b64decode(hasil['data_file'])
-        fp = open(namafile,'wb+')
-        fp.write(isifile)
-        fp.close()
+        os.replace(partfile, namafile)
         print(f"File '{namafile}' berhasil diunduh.")
         return True
     else:
+        os.remove(partfile)
         print(f"Gagal mengunduh file '{filename}': {hasil['data']}")
         return False
 
@@ -79,6 +147,9 @@ def remote_upload(filepath_local="", filename_remote=""):
         print(f"Error: File lokal '{filepath_local}' tidak ditemukan.")
         return False
 
+    if compress_enabled:
+        return remote_upload_z(filepath_local, filename_remote)
+
     try:
         with open(filepath_local, 'rb') as fp:
             file_content_bytes = fp.read()
@@ -98,6 +169,36 @@ def remote_upload(filepath_local="", filename_remote=""):
         print(f"Terjadi kesalahan saat upload: {e}")
         return False
 
+def remote_upload_z(filepath_local, filename_remote):
+    # UPLOADZ: file dibaca per potongan dan dikompresi sambil dikirim
+    global server_address
+    compression_type = compression.choose_compression(filepath_local)
+    command_str = f"UPLOADZ {filename_remote} {compression_type}"
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.connect(server_address)
+        logging.warning(f"sending message: {command_str}")
+        sock.sendall((command_str + "\r\n\r\n").encode())
+        with open(filepath_local, 'rb') as fp:
+            chunks = iter(lambda: fp.read(UPLOADZ_CHUNK_SIZE), b'')
+            for frame in compression.encode_chunks(chunks, compression_type, compress_level):
+                sock.sendall(frame)
+
+        reader = FrameReader(sock)
+        frame = reader.read_frame()
+        hasil = json.loads((frame if frame is not None else bytes(reader.buffer)).decode())
+        if (hasil['status']=='OK'):
+            print(f"Upload '{filepath_local}' ke '{filename_remote}' berhasil ({compression_type}): {hasil['data']}")
+            return True
+        else:
+            print(f"Upload '{filepath_local}' ke '{filename_remote}' gagal: {hasil['data']}")
+            return False
+    except Exception as e:
+        print(f"Terjadi kesalahan saat upload: {e}")
+        return False
+    finally:
+        sock.close()
+
 def remote_delete(filename_remote=""):
     if not filename_remote:
         print("Usage: delete <remote_filename>")
@@ -115,6 +216,15 @@ def remote_delete(filename_remote=""):
 
 
 if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="File Client CLI.")
+    parser.add_argument('--compress', action='store_true',
+                        help="Gunakan GETZ/UPLOADZ: payload dikompresi zlib (kecuali .jpg/.pdf)")
+    parser.add_argument('--compress_level', type=int, default=compression.DEFAULT_LEVEL,
+                        help=f"Level kompresi zlib 1-9. Default: {compression.DEFAULT_LEVEL}")
+    cli_args = parser.parse_args()
+    compress_enabled = cli_args.compress
+    compress_level = cli_args.compress_level
+
     server_address=('172.16.16.101',6667) 
 
     print("Selamat datang di File Client CLI.")
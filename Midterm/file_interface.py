@@ -1,16 +1,96 @@
 import os
 import json
+import logging
 import base64
+import tempfile
 from glob import glob
 
+from file_cache import FileCache, DEFAULT_MAX_BYTES
+from singleflight import SingleFlight
+from log_pipeline import sampled
+import compression
+from server_stats import stats
+import tracing
+
+# absolut agar aman dibuat ulang di worker proses yang cwd-nya sudah di dalam files/
+FILES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'files')
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# mkstemp membuat file dengan mode 0600; file hasil upload diberi mode yang
+# sama dengan open() biasa (0666 dikurangi umask). umask dibaca sekali saat
+# import karena os.umask hanya bisa dibaca dengan mengubahnya
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+UPLOAD_FILE_MODE = 0o666 & ~_UMASK
+
+
+class UploadStream:
+    """
+    menampung isi UPLOAD yang datang bertahap: setiap potongan langsung
+    di-decode (base64) dan ditulis ke file sementara di direktori files/,
+    lalu file sementara di-rename ke nama tujuan saat commit sehingga
+    client lain tidak pernah melihat file yang setengah jadi
+    """
+    def __init__(self, filename, encoded=True, compression_type=None):
+        self.filename = filename
+        self.encoded = encoded
+        # UPLOADZ: isi datang sebagai stream zlib yang di-decompress bertahap
+        self.decompressor = compression.Decompressor(compression_type) if compression_type else None
+        self.bytes_written = 0
+        self.pending = b''
+        fd, self.tmp_path = tempfile.mkstemp(prefix='.upload-', dir='.')
+        os.fchmod(fd, UPLOAD_FILE_MODE)
+        self.fp = os.fdopen(fd, 'wb')
+
+    def write(self, data):
+        trace = tracing.current()
+        with trace.phase('decode'):
+            if self.encoded:
+                # base64 hanya bisa di-decode per kelipatan 4 karakter,
+                # sisanya disimpan untuk potongan berikutnya
+                data = self.pending + bytes(data)
+                usable = len(data) - (len(data) % 4)
+                self.pending = data[usable:]
+                data = base64.b64decode(data[:usable])
+        if self.decompressor is None:
+            self._write(trace, data)
+            return
+        # UPLOADZ: hasil decompress ditulis per potongan terbatas
+        for piece in trace.timed(self.decompressor.iter_decompress(data), 'decode'):
+            self._write(trace, piece)
+
+    def _write(self, trace, data):
+        with trace.phase('disk'):
+            self.fp.write(data)
+        self.bytes_written += len(data)
+
+    def commit(self):
+        if self.pending:
+            raise ValueError('Panjang data base64 tidak valid')
+        if self.decompressor is not None:
+            tail = self.decompressor.finish()
+            self.fp.write(tail)
+            self.bytes_written += len(tail)
+        self.fp.close()
+        os.replace(self.tmp_path, self.filename)
+
+    def abort(self):
+        self.fp.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
 
 class FileInterface:
-    def __init__(self):
-        os.chdir('files/')
+    def __init__(self, cache_max_bytes=DEFAULT_MAX_BYTES):
+        os.chdir(FILES_DIR)
+        self.cache = FileCache(cache_max_bytes)
+        self.singleflight = SingleFlight()
 
     def list(self,params=[]):
         try:
-            filelist = glob('*.*')
+            with tracing.current().phase('disk'):
+                filelist = glob('*.*')
             return dict(status='OK',data=filelist)
         except Exception as e:
             return dict(status='ERROR',data=str(e))
@@ -20,12 +100,81 @@ class FileInterface:
             filename = params[0]
             if (filename == ''):
                 return None
-            fp = open(f"{filename}",'rb')
-            isifile = base64.b64encode(fp.read()).decode()
+            with open(f"{filename}",'rb') as fp:
+                key = self.cache.key_for(filename, os.fstat(fp.fileno()))
+                isifile = self.cache.get(key)
+                tracing.current().set(cache='hit' if isifile is not None else 'miss')
+                # counter per proses di FileCache.stats(), gabungan seluruh worker di STATS
+                stats.add('cache_hits' if isifile is not None else 'cache_misses')
+                if isifile is None:
+                    isifile, shared = self.singleflight.do(key, lambda: self._encode_and_cache(key, fp))
+                    if shared:
+                        tracing.current().set(cache='coalesced')
+                        stats.add('coalesced')
+                        if sampled():
+                            logging.warning(f"Request GET {filename} digabung dengan pembacaan yang sedang berjalan (coalesced)")
             return dict(status='OK',data_namafile=filename,data_file=isifile)
         except Exception as e:
             return dict(status='ERROR',data=str(e))
 
+    def _encode_and_cache(self, key, fp):
+        trace = tracing.current()
+        with trace.phase('disk'):
+            isi = fp.read()
+        with trace.phase('encode'):
+            isifile = base64.b64encode(isi).decode()
+        evicted = self.cache.put(key, isifile)
+        if evicted:
+            stats.add('cache_evictions', evicted)
+        return isifile
+
+    def getstream(self, params=[]):
+        try:
+            filename = params[0]
+            if (filename == ''):
+                return dict(status='ERROR', data='Parameter filename tidak lengkap'), None
+            fp = open(f"{filename}", 'rb')
+            filesize = os.fstat(fp.fileno()).st_size
+            header = dict(status='OK', data_namafile=filename, data_size=filesize, chunk_size=STREAM_CHUNK_SIZE)
+            return header, self._iter_file(fp, filesize)
+        except Exception as e:
+            return dict(status='ERROR', data=str(e)), None
+
+    def getz(self, params=[]):
+        """
+        seperti getstream, tetapi isi file dikirim sebagai chunk berawalan
+        panjang yang dikompresi zlib (level dari parameter kedua), kecuali
+        untuk file yang sudah terkompresi seperti .jpg/.pdf
+        """
+        try:
+            filename = params[0]
+            if (filename == ''):
+                return dict(status='ERROR', data='Parameter filename tidak lengkap'), None
+            level = compression.parse_level(params[1] if len(params) > 1 else None)
+            compression_type = compression.choose_compression(filename)
+            fp = open(f"{filename}", 'rb')
+            filesize = os.fstat(fp.fileno()).st_size
+            header = dict(status='OK', data_namafile=filename, data_size=filesize,
+                          compression=compression_type, level=level)
+            return header, compression.encode_chunks(self._iter_file(fp, filesize), compression_type, level)
+        except Exception as e:
+            return dict(status='ERROR', data=str(e)), None
+
+    def _iter_file(self, fp, filesize, chunk_size=STREAM_CHUNK_SIZE):
+        # membaca file sepotong demi sepotong sehingga memori per koneksi tetap kecil
+        trace = tracing.current()
+        try:
+            remaining = filesize
+            while remaining > 0:
+                with trace.phase('disk'):
+                    chunk = fp.read(min(chunk_size, remaining))
+                if not chunk:
+                    raise IOError(f"File {fp.name} berubah ukuran saat dikirim")
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            fp.close()
+
     def upload(self, params=[]):
         try:
             filename = params[0]
@@ -33,15 +182,37 @@ class FileInterface:
             if not filename or not encoded_content:
                 return dict(status='ERROR', data='Parameter filename atau content tidak lengkap')
 
-            decoded_content = base64.b64decode(encoded_content)
-            with open(f"{filename}", 'wb+') as fp:
+            trace = tracing.current()
+            with trace.phase('decode'):
+                decoded_content = base64.b64decode(encoded_content)
+            with trace.phase('disk'), open(f"{filename}", 'wb+') as fp:
                 fp.write(decoded_content)
+            self.cache.invalidate(filename)
             return dict(status='OK', data=f"File {filename} berhasil diupload")
         except IndexError:
             return dict(status='ERROR', data='Format UPLOAD: UPLOAD <nama_file> <base64_content>')
         except Exception as e:
             return dict(status='ERROR', data=f"Gagal upload file: {str(e)}")
 
+    # helper upload streaming diberi awalan _ karena FileProtocol memanggil
+    # method publik FileInterface langsung dari nama perintah client
+    def _begin_upload(self, filename, encoded=True, compression_type=None):
+        if not filename:
+            raise ValueError('Parameter filename tidak lengkap')
+        return UploadStream(filename, encoded=encoded, compression_type=compression_type)
+
+    def _finish_upload(self, upload):
+        try:
+            if upload.encoded and upload.bytes_written == 0 and not upload.pending:
+                upload.abort()
+                return dict(status='ERROR', data='Parameter filename atau content tidak lengkap')
+            upload.commit()
+            self.cache.invalidate(upload.filename)
+            return dict(status='OK', data=f"File {upload.filename} berhasil diupload")
+        except Exception as e:
+            upload.abort()
+            return dict(status='ERROR', data=f"Gagal upload file: {str(e)}")
+
     def delete(self, params=[]):
         try:
             filename = params[0]
@@ -49,7 +220,9 @@ class FileInterface:
                 return dict(status='ERROR', data='Parameter filename tidak lengkap')
 
             if os.path.exists(f"{filename}"):
-                os.remove(f"{filename}")
+                with tracing.current().phase('disk'):
+                    os.remove(f"{filename}")
+                self.cache.invalidate(filename)
                 return dict(status='OK', data=f"File {filename} berhasil dihapus")
             else:
                 return dict(status='ERROR', data=f"File {filename} tidak ditemukan")
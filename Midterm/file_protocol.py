@@ -1,8 +1,13 @@
 import json
+import time
 import logging
 # import shlex
 
 from file_interface import FileInterface
+import protocol_v2 as v2
+from log_pipeline import sampled, short
+from server_stats import stats
+import tracing
 
 """
 * class FileProtocol bertugas untuk memproses 
@@ -18,31 +23,129 @@ string
 
 
 class FileProtocol:
+    # request yang hasilnya berupa header JSON diikuti isi file mentah
+    STREAM_REQUESTS = ('getstream', 'getz')
+
     def __init__(self):
         self.file = FileInterface()
     def proses_string(self,string_datamasuk=''):
-        logging.warning(f"string diproses: {string_datamasuk}")
-        
-        parts = string_datamasuk.split(' ', 2) 
-        
-        try:
-            c_request = parts[0].strip().lower()
+        hasil, body = self.proses_request(string_datamasuk)
+        if body is not None:
+            body.close()
+        return hasil
+
+    def proses_request(self,string_datamasuk=''):
+        """
+        sama seperti proses_string, tetapi mengembalikan tuple (hasil, body).
+        body bernilai None untuk request biasa, atau iterator bytes
+        berisi potongan file untuk request stream (GETSTREAM) yang harus
+        dikirim setelah hasil + "\r\n\r\n"
+        """
+        start = time.perf_counter()
+        trace = tracing.current()
+        with trace.phase('parse'):
+            parts = string_datamasuk.split(' ', 2) 
             
+            c_request = parts[0].strip().lower()
             params = []
             if len(parts) > 1:
                 params.append(parts[1])
             if len(parts) > 2:
                 params.append(parts[2])
-            
-            logging.warning(f"memproses request: {c_request} dengan params: {params}")
+        trace.set(filename=params[0][:120] if params else None)
+
+        hasil, body = self.jalankan_request(c_request, params)
+        # hanya field pendek yang ditulis; isi UPLOAD (base64) tidak pernah masuk log
+        if sampled():
+            logging.warning(f"request command={short(c_request, 20)} filename={short(params[0]) if params else '-'} "
+                            f"bytes={len(string_datamasuk)} durasi={time.perf_counter() - start:.4f}s")
+        return hasil, body
+
+    def jalankan_request(self, c_request, params):
+        try:
+            if c_request.startswith('_'):
+                # method internal FileInterface bukan perintah protokol
+                raise AttributeError(c_request)
+            if c_request == 'stats':
+                # counter gabungan seluruh worker server, lihat server_stats
+                return json.dumps(dict(status='OK', data=stats.snapshot())), None
+            if c_request in self.STREAM_REQUESTS:
+                cl, body = getattr(self.file,c_request)(params)
+                with tracing.current().phase('json'):
+                    return json.dumps(cl), body
             cl = getattr(self.file,c_request)(params)
-            return json.dumps(cl)
+            with tracing.current().phase('json'):
+                return json.dumps(cl), None
         except AttributeError:
-            return json.dumps(dict(status='ERROR', data='request tidak dikenali'))
+            return json.dumps(dict(status='ERROR', data='request tidak dikenali')), None
         except IndexError:
-            return json.dumps(dict(status='ERROR', data='Parameter tidak lengkap untuk request ini'))
+            return json.dumps(dict(status='ERROR', data='Parameter tidak lengkap untuk request ini')), None
         except Exception as e:
-            return json.dumps(dict(status='ERROR',data=f'Kesalahan pemrosesan: {str(e)}'))
+            return json.dumps(dict(status='ERROR',data=f'Kesalahan pemrosesan: {str(e)}')), None
+
+    def begin_upload(self, filename):
+        """
+        dipanggil server saat header 'UPLOAD <nama_file> ' sudah diterima
+        tetapi isi base64-nya masih mengalir; isi selanjutnya ditulis ke
+        objek UploadStream yang dikembalikan
+        """
+        if sampled():
+            logging.warning(f"request command=upload filename={short(filename)} mode=stream")
+        return self.file._begin_upload(filename)
+
+    def finish_upload(self, upload):
+        return json.dumps(self.file._finish_upload(upload))
+
+    def begin_upload_z(self, filename, compression_type):
+        """
+        dipanggil server setelah frame 'UPLOADZ <nama_file> <kompresi>' diterima;
+        isi file menyusul sebagai chunk berawalan panjang. Mengembalikan tuple
+        (hasil, upload): hasil berisi respons ERROR dan upload None jika nama
+        file kosong atau jenis kompresi tidak dikenal
+        """
+        if sampled():
+            logging.warning(f"request command=uploadz filename={short(filename)} compression={short(compression_type, 20)}")
+        try:
+            return None, self.file._begin_upload(filename, encoded=False, compression_type=compression_type)
+        except ValueError as e:
+            return json.dumps(dict(status='ERROR', data=str(e))), None
+
+    def proses_v2(self, opcode, filename=''):
+        """
+        memproses request protokol v2 selain UPLOAD. Mengembalikan tuple
+        (header, body): header sudah berisi nama file, body berupa iterator
+        potongan payload mentah (None jika payload sudah disertakan di header)
+        """
+        if sampled():
+            logging.warning(f"request command=v2-{opcode} filename={short(filename) or '-'}")
+        if opcode == v2.OP_GET:
+            hasil, body = self.file.getstream([filename])
+            if hasil['status'] == 'OK':
+                return v2.pack_header(v2.STATUS_OK, filename.encode(), hasil['data_size']), body
+            return self.v2_result(hasil), None
+        if opcode == v2.OP_LIST:
+            hasil = self.file.list()
+            if hasil['status'] == 'OK':
+                payload = json.dumps(hasil['data']).encode()
+                return v2.pack_header(v2.STATUS_OK, b'', len(payload)) + payload, None
+            return self.v2_result(hasil), None
+        if opcode == v2.OP_DELETE:
+            return self.v2_result(self.file.delete([filename])), None
+        return self.v2_result(dict(status='ERROR', data='request tidak dikenali')), None
+
+    def begin_upload_v2(self, filename):
+        if sampled():
+            logging.warning(f"request command=v2-upload filename={short(filename)}")
+        return self.file._begin_upload(filename, encoded=False)
+
+    def finish_upload_v2(self, upload):
+        return self.v2_result(self.file._finish_upload(upload))
+
+    def v2_result(self, hasil):
+        # respons v2 untuk hasil berupa pesan: payload adalah teks pesan utf-8
+        status = v2.STATUS_OK if hasil['status'] == 'OK' else v2.STATUS_ERROR
+        payload = str(hasil['data']).encode()
+        return v2.pack_header(status, b'', len(payload)) + payload
 
 
 if __name__=='__main__':
@@ -1,99 +1,552 @@
 import socket
+import json
 import logging
 import time
 import sys
 import argparse
 import os 
 import threading
+import asyncio
+import multiprocessing
+import signal
 
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 from file_protocol import FileProtocol
+from framing import FrameReader, RECV_SIZE
+import protocol_v2 as v2
+import compression
+import tracing
+from file_cache import DEFAULT_MAX_BYTES
+from admission import AdmissionControl, Rejected
+from scheduler import Acceptor, Lane, LANE_SMALL, LANE_BULK
+from elastic_pool import ElasticPool, DEFAULT_IDLE_TIMEOUT
+from log_pipeline import setup_logging, set_sample_rate, sample_rate, sampled
+from server_stats import stats, text_command, is_error, V2_COMMANDS
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 SERVER_LOG_FULL_PATH = os.path.join(SCRIPT_DIR, "server_log.log")
+# direktori kerja saat server dijalankan, sebelum FileProtocol pindah ke files/;
+# path relatif dari command line (--trace) diartikan terhadap direktori ini
+LAUNCH_DIR = os.getcwd()
 
 fp = FileProtocol() 
 
-logging.basicConfig(level=logging.WARNING,
-                    format='%(asctime)s - %(levelname)s - %(message)s',
-                    handlers=[
-                        logging.FileHandler(SERVER_LOG_FULL_PATH), 
-                        logging.StreamHandler(sys.stdout)     
-                    ])
+setup_logging(SERVER_LOG_FULL_PATH)
 
-def handle_client(connection, address):
+UPLOAD_PREFIX = b"UPLOAD "
+
+# panjang antrean koneksi yang menunggu worker, di luar yang sedang dilayani
+DEFAULT_MAX_QUEUE = 64
+# worker yang dicadangkan untuk request kecil (LIST, DELETE, STATS), 0 untuk satu pool bersama
+DEFAULT_SMALL_WORKERS = 1
+# batas bawah pool elastis; --max_workers menjadi batas atasnya
+DEFAULT_MIN_WORKERS = 1
+
+BUSY_RETRY_AFTER = 1
+BUSY_RESPONSE = (json.dumps(dict(status='BUSY', data='Server sibuk, coba lagi nanti',
+                                 retry_after=BUSY_RETRY_AFTER)) + "\r\n\r\n").encode()
+
+def reject_busy(connection, address, admission):
+    # menolak koneksi saat antrean penuh tanpa membaca request-nya
+    try:
+        connection.settimeout(1)
+        connection.sendall(BUSY_RESPONSE)
+    except OSError:
+        pass
+    finally:
+        connection.close()
+    stats.add('shed')
+    logging.warning(f"Koneksi dari {address} ditolak (BUSY): kapasitas {admission.capacity} penuh, total ditolak {admission.shed}")
+
+def configure_worker(cache_max_bytes, log_sample_rate, stats_values, trace_path):
+    # initializer worker proses pool elastis, yang tidak mewarisi pengaturan dari main()
+    fp.file.cache.set_max_bytes(cache_max_bytes)
+    set_sample_rate(log_sample_rate)
+    stats.attach(stats_values)
+    if trace_path:
+        tracing.enable(trace_path)
+
+def parse_upload_header(buffer):
+    # mengembalikan (nama_file, panjang_header) bila buffer diawali 'UPLOAD <nama_file> '
+    if buffer[:len(UPLOAD_PREFIX)].upper() != UPLOAD_PREFIX:
+        return None
+    name_end = buffer.find(b" ", len(UPLOAD_PREFIX))
+    if name_end == -1:
+        return None
+    return buffer[len(UPLOAD_PREFIX):name_end].decode(), name_end + 1
+
+UPLOADZ_PREFIX = "UPLOADZ "
+
+def parse_uploadz_header(frame):
+    # mengembalikan (nama_file, kompresi) bila frame berupa 'UPLOADZ <nama_file> <kompresi>'
+    if frame[:len(UPLOADZ_PREFIX)].upper() != UPLOADZ_PREFIX.encode():
+        return None
+    parts = frame.decode().split(' ')
+    if len(parts) < 2:
+        return None
+    return parts[1], parts[2] if len(parts) > 2 else compression.COMPRESSION_ZLIB
+
+def handle_v2_request(reader, connection):
+    """
+    memproses satu request protokol v2 dari reader. Payload UPLOAD langsung
+    ditulis ke disk sepanjang panjang payload pada header, payload GET dikirim
+    mentah. Mengembalikan jumlah byte yang dikirim ke client
+    """
+    mulai = time.perf_counter()
+    diterima = reader.bytes_consumed
+    trace = tracing.current()
+    with trace.phase('recv'):
+        opcode, filename, payload_len = v2.read_message(reader)
+    command = V2_COMMANDS.get(opcode, 'other')
+    trace.set(command=command, filename=filename[:120])
+    if opcode == v2.OP_UPLOAD:
+        upload = fp.begin_upload_v2(filename)
+        try:
+            for chunk in trace.timed(reader.iter_exact(payload_len), 'recv'):
+                upload.write(chunk)
+        except Exception:
+            upload.abort()
+            raise
+        hasil, body = fp.finish_upload_v2(upload), None
+    else:
+        # request selain UPLOAD tidak membawa payload, buang jika ada
+        for _ in trace.timed(reader.iter_exact(payload_len), 'recv'):
+            pass
+        hasil, body = fp.proses_v2(opcode, filename)
+
+    with trace.phase('send'):
+        connection.sendall(hasil)
+    sent = len(hasil)
+    if body is not None:
+        for chunk in body:
+            with trace.phase('send'):
+                connection.sendall(chunk)
+            sent += len(chunk)
+    bytes_in = reader.bytes_consumed - diterima
+    stats.record(command, time.perf_counter() - mulai, bytes_in, sent, is_error(hasil))
+    trace.finish(bytes_in=bytes_in, bytes_out=sent, error=is_error(hasil))
+    return sent
+
+def handle_client(connection, address, lane=None, enqueued_at=None):
     worker_id = threading.current_thread().name if isinstance(threading.current_thread(), threading.Thread) else os.getpid()
-    logging.warning(f"Worker {worker_id} mulai menangani koneksi dari {address}")
+    if sampled():
+        logging.warning(f"Worker {worker_id} mulai menangani koneksi dari {address}")
+    if enqueued_at is not None:
+        waktu_tunggu = time.time() - enqueued_at
+        stats.add('queue_depth', -1)
+        stats.record_queue_wait(lane, waktu_tunggu)
+        if sampled():
+            logging.warning(f"Koneksi dari {address} (lane {lane}) menunggu {waktu_tunggu * 1000:.2f} ms di antrean")
+    stats.add('connections_active')
+    stats.add('connections_total')
     
-    data_received = ""
+    reader = FrameReader(connection)
+    upload = None
     start_time = time.time()
-    total_bytes_processed = 0
     response_bytes_sent = 0
+    gagal = False
+    # waktu recv sampai request berikutnya lengkap, dicatat sebagai fase recv di trace
+    recv_tertunda = 0.0
+
+    def kirim_hasil(hasil, body=None):
+        trace = tracing.current()
+        with trace.phase('encode'):
+            encoded_response = (hasil + "\r\n\r\n").encode()
+        with trace.phase('send'):
+            connection.sendall(encoded_response)
+        sent = len(encoded_response)
+        if body is not None:
+            # pembacaan disk / kompresi body dicatat sendiri oleh FileInterface
+            for chunk in body:
+                with trace.phase('send'):
+                    connection.sendall(chunk)
+                sent += len(chunk)
+        return sent
+
+    def mulai_trace(command):
+        nonlocal recv_tertunda
+        trace = tracing.start(command=command, client=str(address))
+        trace.prepend('recv', recv_tertunda)
+        recv_tertunda = 0.0
+        return trace
+
+    def catat(command, hasil, sent):
+        bytes_in = reader.bytes_consumed - diterima
+        stats.record(command, time.perf_counter() - mulai, bytes_in, sent, is_error(hasil))
+        tracing.current().finish(bytes_in=bytes_in, bytes_out=sent, error=is_error(hasil))
+        return sent
 
     try:
         while True:
-            data = connection.recv(4096)
-            if data:
-                data_received += data.decode()
-                total_bytes_processed += len(data) 
-                
-                if "\r\n\r\n" in data_received:
-                    command_str, _, remainder = data_received.partition("\r\n\r\n")
-                    data_received = remainder 
-                    
-                    hasil = fp.proses_string(command_str)
-                    hasil = hasil + "\r\n\r\n" 
-                    
-                    encoded_response = hasil.encode()
-                    connection.sendall(encoded_response)
-                    response_bytes_sent += len(encoded_response) 
-            else:
+            # sisa terminator dari upload streaming sebelumnya
+            reader.skip_leading(b"\r\n")
+            # awal request berikutnya, untuk latensi dan byte per perintah di STATS
+            mulai = time.perf_counter()
+            diterima = reader.bytes_consumed
+
+            if reader.buffer and reader.buffer[0] == v2.V2_MAGIC:
+                mulai_trace('other')
+                response_bytes_sent += handle_v2_request(reader, connection)
+                continue
+
+            frame = reader.pop_frame()
+            if frame is not None:
+                uploadz_header = parse_uploadz_header(frame)
+                if uploadz_header is not None:
+                    # isi UPLOADZ berupa chunk berawalan panjang, di-decompress
+                    # dan ditulis ke disk sambil diterima
+                    trace = mulai_trace('uploadz')
+                    trace.set(filename=uploadz_header[0][:120])
+                    hasil, upload = fp.begin_upload_z(*uploadz_header)
+                    if upload is None:
+                        # chunk yang menyusul tidak bisa diartikan, koneksi ditutup setelah ERROR
+                        response_bytes_sent += catat('uploadz', hasil, kirim_hasil(hasil))
+                        break
+                    for chunk in trace.timed(compression.iter_chunks(reader), 'recv'):
+                        upload.write(chunk)
+                    hasil = fp.finish_upload(upload)
+                    upload = None
+                    response_bytes_sent += catat('uploadz', hasil, kirim_hasil(hasil))
+                    continue
+                command = text_command(frame)
+                trace = mulai_trace(command)
+                with trace.phase('parse'):
+                    request_text = frame.decode()
+                hasil, body = fp.proses_request(request_text)
+                response_bytes_sent += catat(command, hasil, kirim_hasil(hasil, body))
+                continue
+
+            upload_header = parse_upload_header(reader.buffer)
+            if upload_header is not None:
+                # header UPLOAD sudah lengkap tetapi isinya belum, mulai tulis ke
+                # disk tanpa menunggu seluruh isi file diterima. Isi base64 tidak
+                # pernah mengandung \r, jadi \r pertama menandai akhir isi file
+                filename, header_len = upload_header
+                reader.consume(header_len)
+                trace = mulai_trace('upload')
+                trace.set(filename=filename[:120])
+                upload = fp.begin_upload(filename)
+                for chunk in trace.timed(reader.iter_until(b"\r"), 'recv'):
+                    upload.write(chunk)
+                hasil = fp.finish_upload(upload)
+                upload = None
+                response_bytes_sent += catat('upload', hasil, kirim_hasil(hasil))
+                continue
+
+            recv_mulai = time.perf_counter()
+            if not reader.fill():
                 break
+            recv_tertunda += time.perf_counter() - recv_mulai
     except Exception as e:
+        gagal = True
+        # trace request yang terputus di tengah jalan tetap ditulis
+        tracing.current().finish(error=True, message=str(e)[:200])
         logging.error(f"Error saat menangani client {address} pada worker {worker_id}: {e}")
     finally:
+        if upload is not None:
+            upload.abort()
         connection.close()
+        stats.add('connections_active', -1)
+        stats.add('connections_failed' if gagal else 'connections_done')
         end_time = time.time()
         duration = end_time - start_time
+        total_bytes_processed = reader.bytes_received
         throughput_received = (total_bytes_processed / duration) if duration > 0 else 0
         
-        logging.warning(f"Worker {worker_id} selesai menangani koneksi dari {address}. Durasi: {duration:.4f}s, Byte Received (from client): {total_bytes_processed}B, Byte Sent (to client): {response_bytes_sent}B, Throughput Received: {throughput_received:.2f} B/s")
-        for handler in logging.getLogger().handlers:
-            handler.flush()
+        if sampled():
+            logging.warning(f"Worker {worker_id} selesai menangani koneksi dari {address}. Durasi: {duration:.4f}s, Byte Received (from client): {total_bytes_processed}B, Byte Sent (to client): {response_bytes_sent}B, Throughput Received: {throughput_received:.2f} B/s")
+
+async def handle_client_async(reader, writer, executor, admission):
+    """
+    versi asyncio dari handle_client: baca/tulis socket non-blocking di event
+    loop, sedangkan pemrosesan request (disk I/O, base64, JSON) dijalankan di
+    executor thread yang ukurannya dibatasi --max_workers. admission membatasi
+    pekerjaan executor yang berjalan atau mengantre; request yang tidak
+    mendapat tempat dijawab BUSY lalu koneksinya ditutup
+    """
+    loop = asyncio.get_running_loop()
+    address = writer.get_extra_info('peername')
+    worker_id = f"asyncio-{id(asyncio.current_task()):x}"
+    if sampled():
+        logging.warning(f"Worker {worker_id} mulai menangani koneksi dari {address}")
+    stats.add('connections_active')
+    stats.add('connections_total')
+
+    frames = FrameReader(None)
+    upload = None
+    start_time = time.time()
+    response_bytes_sent = 0
+    gagal = False
+    mulai = diterima = 0
+    # trace request yang sedang diproses koneksi ini; pekerjaan di executor
+    # memakainya lewat tracing.bind karena event loop dipakai banyak koneksi
+    trace = tracing.NULL_TRACE
+    recv_tertunda = 0.0
+
+    def mulai_trace(command, filename=None):
+        nonlocal trace, recv_tertunda
+        trace = tracing.start(activate=False, command=command, client=str(address))
+        trace.prepend('recv', recv_tertunda)
+        if filename is not None:
+            trace.set(filename=filename[:120])
+        recv_tertunda = 0.0
+
+    def catat(command, hasil, sent):
+        nonlocal trace
+        bytes_in = frames.bytes_consumed - diterima
+        stats.record(command, time.perf_counter() - mulai, bytes_in, sent, is_error(hasil))
+        trace.finish(command=command, bytes_in=bytes_in, bytes_out=sent, error=is_error(hasil))
+        trace = tracing.NULL_TRACE
+        return sent
+
+    def di_executor(fn, *args):
+        if not admission.try_admit():
+            raise Rejected()
+        future = loop.run_in_executor(executor, tracing.bind(trace, fn), *args)
+        future.add_done_callback(admission.release)
+        return future
+
+    async def baca(size):
+        nonlocal recv_tertunda
+        recv_mulai = time.perf_counter()
+        data = await reader.read(size)
+        if trace is tracing.NULL_TRACE:
+            recv_tertunda += time.perf_counter() - recv_mulai
+        else:
+            trace.add('recv', time.perf_counter() - recv_mulai)
+        return data
+
+    async def kirim_hasil(hasil, body=None):
+        with trace.phase('encode'):
+            encoded_response = (hasil + "\r\n\r\n").encode()
+        return await kirim_bytes(encoded_response, body)
+
+    async def kirim_bytes(encoded_response, body=None):
+        with trace.phase('send'):
+            writer.write(encoded_response)
+            await writer.drain()
+        sent = len(encoded_response)
+        if body is not None:
+            while True:
+                chunk = await di_executor(next, body, None)
+                if chunk is None:
+                    break
+                with trace.phase('send'):
+                    writer.write(chunk)
+                    await writer.drain()
+                sent += len(chunk)
+        return sent
+
+    async def iter_exact_async(size):
+        remaining = size
+        while remaining > 0:
+            if not frames.buffer:
+                data = await baca(min(RECV_SIZE, remaining))
+                if not data:
+                    raise ConnectionError(f"Stream terputus, kurang {remaining} byte")
+                frames.feed(data)
+            chunk = bytes(frames.buffer[:remaining])
+            frames.consume(len(chunk))
+            remaining -= len(chunk)
+            yield chunk
+
+    async def read_exact_async(size):
+        return b"".join([chunk async for chunk in iter_exact_async(size)])
+
+    async def proses_v2_async():
+        mulai_trace('other')
+        opcode, name_len, payload_len = v2.unpack_header(await read_exact_async(v2.V2_HEADER.size))
+        filename = (await read_exact_async(name_len)).decode()
+        command = V2_COMMANDS.get(opcode, 'other')
+        trace.set(command=command, filename=filename[:120])
+        if opcode == v2.OP_UPLOAD:
+            upload_v2 = await di_executor(fp.begin_upload_v2, filename)
+            try:
+                async for chunk in iter_exact_async(payload_len):
+                    await di_executor(upload_v2.write, chunk)
+            except Exception:
+                await di_executor(upload_v2.abort)
+                raise
+            hasil = await di_executor(fp.finish_upload_v2, upload_v2)
+            return catat(command, hasil, await kirim_bytes(hasil))
+        async for _ in iter_exact_async(payload_len):
+            pass
+        hasil, body = await di_executor(fp.proses_v2, opcode, filename)
+        return catat(command, hasil, await kirim_bytes(hasil, body))
+
+    async def proses_uploadz_async(filename, compression_type):
+        # mengembalikan (byte terkirim, koneksi boleh dilanjutkan)
+        mulai_trace('uploadz', filename)
+        hasil, upload_z = await di_executor(fp.begin_upload_z, filename, compression_type)
+        if upload_z is None:
+            return catat('uploadz', hasil, await kirim_hasil(hasil)), False
+        try:
+            while True:
+                (size,) = compression.CHUNK_HEADER.unpack(await read_exact_async(compression.CHUNK_HEADER.size))
+                if size == 0:
+                    break
+                async for chunk in iter_exact_async(size):
+                    await di_executor(upload_z.write, chunk)
+        except Exception:
+            await di_executor(upload_z.abort)
+            raise
+        hasil = await di_executor(fp.finish_upload, upload_z)
+        return catat('uploadz', hasil, await kirim_hasil(hasil)), True
+
+    try:
+        while True:
+            if upload is None:
+                # sisa terminator dari upload streaming sebelumnya; selama upload
+                # berjalan \r justru menandai akhir isinya, jadi tidak boleh dibuang
+                frames.skip_leading(b"\r\n")
+                # upload streaming diukur dari header UPLOAD sampai respons terkirim
+                mulai = time.perf_counter()
+                diterima = frames.bytes_consumed
+
+            if upload is None and frames.buffer and frames.buffer[0] == v2.V2_MAGIC:
+                response_bytes_sent += await proses_v2_async()
+                continue
+
+            if upload is not None:
+                end = frames.buffer.find(b"\r")
+                chunk = bytes(frames.buffer if end == -1 else frames.buffer[:end])
+                frames.consume(len(chunk))
+                if chunk:
+                    await di_executor(upload.write, chunk)
+                if end != -1:
+                    hasil = await di_executor(fp.finish_upload, upload)
+                    upload = None
+                    response_bytes_sent += catat('upload', hasil, await kirim_hasil(hasil))
+                    continue
+            else:
+                frame = frames.pop_frame()
+                if frame is not None:
+                    uploadz_header = parse_uploadz_header(frame)
+                    if uploadz_header is not None:
+                        sent, lanjut = await proses_uploadz_async(*uploadz_header)
+                        response_bytes_sent += sent
+                        if not lanjut:
+                            break
+                        continue
+                    command = text_command(frame)
+                    mulai_trace(command)
+                    with trace.phase('parse'):
+                        request_text = frame.decode()
+                    hasil, body = await di_executor(fp.proses_request, request_text)
+                    response_bytes_sent += catat(command, hasil, await kirim_hasil(hasil, body))
+                    continue
+
+                upload_header = parse_upload_header(frames.buffer)
+                if upload_header is not None:
+                    filename, header_len = upload_header
+                    frames.consume(header_len)
+                    mulai_trace('upload', filename)
+                    upload = await di_executor(fp.begin_upload, filename)
+                    continue
+
+            data = await baca(RECV_SIZE)
+            if not data:
+                break
+            frames.feed(data)
+    except Rejected:
+        trace.finish(error=True, message='BUSY')
+        stats.add('shed')
+        logging.warning(f"Request dari {address} ditolak (BUSY): antrean executor penuh ({admission.capacity}), total ditolak {admission.shed}")
+        try:
+            writer.write(BUSY_RESPONSE)
+            await writer.drain()
+        except OSError:
+            pass
+    except Exception as e:
+        gagal = True
+        trace.finish(error=True, message=str(e)[:200])
+        logging.error(f"Error saat menangani client {address} pada worker {worker_id}: {e}")
+    finally:
+        if upload is not None:
+            await loop.run_in_executor(executor, upload.abort)
+        writer.close()
+        stats.add('connections_active', -1)
+        stats.add('connections_failed' if gagal else 'connections_done')
+        end_time = time.time()
+        duration = end_time - start_time
+        total_bytes_processed = frames.bytes_received
+        throughput_received = (total_bytes_processed / duration) if duration > 0 else 0
+
+        if sampled():
+            logging.warning(f"Worker {worker_id} selesai menangani koneksi dari {address}. Durasi: {duration:.4f}s, Byte Received (from client): {total_bytes_processed}B, Byte Sent (to client): {response_bytes_sent}B, Throughput Received: {throughput_received:.2f} B/s")
+
+def prefork_worker(ipinfo, worker_index):
+    """
+    satu proses pre-fork: membuka listening socket sendiri pada port yang
+    sama (SO_REUSEPORT) dan menjalankan accept loop sendiri, sehingga kernel
+    yang membagi koneksi antar proses tanpa pengiriman fd per koneksi
+    """
+    my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    my_socket.bind(ipinfo)
+    my_socket.listen(100)
+    logging.warning(f"Worker prefork {worker_index} (pid {os.getpid()}) mendengarkan koneksi pada {ipinfo}")
+    # keluar lewat SystemExit agar antrean log sempat ditulis sebelum proses berhenti
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        while True:
+            connection, client_address = my_socket.accept()
+            handle_client(connection, client_address)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        my_socket.close()
 
 class Server:
-    def __init__(self, ipaddress='0.0.0.0', port=6667, pool_type='thread', max_workers=5):
+    def __init__(self, ipaddress='0.0.0.0', port=6667, pool_type='thread', max_workers=5, max_queue=DEFAULT_MAX_QUEUE,
+                 small_workers=DEFAULT_SMALL_WORKERS, min_workers=DEFAULT_MIN_WORKERS, idle_timeout=DEFAULT_IDLE_TIMEOUT):
         self.ipinfo = (ipaddress, port)
         self.my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         
         self.pool_type = pool_type
         self.max_workers = max_workers
+        self.min_workers = min(min_workers, max_workers)
+        self.idle_timeout = idle_timeout
+        self.max_queue = max_queue
+        self.small_workers = small_workers
         self.executor = None 
+        self.small_executor = None
+        self.lanes = {}
+        self.workers = []
+        self.admission = AdmissionControl(max_workers, max_queue)
         
-        logging.warning(f"Server diinisialisasi pada {self.ipinfo} dengan {pool_type} pool ({max_workers} workers)")
+        logging.warning(f"Server diinisialisasi pada {self.ipinfo} dengan {pool_type} pool ({max_workers} workers, antrean maks {max_queue})")
 
     def start(self):
         logging.warning(f"Server mencoba berjalan di ip address {self.ipinfo}")
+        if self.pool_type == 'prefork':
+            self.start_prefork()
+            return
         try:
             self.my_socket.bind(self.ipinfo)
             self.my_socket.listen(100)
             logging.warning(f"Server berhasil mendengarkan koneksi pada {self.ipinfo}")
 
             if self.pool_type == 'thread':
-                self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
-                logging.warning(f"Menggunakan ThreadPoolExecutor dengan {self.max_workers} workers.")
+                self.executor = self.create_pool('thread', self.min_workers, self.max_workers, LANE_BULK)
+                logging.warning(f"Menggunakan pool thread elastis dengan {self.min_workers}-{self.max_workers} workers.")
             elif self.pool_type == 'process':
-                self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
-                logging.warning(f"Menggunakan ProcessPoolExecutor dengan {self.max_workers} workers.")
+                self.executor = self.create_pool('process', self.min_workers, self.max_workers, LANE_BULK)
+                logging.warning(f"Menggunakan pool proses elastis dengan {self.min_workers}-{self.max_workers} workers.")
+            elif self.pool_type == 'asyncio':
+                self.executor = self.create_pool('thread', self.min_workers, self.max_workers, 'asyncio')
+                logging.warning(f"Menggunakan asyncio event loop dengan executor elastis {self.min_workers}-{self.max_workers} thread untuk disk I/O.")
+                asyncio.run(self.serve_asyncio())
+                return
             else:
-                raise ValueError("Tipe pool tidak valid. Gunakan 'thread' atau 'process'.")
+                raise ValueError("Tipe pool tidak valid. Gunakan 'thread', 'process', 'asyncio' atau 'prefork'.")
 
-            while True:
-                connection, client_address = self.my_socket.accept()
-                logging.warning(f"Koneksi masuk dari {client_address}. Menyerahkan ke pool...")
-                self.executor.submit(handle_client, connection, client_address)
+            self.setup_lanes()
+            # SIGTERM dari orchestrator ikut menghentikan worker pool lewat shutdown()
+            signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+            Acceptor(self.my_socket, self.dispatch).serve_forever()
         except KeyboardInterrupt:
             logging.warning("Server dimatikan oleh pengguna (Ctrl+C).")
         except Exception as e:
@@ -101,31 +554,118 @@ class Server:
         finally:
             self.shutdown()
 
+    def create_pool(self, kind, min_workers, max_workers, name):
+        return ElasticPool(kind, min_workers, max_workers, self.idle_timeout, name=name, initializer=configure_worker,
+                           initargs=(fp.file.cache.max_bytes, sample_rate(), stats.values, tracing.enabled_path()))
+
+    def setup_lanes(self):
+        # lane besar memakai executor utama; lane kecil mendapat executor sendiri
+        # kecuali --small_workers 0, yang membuat kedua kelas berbagi satu pool
+        self.lanes[LANE_BULK] = Lane(LANE_BULK, self.executor, self.admission)
+        if self.small_workers <= 0:
+            self.lanes[LANE_SMALL] = Lane(LANE_SMALL, self.executor, self.admission)
+            return
+        self.small_executor = self.create_pool(self.pool_type, 1, self.small_workers, LANE_SMALL)
+        self.lanes[LANE_SMALL] = Lane(LANE_SMALL, self.small_executor,
+                                      AdmissionControl(self.small_workers, self.max_queue))
+        logging.warning(f"Lane {LANE_SMALL} (LIST, DELETE, STATS) memakai {self.small_workers} worker cadangan.")
+
+    def dispatch(self, connection, client_address, lane_name):
+        lane = self.lanes[lane_name]
+        # dikurangi lagi oleh handle_client saat worker mulai menangani koneksi
+        stats.add('queue_depth')
+        if not lane.submit(handle_client, connection, client_address):
+            stats.add('queue_depth', -1)
+            reject_busy(connection, client_address, lane.admission)
+            return
+        if sampled():
+            logging.warning(f"Koneksi masuk dari {client_address}. Menyerahkan ke lane {lane_name}...")
+
+    def start_prefork(self):
+        if not hasattr(socket, 'SO_REUSEPORT'):
+            logging.error("Fatal error server: SO_REUSEPORT tidak didukung oleh sistem operasi ini.")
+            return
+        # socket milik parent tidak dipakai, setiap worker membuka socket sendiri
+        self.my_socket.close()
+        self.my_socket = None
+        ctx = multiprocessing.get_context('fork')
+        self.workers = [ctx.Process(target=prefork_worker, args=(self.ipinfo, i), daemon=True)
+                        for i in range(self.max_workers)]
+        logging.warning(f"Menggunakan {self.max_workers} worker prefork dengan SO_REUSEPORT.")
+        try:
+            for worker in self.workers:
+                worker.start()
+            # SIGTERM (dari orchestrator) ikut menghentikan seluruh worker
+            signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+            for worker in self.workers:
+                worker.join()
+        except KeyboardInterrupt:
+            logging.warning("Server dimatikan oleh pengguna (Ctrl+C).")
+        finally:
+            for worker in self.workers:
+                if worker.is_alive():
+                    worker.terminate()
+                worker.join()
+            logging.warning("Semua worker prefork dihentikan.")
+            self.shutdown()
+
+    async def serve_asyncio(self):
+        self.my_socket.setblocking(False)
+        server = await asyncio.start_server(self.handle_async, sock=self.my_socket)
+        async with server:
+            await server.serve_forever()
+
+    async def handle_async(self, reader, writer):
+        # koneksi tidak dibatasi di sini: admission diterapkan per pekerjaan
+        # executor di handle_client_async, sehingga ribuan koneksi yang
+        # menganggur tidak menghabiskan kapasitas --max_workers + --max_queue
+        await handle_client_async(reader, writer, self.executor, self.admission)
+
     def shutdown(self):
         if self.executor:
             logging.warning("Mematikan executor pool. Menunggu tugas selesai...")
             self.executor.shutdown(wait=True)
             logging.warning("Executor pool dimatikan.")
+        if self.small_executor:
+            self.small_executor.shutdown(wait=True)
         if self.my_socket:
             self.my_socket.close()
             logging.warning("Socket server ditutup.")
-        for handler in logging.getLogger().handlers:
-            handler.flush()
 
 def main():
     parser = argparse.ArgumentParser(description="File Server dengan Konkurensi Pool untuk Stress Test ETS.")
     parser.add_argument('--pool_type', type=str, default='thread',
-                        choices=['thread', 'process'],
-                        help="Tipe pool untuk konkurensi (thread atau process). Default: thread")
+                        choices=['thread', 'process', 'asyncio', 'prefork'],
+                        help="Tipe pool untuk konkurensi (thread, process, asyncio atau prefork). Default: thread")
     parser.add_argument('--max_workers', type=int, default=5,
-                        help="Jumlah maksimum worker dalam pool. Default: 5")
+                        help="Jumlah maksimum worker dalam pool elastis (jumlah proses tetap untuk prefork). Default: 5")
+    parser.add_argument('--min_workers', type=int, default=DEFAULT_MIN_WORKERS,
+                        help=f"Jumlah minimum worker yang selalu hidup dalam pool elastis. Default: {DEFAULT_MIN_WORKERS}")
+    parser.add_argument('--idle_timeout', type=float, default=DEFAULT_IDLE_TIMEOUT,
+                        help=f"Cooldown (detik) sebelum worker yang menganggur dihentikan. Default: {DEFAULT_IDLE_TIMEOUT}")
     parser.add_argument('--port', type=int, default=6667,
                         help="Port yang akan digunakan server. Default: 6667")
+    parser.add_argument('--max_queue', type=int, default=DEFAULT_MAX_QUEUE,
+                        help=f"Jumlah koneksi (pada asyncio: pekerjaan executor) yang boleh menunggu worker; berikutnya dijawab BUSY (tidak berlaku untuk prefork). Default: {DEFAULT_MAX_QUEUE}")
+    parser.add_argument('--small_workers', type=int, default=DEFAULT_SMALL_WORKERS,
+                        help=f"Worker cadangan untuk request kecil (LIST, DELETE) pada mode thread/process, 0 untuk satu pool bersama. Default: {DEFAULT_SMALL_WORKERS}")
+    parser.add_argument('--cache_mb', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="Batas ukuran cache isi file GET (MB) per proses, 0 untuk mematikan. Default: 256")
+    parser.add_argument('--log_sample', type=float, default=1.0,
+                        help="Fraksi request yang baris log per request-nya ditulis (0.0-1.0). Default: 1.0")
+    parser.add_argument('--trace', metavar='FILE', default=None,
+                        help="Tulis durasi fase (recv, parse, disk, encode, send) setiap request sebagai JSON lines ke FILE, ringkas dengan analyze_trace.py. Default: mati")
     
     args = parser.parse_args()
+    fp.file.cache.set_max_bytes(args.cache_mb * 1024 * 1024)
+    set_sample_rate(args.log_sample)
+    if args.trace:
+        tracing.enable(os.path.join(LAUNCH_DIR, args.trace))
     
     svr = Server(ipaddress='0.0.0.0', port=args.port, 
-                 pool_type=args.pool_type, max_workers=args.max_workers)
+                 pool_type=args.pool_type, max_workers=args.max_workers,
+                 max_queue=args.max_queue, small_workers=args.small_workers,
+                 min_workers=args.min_workers, idle_timeout=args.idle_timeout)
     svr.start()
 
 if __name__ == "__main__":
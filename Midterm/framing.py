@@ -0,0 +1,111 @@
+"""
+* FrameReader membaca stream dari socket ke dalam satu bytearray dan
+memotongnya menjadi frame yang diakhiri terminator ("\r\n\r\n")
+
+* posisi scan terakhir disimpan sehingga pencarian terminator hanya
+dilakukan pada byte yang baru diterima, dan decode ke string hanya
+dilakukan sekali per frame oleh pemanggil. Biaya menerima pesan
+berukuran N byte menjadi linear terhadap N (bukan kuadratik seperti
+`data_received += data.decode()` lalu `"\r\n\r\n" in data_received`)
+"""
+
+TERMINATOR = b"\r\n\r\n"
+RECV_SIZE = 64 * 1024
+
+
+class FrameReader:
+    def __init__(self, sock, terminator=TERMINATOR, recv_size=RECV_SIZE):
+        self.sock = sock
+        self.terminator = terminator
+        self.recv_size = recv_size
+        self.buffer = bytearray()
+        self.scan_from = 0
+        self.bytes_received = 0
+
+    @property
+    def bytes_consumed(self):
+        # byte yang sudah diambil pemanggil dari stream (tidak termasuk isi buffer)
+        return self.bytes_received - len(self.buffer)
+
+    def feed(self, data):
+        # menambahkan data yang diterima dari luar (misalnya asyncio StreamReader)
+        self.buffer += data
+        self.bytes_received += len(data)
+
+    def fill(self):
+        # menerima satu potongan data dari socket, False jika koneksi ditutup
+        data = self.sock.recv(self.recv_size)
+        if not data:
+            return False
+        self.feed(data)
+        return True
+
+    def pop_frame(self):
+        # mengambil satu frame dari buffer tanpa recv, None jika belum lengkap
+        idx = self.buffer.find(self.terminator, self.scan_from)
+        if idx == -1:
+            self.scan_from = max(0, len(self.buffer) - len(self.terminator) + 1)
+            return None
+        frame = bytes(self.buffer[:idx])
+        del self.buffer[:idx + len(self.terminator)]
+        self.scan_from = 0
+        return frame
+
+    def read_frame(self):
+        # membaca sampai satu frame lengkap, None jika koneksi ditutup lebih dulu
+        while True:
+            frame = self.pop_frame()
+            if frame is not None:
+                return frame
+            if not self.fill():
+                return None
+
+    def consume(self, size):
+        del self.buffer[:size]
+        self.scan_from = 0
+
+    def skip_leading(self, chars=b"\r\n"):
+        skip = 0
+        while skip < len(self.buffer) and self.buffer[skip] in chars:
+            skip += 1
+        if skip:
+            self.consume(skip)
+
+    def iter_until(self, delimiter):
+        """
+        menghasilkan potongan data sampai delimiter ditemukan; delimiter
+        sendiri tetap tertinggal di buffer. Dipakai untuk isi yang panjang
+        (misalnya base64 UPLOAD) agar tidak perlu ditampung seluruhnya
+        """
+        while True:
+            idx = self.buffer.find(delimiter)
+            if idx != -1:
+                if idx:
+                    yield bytes(self.buffer[:idx])
+                    self.consume(idx)
+                return
+            if self.buffer:
+                yield bytes(self.buffer)
+                self.consume(len(self.buffer))
+            if not self.fill():
+                raise ConnectionError("Koneksi ditutup sebelum data selesai diterima")
+
+    def iter_exact(self, size):
+        # menghasilkan tepat size byte per potongan, dimulai dari isi buffer
+        remaining = size
+        if self.buffer:
+            chunk = bytes(self.buffer[:remaining])
+            self.consume(len(chunk))
+            remaining -= len(chunk)
+            if chunk:
+                yield chunk
+        while remaining > 0:
+            data = self.sock.recv(min(self.recv_size, remaining))
+            if not data:
+                raise ConnectionError(f"Stream terputus, kurang {remaining} byte")
+            self.bytes_received += len(data)
+            remaining -= len(data)
+            yield data
+
+    def read_exact(self, size):
+        return b"".join(self.iter_exact(size))
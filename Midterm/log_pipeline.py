@@ -0,0 +1,95 @@
+import os
+import sys
+import queue
+import random
+import atexit
+import logging
+import logging.handlers
+import multiprocessing.util
+
+"""
+* log server ditulis lewat QueueHandler: thread worker hanya memasukkan
+record ke antrean di memori, sedangkan penulisan ke file dan stdout
+dikerjakan satu thread QueueListener di latar belakang. Worker tidak
+pernah menunggu disk atau melakukan flush
+
+* thread listener tidak ikut ter-fork, sehingga proses anak (prefork,
+worker pool proses) otomatis membuat antrean dan listener sendiri
+
+* field yang berasal dari client (nama file, isi request) dipotong dengan
+short() agar payload upload tidak ikut ditulis ke log, dan baris per
+request bisa di-sampling dengan sampled()
+"""
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+FIELD_MAX_CHARS = 120
+
+_handlers = []
+_queue_handler = None
+_listener = None
+_sample_rate = 1.0
+
+
+def setup_logging(log_path, level=logging.WARNING, sample_rate=1.0):
+    global _handlers, _queue_handler
+    formatter = logging.Formatter(LOG_FORMAT)
+    _handlers = [logging.FileHandler(log_path), logging.StreamHandler(sys.stdout)]
+    for handler in _handlers:
+        handler.setFormatter(formatter)
+    _queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    root = logging.getLogger()
+    root.handlers = [_queue_handler]
+    root.setLevel(level)
+    set_sample_rate(sample_rate)
+    _start_listener()
+    atexit.register(stop_logging)
+    os.register_at_fork(after_in_child=_restart_in_child)
+    multiprocessing.util.register_after_fork(_queue_handler, _flush_at_child_exit)
+
+
+def _start_listener():
+    global _listener
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *_handlers)
+    _listener.start()
+
+
+def _restart_in_child():
+    # antrean milik parent bisa tertinggal dalam keadaan terkunci saat fork
+    _queue_handler.queue = queue.SimpleQueue()
+    _start_listener()
+
+
+def _flush_at_child_exit(_):
+    # proses anak multiprocessing keluar lewat os._exit tanpa menjalankan atexit
+    multiprocessing.util.Finalize(None, stop_logging, exitpriority=0)
+
+
+def stop_logging():
+    # mengosongkan antrean ke file sebelum proses berhenti
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        for handler in _handlers:
+            handler.flush()
+
+
+def set_sample_rate(rate):
+    global _sample_rate
+    _sample_rate = min(1.0, max(0.0, rate))
+
+
+def sample_rate():
+    return _sample_rate
+
+
+def sampled():
+    # True jika baris log per request kali ini perlu ditulis
+    return _sample_rate >= 1.0 or random.random() < _sample_rate
+
+
+def short(value, limit=FIELD_MAX_CHARS):
+    text = str(value)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}...(+{len(text) - limit} karakter)"
@@ -0,0 +1,46 @@
+import struct
+
+"""
+* protokol v2 (biner) berjalan di port yang sama dengan protokol teks.
+server mengenali request v2 dari byte pertamanya (V2_MAGIC, 0xF2) yang
+tidak mungkin muncul sebagai awal perintah teks (LIST/GET/UPLOAD/...)
+
+* setiap request/respons diawali header tetap V2_HEADER:
+  magic (1 byte) | opcode / status (1 byte) | panjang nama (2 byte) | panjang payload (8 byte)
+  diikuti nama file (utf-8) lalu payload mentah sepanjang panjang payload,
+  tanpa base64 maupun JSON, sehingga pembaca tahu persis berapa byte
+  yang harus diterima
+"""
+
+V2_MAGIC = 0xF2
+V2_HEADER = struct.Struct('!BBHQ')
+
+OP_LIST = 1
+OP_GET = 2
+OP_UPLOAD = 3
+OP_DELETE = 4
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+
+def pack_header(code, name=b'', payload_len=0):
+    # header + nama file; payload dikirim terpisah oleh pemanggil
+    return V2_HEADER.pack(V2_MAGIC, code, len(name), payload_len) + name
+
+
+def unpack_header(data):
+    magic, code, name_len, payload_len = V2_HEADER.unpack(data)
+    if magic != V2_MAGIC:
+        raise ValueError(f"Magic byte protokol v2 tidak valid: {magic:#x}")
+    return code, name_len, payload_len
+
+
+def read_message(reader):
+    """
+    membaca header dan nama file dari FrameReader, mengembalikan
+    (code, nama_file, panjang_payload); payload dibaca pemanggil
+    """
+    code, name_len, payload_len = unpack_header(reader.read_exact(V2_HEADER.size))
+    name = reader.read_exact(name_len).decode() if name_len else ''
+    return code, name, payload_len
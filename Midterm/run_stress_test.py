@@ -7,6 +7,7 @@ import itertools
 import pandas as pd
 import sys
 import socket
+import re
 
 SERVER_SCRIPT = "file_server.py"
 CLIENT_SCRIPT = "stress_client.py"
@@ -27,8 +28,38 @@ OPERATIONS = ['download', 'upload']
 VOLUMES_MB = [10, 50, 100]
 CLIENT_NUM_WORKERS = [1, 5, 50]
 CLIENT_POOL_TYPES = ['thread', 'process']
-SERVER_POOL_TYPES = ['thread', 'process']
+SERVER_POOL_TYPES = ['thread', 'process', 'asyncio', 'prefork']
 SERVER_NUM_WORKERS = [1, 5, 50]
+# koneksi yang boleh menunggu worker; kelebihannya ditolak server (BUSY)
+SERVER_MAX_QUEUE = 64
+# worker cadangan untuk LIST/DELETE; 0 untuk membandingkan dengan satu pool bersama
+SERVER_SMALL_WORKERS = 1
+# SERVER_NUM_WORKERS menjadi batas atas pool elastis, yang tumbuh dari batas bawah ini
+SERVER_MIN_WORKERS = 1
+SERVER_IDLE_TIMEOUT = 10
+
+POOL_SIZE_PATTERN = re.compile(r"^(\S+ \S+) - \w+ - Ukuran pool (\w+): (\d+) worker", re.MULTILINE)
+# 'json' (GET base64 dalam JSON) hanya berbeda pada download; upload-nya sama
+# dengan 'text', jadi kombinasi upload + json dilewati
+PROTOCOLS = ['text', 'json', 'v2']
+# GET yang digabung (SingleFlight) hanya terjadi di dalam satu proses, sehingga
+# nilainya praktis nol pada server process dan prefork (satu koneksi per proses)
+COALESCING_NOTE = ("Server Coalesced dihitung per proses: pada server 'process' dan 'prefork' "
+                   "setiap proses melayani satu koneksi pada satu waktu, sehingga nilainya praktis 0.")
+# LIST berkala dari client selama transfer untuk mengukur latensi lane kecil.
+# Probe ikut membebani server, jadi hanya dinyalakan untuk skenario latensi
+# tersebut, bukan untuk matriks throughput
+PROBE_LIST = False
+# perintah server yang dipakai stress_client untuk transfer per (operasi, protokol);
+# Server Sukses/Gagal dihitung dari counter perintah ini di STATS sehingga
+# koneksi lain (LIST probe, STATS) tidak ikut terhitung
+TRANSFER_COMMANDS = {
+    ('download', 'text'): 'getstream',
+    ('download', 'json'): 'get',
+    ('download', 'v2'): 'v2-get',
+    ('upload', 'text'): 'upload',
+    ('upload', 'v2'): 'v2-upload',
+}
 
 # Testing debugging
 # OPERATIONS = ['download']
@@ -37,17 +68,22 @@ SERVER_NUM_WORKERS = [1, 5, 50]
 # CLIENT_POOL_TYPES = ['thread']
 # SERVER_POOL_TYPES = ['thread']
 # SERVER_NUM_WORKERS = [1]
+# PROTOCOLS = ['text']
 
 server_process = None
 
 def start_server(pool_type, max_workers, port):
     global server_process
-    logging.info(f"Memulai server: {SERVER_SCRIPT} --pool_type {pool_type} --max_workers {max_workers} --port {port}")
+    logging.info(f"Memulai server: {SERVER_SCRIPT} --pool_type {pool_type} --max_workers {max_workers} --max_queue {SERVER_MAX_QUEUE} --small_workers {SERVER_SMALL_WORKERS} --min_workers {SERVER_MIN_WORKERS} --idle_timeout {SERVER_IDLE_TIMEOUT} --port {port}")
     try:
         server_process = subprocess.Popen(
             ['python', SERVER_SCRIPT, 
              '--pool_type', pool_type, 
              '--max_workers', str(max_workers), 
+             '--max_queue', str(SERVER_MAX_QUEUE),
+             '--small_workers', str(SERVER_SMALL_WORKERS),
+             '--min_workers', str(SERVER_MIN_WORKERS),
+             '--idle_timeout', str(SERVER_IDLE_TIMEOUT),
              '--port', str(port)],
             stdout=subprocess.DEVNULL, 
             stderr=subprocess.DEVNULL, 
@@ -101,15 +137,17 @@ def stop_server():
             logging.error(f"Error saat menghentikan server: {e}")
         server_process = None
 
-def run_client_stress_test(operation, volume_mb, client_pool_type, num_client_workers):
-    logging.info(f"Menjalankan client: {CLIENT_SCRIPT} --operation {operation} --volume {volume_mb} --client_pool_type {client_pool_type} --num_client_workers {num_client_workers}")
+def run_client_stress_test(operation, volume_mb, client_pool_type, num_client_workers, protocol='text'):
+    probe_args = ['--probe_list'] if PROBE_LIST else []
+    logging.info(f"Menjalankan client: {CLIENT_SCRIPT} --operation {operation} --volume {volume_mb} --client_pool_type {client_pool_type} --num_client_workers {num_client_workers} --protocol {protocol} {' '.join(probe_args)}")
     try:
         result = subprocess.run(
             ['python', CLIENT_SCRIPT, 
              '--operation', operation, 
              '--volume', str(volume_mb), 
              '--client_pool_type', client_pool_type, 
-             '--num_client_workers', str(num_client_workers)],
+             '--num_client_workers', str(num_client_workers),
+             '--protocol', protocol] + probe_args,
             capture_output=True,
             text=True,
             check=False
@@ -168,24 +206,59 @@ def clear_server_log():
     except Exception as e:
         logging.error(f"Gagal membersihkan log server: {e}")
 
-def get_server_worker_metrics_from_log():
-    successful_server_workers = 0
-    failed_server_workers = 0
-    
+def query_server_stats(port, ip=SERVER_IP, timeout=10):
+    """
+    meminta counter gabungan seluruh worker lewat perintah STATS, dipanggil
+    sebelum server dihentikan. Mengembalikan isi 'data' atau None jika gagal
+    """
+    try:
+        with socket.create_connection((ip, port), timeout=timeout) as s:
+            s.sendall(b"STATS\r\n\r\n")
+            response = b""
+            while b"\r\n\r\n" not in response:
+                data = s.recv(65536)
+                if not data:
+                    break
+                response += data
+        hasil = json.loads(response.split(b"\r\n\r\n", 1)[0])
+        if hasil.get('status') != 'OK':
+            logging.error(f"STATS ditolak server: {hasil}")
+            return None
+        return hasil['data']
+    except Exception as e:
+        logging.error(f"Gagal membaca STATS server: {e}")
+        return None
+
+def get_server_worker_metrics(server_stats, command):
+    # jumlah transfer sukses/gagal untuk perintah transfer, GET yang digabung,
+    # koneksi BUSY dan rata-rata waktu tunggu antrean per lane (ms) dari hasil STATS.
+    # Transfer gagal = respons ERROR ditambah koneksi yang putus sebelum respons
+    if server_stats is None:
+        return "N/A", "N/A", "N/A", "N/A", {}
+    counters = server_stats['server']
+    transfer = server_stats['commands'].get(command, dict(requests=0, errors=0))
+    queue_waits = {lane: round(wait['avg_ms'], 2) for lane, wait in server_stats['queue_wait'].items()}
+    return (transfer['requests'] - transfer['errors'], transfer['errors'] + counters['connections_failed'],
+            counters['coalesced'], counters['shed'], queue_waits)
+
+def get_pool_sizes_from_log():
+    # riwayat ukuran pool elastis (waktu, nama pool, jumlah worker)
+    pool_sizes = []
     try:
         full_server_log_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), SERVER_LOG_FILE)
         with open(full_server_log_path, 'r') as f:
             log_content = f.read()
-        
-        successful_server_workers = log_content.count("selesai menangani koneksi")
-        failed_server_workers = log_content.count("Error saat menangani client")
+
+        pool_sizes = [(waktu, nama, int(ukuran)) for waktu, nama, ukuran in POOL_SIZE_PATTERN.findall(log_content)]
+        if pool_sizes:
+            logging.info("Riwayat ukuran pool: " + ", ".join(f"{waktu} {nama}={ukuran}" for waktu, nama, ukuran in pool_sizes))
 
     except FileNotFoundError:
         logging.warning(f"Server log file {SERVER_LOG_FILE} tidak ditemukan saat dibaca. Server mungkin gagal menulis log.")
     except Exception as e:
         logging.error(f"Error saat membaca log server: {e}")
         
-    return successful_server_workers, failed_server_workers
+    return pool_sizes
 
 
 def main():
@@ -196,20 +269,20 @@ def main():
     
     cleanup_uploaded_files() 
 
-    total_combinations = len(OPERATIONS) * len(VOLUMES_MB) * \
-                         len(CLIENT_NUM_WORKERS) * len(CLIENT_POOL_TYPES) * \
-                         len(SERVER_POOL_TYPES) * len(SERVER_NUM_WORKERS)
-
-    for op, vol, client_num_workers, client_pool_type, server_pool_type, server_num_workers in itertools.product(
+    combinations = [combination for combination in itertools.product(
         OPERATIONS, 
         VOLUMES_MB, 
         CLIENT_NUM_WORKERS, 
         CLIENT_POOL_TYPES,
         SERVER_POOL_TYPES, 
-        SERVER_NUM_WORKERS
-    ):
+        SERVER_NUM_WORKERS,
+        PROTOCOLS
+    ) if (combination[0], combination[-1]) != ('upload', 'json')]
+    total_combinations = len(combinations)
+
+    for op, vol, client_num_workers, client_pool_type, server_pool_type, server_num_workers, protocol in combinations:
         logging.info(f"\n--- Uji Kombinasi {test_number}/{total_combinations} ---")
-        logging.info(f"Operasi: {op}, Volume: {vol}MB, Client Workers: {client_num_workers}, Client Pool Type: {client_pool_type}, Server Pool Type: {server_pool_type}, Server Workers: {server_num_workers}")
+        logging.info(f"Operasi: {op}, Volume: {vol}MB, Client Workers: {client_num_workers}, Client Pool Type: {client_pool_type}, Server Pool Type: {server_pool_type}, Server Workers: {server_num_workers}, Protokol: {protocol}")
 
         clear_server_log()
 
@@ -223,25 +296,35 @@ def main():
                 "Client Pool Type": client_pool_type,
                 "Server Pool Type": server_pool_type,
                 "Server Worker Pool": server_num_workers,
+                "Protokol": protocol,
                 "Waktu Total per Client (s)": "N/A",
                 "Throughput per Client (B/s)": "N/A",
                 "Client Sukses": "N/A",
                 "Client Gagal": "N/A",
                 "Server Sukses": "N/A",
                 "Server Gagal": "N/A",
+                "Server Coalesced": "N/A",
+                "Server Cache Hit/Miss": "N/A",
+                "Server Shed": "N/A",
+                "Antrean Kecil (ms)": "N/A",
+                "Antrean Besar (ms)": "N/A",
+                "LIST Probe (ms)": "N/A",
+                "Pool Maks": "N/A",
                 "Keterangan": "Server gagal dimulai"
             })
             test_number += 1
             time.sleep(2)
             continue 
 
-        client_results = run_client_stress_test(op, vol, client_pool_type, client_num_workers)
+        client_results = run_client_stress_test(op, vol, client_pool_type, client_num_workers, protocol)
+        server_stats = query_server_stats(SERVER_PORT)
         
         stop_server()
         
         time.sleep(1) 
 
-        successful_server_workers, failed_server_workers = get_server_worker_metrics_from_log()
+        successful_server_workers, failed_server_workers, coalesced_requests, shed_connections, queue_waits = get_server_worker_metrics(server_stats, TRANSFER_COMMANDS.get((op, protocol)))
+        pool_sizes = get_pool_sizes_from_log()
 
         if op == 'upload':
             cleanup_uploaded_files()
@@ -254,12 +337,21 @@ def main():
             "Client Pool Type": client_pool_type,
             "Server Pool Type": server_pool_type,
             "Server Worker Pool": server_num_workers,
+            "Protokol": protocol,
             "Waktu Total per Client (s)": round(client_results.get("time_per_client_s", 0), 4) if isinstance(client_results.get("time_per_client_s"), (int, float)) else client_results.get("time_per_client_s", "N/A"),
             "Throughput per Client (B/s)": round(client_results.get("throughput_per_client_bps", 0), 2) if isinstance(client_results.get("throughput_per_client_bps"), (int, float)) else client_results.get("throughput_per_client_bps", "N/A"),
             "Client Sukses": client_results.get("successful_client_workers", "N/A"),
             "Client Gagal": client_results.get("failed_client_workers", "N/A"),
             "Server Sukses": successful_server_workers,
             "Server Gagal": failed_server_workers,
+            "Server Coalesced": coalesced_requests,
+            # cache isi file hanya dipakai GET base64 (protokol 'json')
+            "Server Cache Hit/Miss": f"{server_stats['server']['cache_hits']}/{server_stats['server']['cache_misses']}" if server_stats else "N/A",
+            "Server Shed": shed_connections,
+            "Antrean Kecil (ms)": queue_waits.get('kecil', "N/A"),
+            "Antrean Besar (ms)": queue_waits.get('besar', "N/A"),
+            "LIST Probe (ms)": round(client_results["list_probe_avg_ms"], 2) if "list_probe_avg_ms" in client_results else "N/A",
+            "Pool Maks": max((ukuran for _, nama, ukuran in pool_sizes if nama != 'kecil'), default="N/A"),
             "Keterangan": client_results.get("error", "OK")
         }
         all_test_results.append(current_result)
@@ -276,6 +368,7 @@ def main():
     print("="*80)
     with pd.option_context('display.max_rows', None, 'display.max_columns', None):
         print(df_results.to_string()) 
+    print(f"Catatan: {COALESCING_NOTE}")
     print("="*80)
 
     output_csv_file = "stress_test_results.csv"
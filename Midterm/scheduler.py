@@ -0,0 +1,97 @@
+import socket
+import selectors
+import time
+import logging
+
+import protocol_v2 as v2
+
+"""
+* scheduler mengelompokkan koneksi berdasarkan request pertamanya sebelum
+diserahkan ke pool: request metadata yang murah (LIST, DELETE, STATS) masuk lane
+'kecil' yang punya worker sendiri, sedangkan transfer isi file (GET,
+GETSTREAM, GETZ, UPLOAD, ...) masuk lane 'besar'. Dengan begitu LIST tidak
+menunggu di belakang beberapa transfer 100 MB
+
+* kata perintah dibaca dengan MSG_PEEK, sehingga handle_client tetap
+menerima request secara utuh dari byte pertama
+
+* setiap lane memiliki executor dan AdmissionControl sendiri; waktu koneksi
+masuk antrean lane ikut diteruskan ke worker untuk mengukur waktu tunggu
+per kelas
+"""
+
+LANE_SMALL = 'kecil'
+LANE_BULK = 'besar'
+
+SMALL_COMMANDS = (b'LIST', b'DELETE', b'STATS')
+SMALL_OPCODES = (v2.OP_LIST, v2.OP_DELETE)
+PEEK_BYTES = 16
+# koneksi yang belum mengirim apa pun setelah batas ini diserahkan ke lane besar
+CLASSIFY_TIMEOUT = 5
+
+
+def classify(peeked):
+    # menentukan lane dari beberapa byte pertama request
+    if peeked[:1] == bytes([v2.V2_MAGIC]):
+        return LANE_SMALL if peeked[1:2] and peeked[1] in SMALL_OPCODES else LANE_BULK
+    words = peeked.split(None, 1)
+    if words and words[0].upper() in SMALL_COMMANDS:
+        return LANE_SMALL
+    return LANE_BULK
+
+
+class Lane:
+    def __init__(self, name, executor, admission):
+        self.name = name
+        self.executor = executor
+        self.admission = admission
+
+    def submit(self, fn, connection, address):
+        # False jika lane penuh; koneksi belum ditutup dan harus ditolak pemanggil
+        if not self.admission.try_admit():
+            return False
+        future = self.executor.submit(fn, connection, address, self.name, time.time())
+        future.add_done_callback(self.admission.release)
+        return True
+
+
+class Acceptor:
+    def __init__(self, listen_socket, dispatch):
+        # dispatch(connection, address, lane) dipanggil setelah kelas request diketahui
+        self.listen_socket = listen_socket
+        self.dispatch = dispatch
+        self.selector = selectors.DefaultSelector()
+
+    def serve_forever(self):
+        self.selector.register(self.listen_socket, selectors.EVENT_READ, None)
+        while True:
+            for key, mask in self.selector.select(timeout=1):
+                if key.data is None:
+                    self.accept()
+                else:
+                    self.classify_ready(key.fileobj, key.data[0])
+            self.sweep()
+
+    def accept(self):
+        connection, client_address = self.listen_socket.accept()
+        self.selector.register(connection, selectors.EVENT_READ, (client_address, time.monotonic()))
+
+    def classify_ready(self, connection, address):
+        self.selector.unregister(connection)
+        try:
+            peeked = connection.recv(PEEK_BYTES, socket.MSG_PEEK)
+        except OSError:
+            peeked = b''
+        if not peeked:
+            # client menutup koneksi sebelum mengirim request
+            connection.close()
+            return
+        self.dispatch(connection, address, classify(peeked))
+
+    def sweep(self):
+        batas = time.monotonic() - CLASSIFY_TIMEOUT
+        for key in list(self.selector.get_map().values()):
+            if key.data is not None and key.data[1] < batas:
+                self.selector.unregister(key.fileobj)
+                logging.warning(f"Koneksi dari {key.data[0]} belum mengirim request, diserahkan ke lane {LANE_BULK}")
+                self.dispatch(key.fileobj, key.data[0], LANE_BULK)
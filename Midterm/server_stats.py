@@ -0,0 +1,130 @@
+import bisect
+import multiprocessing
+
+import protocol_v2 as v2
+
+"""
+* ServerStats menyimpan counter server di multiprocessing.Array (shared
+memory), sehingga worker thread, worker proses pool, maupun proses prefork
+menulis ke tabel yang sama dan request STATS dari worker mana pun melihat
+angka gabungan seluruh server
+
+* per perintah: jumlah request, error, byte masuk/keluar, total latensi dan
+histogram latensi (bucket tetap, LATENCY_BUCKETS dalam detik). Selain itu
+ada counter/gauge server: koneksi aktif, total, selesai tanpa error, gagal, antrean,
+koneksi yang ditolak (BUSY), GET yang digabung (coalesced) serta waktu
+tunggu di antrean per lane
+
+* proses yang dibuat lewat spawn/forkserver tidak mewarisi global modul ini,
+sehingga Array milik proses utama diteruskan lewat initializer worker dan
+dipasang dengan attach()
+"""
+
+COMMANDS = ('list', 'get', 'getstream', 'getz', 'upload', 'uploadz', 'delete',
+            'v2-list', 'v2-get', 'v2-upload', 'v2-delete', 'stats', 'other')
+V2_COMMANDS = {v2.OP_LIST: 'v2-list', v2.OP_GET: 'v2-get', v2.OP_UPLOAD: 'v2-upload', v2.OP_DELETE: 'v2-delete'}
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60)
+COMMAND_FIELDS = ('requests', 'errors', 'bytes_in', 'bytes_out', 'latency_sum')
+SERVER_FIELDS = ('connections_active', 'connections_total', 'connections_done', 'connections_failed',
+                 'queue_depth', 'shed', 'coalesced', 'cache_hits', 'cache_misses', 'cache_evictions')
+LANES = ('kecil', 'besar')
+
+# jumlah slot per perintah: field + bucket histogram + bucket sisa (> bucket terakhir)
+COMMAND_SLOTS = len(COMMAND_FIELDS) + len(LATENCY_BUCKETS) + 1
+COMMAND_OFFSET = {name: i * COMMAND_SLOTS for i, name in enumerate(COMMANDS)}
+SERVER_OFFSET = len(COMMANDS) * COMMAND_SLOTS
+SERVER_INDEX = {name: SERVER_OFFSET + i for i, name in enumerate(SERVER_FIELDS)}
+LANE_OFFSET = SERVER_OFFSET + len(SERVER_FIELDS)
+LANE_INDEX = {name: LANE_OFFSET + 2 * i for i, name in enumerate(LANES)}
+TOTAL_SLOTS = LANE_OFFSET + 2 * len(LANES)
+
+
+def text_command(frame):
+    # nama perintah protokol teks dari frame request (bytes)
+    word = frame.split(b' ', 1)[0].strip().lower().decode(errors='replace')
+    return word if word in COMMANDS else 'other'
+
+
+def is_error(hasil):
+    # hasil berupa JSON (protokol teks) atau header biner v2
+    if isinstance(hasil, (bytes, bytearray)):
+        return len(hasil) > 1 and hasil[1] == v2.STATUS_ERROR
+    return hasil.startswith('{"status": "ERROR"')
+
+
+class ServerStats:
+    def __init__(self):
+        # dibuat dari konteks forkserver yang sama dengan worker ElasticPool;
+        # proses prefork (fork) cukup mewarisinya
+        self.values = multiprocessing.get_context('forkserver').Array('d', TOTAL_SLOTS)
+
+    def attach(self, values):
+        self.values = values
+
+    def record(self, command, duration, bytes_in, bytes_out, error=False):
+        base = COMMAND_OFFSET.get(command, COMMAND_OFFSET['other'])
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, duration)
+        with self.values.get_lock():
+            values = self.values
+            values[base] += 1
+            if error:
+                values[base + 1] += 1
+            values[base + 2] += bytes_in
+            values[base + 3] += bytes_out
+            values[base + 4] += duration
+            values[base + len(COMMAND_FIELDS) + bucket] += 1
+
+    def add(self, field, delta=1):
+        with self.values.get_lock():
+            self.values[SERVER_INDEX[field]] += delta
+
+    def record_queue_wait(self, lane, wait):
+        index = LANE_INDEX.get(lane)
+        if index is None:
+            return
+        with self.values.get_lock():
+            self.values[index] += wait
+            self.values[index + 1] += 1
+
+    def snapshot(self):
+        with self.values.get_lock():
+            values = self.values[:]
+
+        commands = {}
+        for name, base in COMMAND_OFFSET.items():
+            requests = int(values[base])
+            if not requests:
+                continue
+            counts = [int(c) for c in values[base + len(COMMAND_FIELDS):base + COMMAND_SLOTS]]
+            commands[name] = dict(
+                requests=requests,
+                errors=int(values[base + 1]),
+                bytes_in=int(values[base + 2]),
+                bytes_out=int(values[base + 3]),
+                latency_avg_ms=round(values[base + 4] / requests * 1000, 3),
+                latency_p50_ms=self.percentile_ms(counts, 0.50),
+                latency_p99_ms=self.percentile_ms(counts, 0.99),
+                latency_buckets={f"le_{b}": c for b, c in zip(LATENCY_BUCKETS + ('inf',), counts)},
+            )
+
+        server = {name: int(values[index]) for name, index in SERVER_INDEX.items()}
+        queue_wait = {}
+        for lane, index in LANE_INDEX.items():
+            count = values[index + 1]
+            if count:
+                queue_wait[lane] = dict(count=int(count), avg_ms=round(values[index] / count * 1000, 3))
+        return dict(server=server, commands=commands, queue_wait=queue_wait)
+
+    def percentile_ms(self, counts, fraction):
+        # batas atas bucket tempat persentil jatuh (perkiraan dari histogram)
+        target = sum(counts) * fraction
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, counts):
+            seen += count
+            if seen >= target:
+                return bound * 1000
+        return None
+
+
+stats = ServerStats()
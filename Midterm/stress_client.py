@@ -6,8 +6,13 @@ import os
 import time
 import argparse
 import sys
+import threading
 from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
+from framing import FrameReader
+import protocol_v2 as v2
+import compression
+
 logging.basicConfig(level=logging.WARNING,
                     format='%(asctime)s - %(levelname)s - %(message)s',
                     handlers=[
@@ -22,84 +27,199 @@ UPLOAD_SOURCE_DIR = "."
 
 os.makedirs(DOWNLOAD_DIR, exist_ok=True)
 
+# kelipatan 3 byte agar setiap potongan bisa di-encode base64 tanpa padding
+UPLOAD_CHUNK_SIZE = 3 * 16 * 1024
+
+# potongan file mentah yang dikompresi per chunk pada UPLOADZ
+UPLOADZ_CHUNK_SIZE = 64 * 1024
+
+# jeda antar LIST pada probe latensi request kecil selama transfer berjalan
+LIST_PROBE_INTERVAL = 0.25
+
+def receive_json(sock, command_str, reader=None):
+    reader = reader or FrameReader(sock)
+    frame = reader.read_frame()
+    if frame is None:
+        frame = bytes(reader.buffer)
+    full_data_received = frame.decode('utf-8', errors='ignore')
+    
+    if not full_data_received.strip():
+        logging.error(f"Received empty response from server. Command: {command_str}")
+        return {"status": "ERROR", "data": "Empty response from server."}
+
+    try:
+        return json.loads(full_data_received)
+    except json.JSONDecodeError as e:
+        logging.error(f"JSON Decode Error (Raw data: {full_data_received[:200]}...): {e}")
+        return {"status": "ERROR", "data": "Invalid JSON response from server."}
+
 def send_command(command_str):
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     try:
         sock.connect(SERVER_ADDRESS)
         command_to_send = (command_str + "\r\n\r\n").encode() 
         sock.sendall(command_to_send)
-        
-        data_received_chunks = [] 
-        while True:
-            data = sock.recv(4096) 
-            if data:
-                data_received_chunks.append(data)
-                if b"\r\n\r\n" in b"".join(data_received_chunks):
-                    break
-            else:
-                break
-        
-        full_data_received = b"".join(data_received_chunks).decode('utf-8', errors='ignore')
-        
-        if not full_data_received.strip():
-            logging.error(f"Received empty response from server. Command: {command_str}")
-            return {"status": "ERROR", "data": "Empty response from server."}
-
-        json_data = full_data_received.split("\r\n\r\n")[0]
-        
-        if not json_data.strip():
-            logging.error(f"Received empty JSON data. Raw: {full_data_received[:200]}...")
-            return {"status": "ERROR", "data": "Empty JSON response part."}
-
-        hasil = json.loads(json_data)
-        return hasil
-    except json.JSONDecodeError as e:
-        logging.error(f"JSON Decode Error (Raw data: {full_data_received[:200]}...): {e}")
-        return {"status": "ERROR", "data": "Invalid JSON response from server."}
+        return receive_json(sock, command_str)
     except Exception as e:
         logging.error(f"Error during data receiving/sending: {e}") 
         return {"status": "ERROR", "data": f"Client communication error: {e}"}
     finally:
         sock.close()
 
-def download_file_task(filename):
+def send_upload_stream(local_filepath, remote_filename):
+    """
+    Mengirim UPLOAD dengan membaca file lokal per potongan dan meng-encode
+    base64 tiap potongan, sehingga file tidak pernah dimuat utuh ke memori.
+    Mengembalikan tuple (hasil_json, jumlah_byte_file_terkirim).
+    """
+    command_str = f"UPLOAD {remote_filename}"
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    total_bytes = 0
+    try:
+        sock.connect(SERVER_ADDRESS)
+        sock.sendall(f"{command_str} ".encode())
+        with open(local_filepath, 'rb') as fp:
+            while True:
+                chunk = fp.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                sock.sendall(base64.b64encode(chunk))
+                total_bytes += len(chunk)
+        sock.sendall(b"\r\n\r\n")
+        return receive_json(sock, command_str), total_bytes
+    except Exception as e:
+        logging.error(f"Error during upload streaming: {e}")
+        return {"status": "ERROR", "data": f"Client communication error: {e}"}, total_bytes
+    finally:
+        sock.close()
+
+def send_command_stream(command_str, filepath):
+    """
+    Mengirim request stream (GETSTREAM) lalu menulis isi file ke filepath
+    sepotong demi sepotong saat data tiba dari server.
+    Mengembalikan tuple (header_json, jumlah_byte_ditulis).
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.connect(SERVER_ADDRESS)
+        sock.sendall((command_str + "\r\n\r\n").encode())
+
+        reader = FrameReader(sock)
+        hasil = receive_json(sock, command_str, reader)
+        if hasil.get('status') != 'OK':
+            return hasil, 0
+
+        bytes_written = 0
+        with open(filepath, 'wb') as fp:
+            for chunk in reader.iter_exact(hasil.get('data_size', 0)):
+                fp.write(chunk)
+                bytes_written += len(chunk)
+        return hasil, bytes_written
+    finally:
+        sock.close()
+
+def send_command_stream_z(filename, filepath, level=compression.DEFAULT_LEVEL):
+    """
+    Mengirim GETZ lalu men-decompress chunk yang diterima langsung ke filepath.
+    Mengembalikan tuple (header_json, jumlah_byte_ditulis, jumlah_byte_di_jaringan).
+    """
+    command_str = f"GETZ {filename} {level}"
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.connect(SERVER_ADDRESS)
+        sock.sendall((command_str + "\r\n\r\n").encode())
+
+        reader = FrameReader(sock)
+        hasil = receive_json(sock, command_str, reader)
+        if hasil.get('status') != 'OK':
+            return hasil, 0, 0
+
+        decompressor = compression.Decompressor(hasil.get('compression', compression.COMPRESSION_ZLIB))
+        bytes_written = 0
+        wire_bytes = 0
+        with open(filepath, 'wb') as fp:
+            for chunk in compression.iter_chunks(reader):
+                wire_bytes += len(chunk)
+                data = decompressor.decompress(chunk)
+                fp.write(data)
+                bytes_written += len(data)
+            tail = decompressor.finish()
+            fp.write(tail)
+            bytes_written += len(tail)
+        return hasil, bytes_written, wire_bytes
+    finally:
+        sock.close()
+
+def send_upload_z(local_filepath, remote_filename, level=compression.DEFAULT_LEVEL):
+    """
+    Mengirim UPLOADZ: file lokal dibaca per potongan dan dikompresi zlib sambil
+    dikirim (tanpa kompresi untuk .jpg/.pdf dan sejenisnya).
+    Mengembalikan tuple (hasil_json, jumlah_byte_file_terkirim).
+    """
+    compression_type = compression.choose_compression(local_filepath)
+    command_str = f"UPLOADZ {remote_filename} {compression_type}"
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    total_bytes = 0
+    try:
+        sock.connect(SERVER_ADDRESS)
+        sock.sendall((command_str + "\r\n\r\n").encode())
+        with open(local_filepath, 'rb') as fp:
+            total_bytes = os.fstat(fp.fileno()).st_size
+            chunks = iter(lambda: fp.read(UPLOADZ_CHUNK_SIZE), b'')
+            for frame in compression.encode_chunks(chunks, compression_type, level):
+                sock.sendall(frame)
+        return receive_json(sock, command_str), total_bytes
+    except Exception as e:
+        logging.error(f"Error during compressed upload: {e}")
+        return {"status": "ERROR", "data": f"Client communication error: {e}"}, total_bytes
+    finally:
+        sock.close()
+
+def download_file_task(filename, compress=False, compress_level=compression.DEFAULT_LEVEL):
     start_time = time.time()
     total_bytes = 0
     success = False
+    filepath = os.path.join(DOWNLOAD_DIR, f"{os.getpid()}_{threading.get_ident()}_{filename}")
     try:
-        command_str = f"GET {filename}"
-        hasil = send_command(command_str)
-        
+        if compress:
+            hasil, total_bytes, _ = send_command_stream_z(filename, filepath, compress_level)
+        else:
+            hasil, total_bytes = send_command_stream(f"GETSTREAM {filename}", filepath)
+
         if hasil.get('status') == 'OK':
-            remote_filename = hasil.get('data_namafile')
-            encoded_content = hasil.get('data_file')
-            if remote_filename and encoded_content:
-                try:
-                    decoded_content = base64.b64decode(encoded_content)
-                    total_bytes = len(decoded_content)
-                    
-                    filepath = os.path.join(DOWNLOAD_DIR, remote_filename)
-                    with open(filepath, 'wb+') as fp:
-                        fp.write(decoded_content)
-                    success = True
-                    os.remove(filepath) 
-                except Exception as decode_write_error:
-                    logging.error(f"Error decoding or writing file {filename}: {decode_write_error}")
-                    success = False 
-            else:
-                logging.error(f"Download task failed for {filename}: Missing remote_filename or encoded_content. Data: {hasil}")
-                success = False
+            success = True
         else:
             logging.error(f"Server reported non-OK status for {filename}: {hasil.get('data', 'Unknown error')}")
-            success = False 
     except Exception as e:
         logging.error(f"Exception in download task for {filename}: {e}")
+    finally:
+        # file hasil unduhan (juga yang terpotong karena error) tidak disimpan
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        end_time = time.time()
+        duration = end_time - start_time
+        return {"success": success, "duration": duration, "bytes_transferred": total_bytes}
+
+def download_file_task_json(filename):
+    # GET lama: isi file base64 di dalam satu respons JSON
+    start_time = time.time()
+    total_bytes = 0
+    success = False
+    try:
+        hasil = send_command(f"GET {filename}")
+        if hasil.get('status') == 'OK' and hasil.get('data_file') is not None:
+            total_bytes = len(base64.b64decode(hasil['data_file']))
+            success = True
+        else:
+            logging.error(f"Server reported non-OK status for {filename}: {hasil.get('data', 'Unknown error')}")
+    except Exception as e:
+        logging.error(f"Exception in json download task for {filename}: {e}")
     finally:
         end_time = time.time()
         duration = end_time - start_time
         return {"success": success, "duration": duration, "bytes_transferred": total_bytes}
 
-def upload_file_task(local_filepath, remote_filename):
+def upload_file_task(local_filepath, remote_filename, compress=False, compress_level=compression.DEFAULT_LEVEL):
     start_time = time.time()
     total_bytes = 0
     success = False
@@ -108,13 +228,10 @@ def upload_file_task(local_filepath, remote_filename):
             logging.error(f"Local file {local_filepath} not found for upload.")
             return {"success": False, "duration": 0, "bytes_transferred": 0}
 
-        with open(local_filepath, 'rb') as fp:
-            file_content_bytes = fp.read()
-        total_bytes = len(file_content_bytes)
-        encoded_content = base64.b64encode(file_content_bytes).decode('utf-8')
-        
-        command_str = f"UPLOAD {remote_filename} {encoded_content}"
-        hasil = send_command(command_str)
+        if compress:
+            hasil, total_bytes = send_upload_z(local_filepath, remote_filename, compress_level)
+        else:
+            hasil, total_bytes = send_upload_stream(local_filepath, remote_filename)
 
         if hasil.get('status') == 'OK':
             success = True
@@ -127,8 +244,84 @@ def upload_file_task(local_filepath, remote_filename):
         duration = end_time - start_time
         return {"success": success, "duration": duration, "bytes_transferred": total_bytes}
 
-def run_client_test(operation_type, file_size_mb, client_pool_type, num_client_workers):
-    logging.warning(f"Client stress test dimulai: Operasi={operation_type}, Volume={file_size_mb}MB, ClientPool={client_pool_type}, Workers={num_client_workers}")
+def receive_v2(reader, fp_out=None):
+    """
+    Membaca satu respons protokol v2. Payload ditulis ke fp_out jika diberikan
+    (GET), selain itu dikembalikan sebagai teks. Mengembalikan tuple
+    (status_ok, data, jumlah_byte_payload).
+    """
+    status, name, payload_len = v2.read_message(reader)
+    if status == v2.STATUS_OK and fp_out is not None:
+        for chunk in reader.iter_exact(payload_len):
+            fp_out.write(chunk)
+        return True, name, payload_len
+    return status == v2.STATUS_OK, reader.read_exact(payload_len).decode(), payload_len
+
+def download_file_task_v2(filename):
+    start_time = time.time()
+    total_bytes = 0
+    success = False
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    filepath = os.path.join(DOWNLOAD_DIR, f"{os.getpid()}_{threading.get_ident()}_{filename}")
+    try:
+        sock.connect(SERVER_ADDRESS)
+        sock.sendall(v2.pack_header(v2.OP_GET, filename.encode()))
+        reader = FrameReader(sock)
+        with open(filepath, 'wb') as fp:
+            success, data, total_bytes = receive_v2(reader, fp)
+        if not success:
+            total_bytes = 0
+            logging.error(f"Server reported non-OK status for {filename}: {data}")
+    except Exception as e:
+        logging.error(f"Exception in v2 download task for {filename}: {e}")
+    finally:
+        sock.close()
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        end_time = time.time()
+        duration = end_time - start_time
+        return {"success": success, "duration": duration, "bytes_transferred": total_bytes}
+
+def upload_file_task_v2(local_filepath, remote_filename):
+    start_time = time.time()
+    total_bytes = 0
+    success = False
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        if not os.path.exists(local_filepath):
+            logging.error(f"Local file {local_filepath} not found for upload.")
+            return {"success": False, "duration": 0, "bytes_transferred": 0}
+
+        sock.connect(SERVER_ADDRESS)
+        with open(local_filepath, 'rb') as fp:
+            filesize = os.fstat(fp.fileno()).st_size
+            sock.sendall(v2.pack_header(v2.OP_UPLOAD, remote_filename.encode(), filesize))
+            total_bytes = sock.sendfile(fp)
+        success, data, _ = receive_v2(FrameReader(sock))
+        if not success:
+            logging.error(f"Upload task failed for {local_filepath} to {remote_filename}: {data}")
+    except Exception as e:
+        logging.error(f"Exception in v2 upload task for {local_filepath}: {e}")
+    finally:
+        sock.close()
+        end_time = time.time()
+        duration = end_time - start_time
+        return {"success": success, "duration": duration, "bytes_transferred": total_bytes}
+
+def list_probe(stop_event, latencies):
+    # mengukur latensi LIST selama transfer besar berjalan di worker lain
+    while not stop_event.wait(LIST_PROBE_INTERVAL):
+        start = time.time()
+        hasil = send_command("LIST")
+        if hasil.get('status') == 'OK':
+            latencies.append(time.time() - start)
+
+def run_client_test(operation_type, file_size_mb, client_pool_type, num_client_workers, protocol='text',
+                    compress=False, compress_level=compression.DEFAULT_LEVEL, probe_list=False):
+    logging.warning(f"Client stress test dimulai: Operasi={operation_type}, Volume={file_size_mb}MB, ClientPool={client_pool_type}, Workers={num_client_workers}, Protokol={protocol}, Kompresi={compress}")
+    if compress and protocol != 'text':
+        logging.warning(f"--compress hanya berlaku untuk protokol text, diabaikan untuk protokol {protocol}")
+        compress = False
     
     successful_workers = 0
     failed_workers = 0
@@ -140,13 +333,17 @@ def run_client_test(operation_type, file_size_mb, client_pool_type, num_client_w
     if operation_type == 'download':
         source_filename = f"dummy_download_{file_size_mb}MB.txt"
         remote_filename_on_server = source_filename 
-        task_func = download_file_task
+        task_func = {'v2': download_file_task_v2, 'json': download_file_task_json}.get(protocol, download_file_task)
         task_args_list = [(remote_filename_on_server,) for _ in range(num_client_workers)]
+        if compress:
+            task_args_list = [args + (True, compress_level) for args in task_args_list]
     elif operation_type == 'upload':
         local_upload_source_path = os.path.join(UPLOAD_SOURCE_DIR, f"dummy_upload_{file_size_mb}MB.txt")
-        task_func = upload_file_task
+        task_func = upload_file_task_v2 if protocol == 'v2' else upload_file_task
         task_args_list = [(local_upload_source_path, f"uploaded_dummy_{file_size_mb}MB_{int(time.time() * 1000)}_{i}.txt")
                           for i in range(num_client_workers)]
+        if compress:
+            task_args_list = [args + (True, compress_level) for args in task_args_list]
     else:
         logging.error(f"Operasi '{operation_type}' tidak didukung.")
         results = {
@@ -159,6 +356,13 @@ def run_client_test(operation_type, file_size_mb, client_pool_type, num_client_w
         print(json.dumps(results)) 
         return
 
+    probe_stop = threading.Event()
+    probe_latencies = []
+    probe_thread = None
+    if probe_list:
+        probe_thread = threading.Thread(target=list_probe, args=(probe_stop, probe_latencies), daemon=True)
+        probe_thread.start()
+
     futures = []
     with Executor(max_workers=num_client_workers) as executor:
         for args in task_args_list:
@@ -177,6 +381,10 @@ def run_client_test(operation_type, file_size_mb, client_pool_type, num_client_w
                 logging.error(f"Exception from worker task: {e}")
                 failed_workers += 1
 
+    if probe_thread is not None:
+        probe_stop.set()
+        probe_thread.join()
+
     avg_duration_per_successful_worker = (total_duration_sum / successful_workers) if successful_workers > 0 else 0
     avg_throughput_per_successful_worker = (total_bytes_sum / total_duration_sum) if total_duration_sum > 0 else 0
     
@@ -186,6 +394,10 @@ def run_client_test(operation_type, file_size_mb, client_pool_type, num_client_w
         "successful_client_workers": successful_workers,
         "failed_client_workers": failed_workers
     }
+    if probe_list:
+        results["list_probe_count"] = len(probe_latencies)
+        results["list_probe_avg_ms"] = (sum(probe_latencies) / len(probe_latencies) * 1000) if probe_latencies else 0
+        results["list_probe_max_ms"] = max(probe_latencies) * 1000 if probe_latencies else 0
     
     print(json.dumps(results))
     logging.warning(f"Client stress test selesai. Hasil: {json.dumps(results)}")
@@ -203,6 +415,15 @@ if __name__ == '__main__':
                         help="Tipe pool untuk worker client: 'thread' atau 'process'. Default: 'thread'")
     parser.add_argument('--num_client_workers', type=int, default=1,
                         help="Jumlah worker client dalam pool yang akan melakukan operasi. Default: 1")
+    parser.add_argument('--protocol', type=str, default='text',
+                        choices=['text', 'json', 'v2'],
+                        help="Protokol yang digunakan: 'text' (GETSTREAM/UPLOAD streaming), 'json' (GET base64 dalam JSON) atau 'v2' (biner). Default: 'text'")
+    parser.add_argument('--compress', action='store_true',
+                        help="Gunakan GETZ/UPLOADZ (payload dikompresi zlib, kecuali .jpg/.pdf) pada protokol 'text'")
+    parser.add_argument('--compress_level', type=int, default=compression.DEFAULT_LEVEL,
+                        help=f"Level kompresi zlib 1-9. Default: {compression.DEFAULT_LEVEL}")
+    parser.add_argument('--probe_list', action='store_true',
+                        help=f"Kirim LIST setiap {LIST_PROBE_INTERVAL}s selama test dan laporkan latensinya")
     
     args = parser.parse_args()
 
@@ -210,5 +431,9 @@ if __name__ == '__main__':
         operation_type=args.operation,
         file_size_mb=args.volume,
         client_pool_type=args.client_pool_type,
-        num_client_workers=args.num_client_workers
+        num_client_workers=args.num_client_workers,
+        protocol=args.protocol,
+        compress=args.compress,
+        compress_level=args.compress_level,
+        probe_list=args.probe_list
     )
\ No newline at end of file
@@ -0,0 +1,84 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import unittest
+
+from framing import FrameReader
+
+"""
+* header UPLOADZ yang tidak valid (nama file kosong, jenis kompresi tidak
+dikenal) harus dijawab dengan respons ERROR standar sebelum koneksi
+ditutup, baik pada mode thread maupun asyncio
+
+* server dijalankan sebagai proses terpisah pada port bebas, sama seperti
+saat dipakai oleh client sungguhan
+"""
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+START_TIMEOUT = 10
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class UploadzHeaderTest:
+    pool_type = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.port = free_port()
+        cls.server = subprocess.Popen([sys.executable, os.path.join(SCRIPT_DIR, 'file_server.py'),
+                                       '--pool_type', cls.pool_type, '--port', str(cls.port)],
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        batas = time.monotonic() + START_TIMEOUT
+        while time.monotonic() < batas:
+            try:
+                socket.create_connection(('127.0.0.1', cls.port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.1)
+        cls.tearDownClass()
+        raise RuntimeError(f"server {cls.pool_type} tidak berjalan di port {cls.port}")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.terminate()
+        cls.server.wait()
+
+    def request(self, command):
+        with socket.create_connection(('127.0.0.1', self.port), timeout=5) as sock:
+            sock.sendall((command + "\r\n\r\n").encode())
+            frame = FrameReader(sock).read_frame()
+        self.assertIsNotNone(frame, f"koneksi ditutup tanpa respons untuk {command!r}")
+        return json.loads(frame)
+
+    def test_unknown_compression(self):
+        hasil = self.request("UPLOADZ x.txt bogus")
+        self.assertEqual(hasil['status'], 'ERROR')
+        self.assertIn('bogus', hasil['data'])
+
+    def test_missing_filename(self):
+        hasil = self.request("UPLOADZ ")
+        self.assertEqual(hasil['status'], 'ERROR')
+
+    def test_server_still_serves(self):
+        self.request("UPLOADZ x.txt bogus")
+        self.assertEqual(self.request("LIST")['status'], 'OK')
+
+
+class ThreadUploadzHeaderTest(UploadzHeaderTest, unittest.TestCase):
+    pool_type = 'thread'
+
+
+class AsyncioUploadzHeaderTest(UploadzHeaderTest, unittest.TestCase):
+    pool_type = 'asyncio'
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,9 @@ import json
 import base64
 import logging
 import os 
+
+from framing import FrameReader
+
 server_address=('172.16.16.101',6666) 
 
 def send_command(command_str=""):
@@ -16,19 +19,11 @@ def send_command(command_str=""):
         command_to_send = (command_str + "\r\n\r\n").encode() 
         sock.sendall(command_to_send)
         
-        data_received=""
-        while True:
-            data = sock.recv(4096) 
-            if data:
-                data_received += data.decode()
-                if "\r\n\r\n" in data_received:
-                    break
-            else:
-                break
-
-        json_data = data_received.split("\r\n\r\n")[0]
+        reader = FrameReader(sock)
+        frame = reader.read_frame()
+        data_received = (frame if frame is not None else bytes(reader.buffer)).decode()
 
-        hasil = json.loads(json_data)
+        hasil = json.loads(data_received)
         logging.warning("data received from server:")
         return hasil
     except json.JSONDecodeError as e:
@@ -3,10 +3,13 @@ import json
 import base64
 from glob import glob
 
+from file_cache import FileCache, DEFAULT_MAX_BYTES
+
 
 class FileInterface:
-    def __init__(self):
+    def __init__(self, cache_max_bytes=DEFAULT_MAX_BYTES):
         os.chdir('files/')
+        self.cache = FileCache(cache_max_bytes)
 
     def list(self,params=[]):
         try:
@@ -20,8 +23,12 @@ class FileInterface:
             filename = params[0]
             if (filename == ''):
                 return None
-            fp = open(f"{filename}",'rb')
-            isifile = base64.b64encode(fp.read()).decode()
+            with open(f"{filename}",'rb') as fp:
+                key = self.cache.key_for(filename, os.fstat(fp.fileno()))
+                isifile = self.cache.get(key)
+                if isifile is None:
+                    isifile = base64.b64encode(fp.read()).decode()
+                    self.cache.put(key, isifile)
             return dict(status='OK',data_namafile=filename,data_file=isifile)
         except Exception as e:
             return dict(status='ERROR',data=str(e))
@@ -36,6 +43,7 @@ class FileInterface:
             decoded_content = base64.b64decode(encoded_content)
             with open(f"{filename}", 'wb+') as fp:
                 fp.write(decoded_content)
+            self.cache.invalidate(filename)
             return dict(status='OK', data=f"File {filename} berhasil diupload")
         except IndexError:
             return dict(status='ERROR', data='Format UPLOAD: UPLOAD <nama_file> <base64_content>')
@@ -50,6 +58,7 @@ class FileInterface:
 
             if os.path.exists(f"{filename}"):
                 os.remove(f"{filename}")
+                self.cache.invalidate(filename)
                 return dict(status='OK', data=f"File {filename} berhasil dihapus")
             else:
                 return dict(status='ERROR', data=f"File {filename} tidak ditemukan")
@@ -58,6 +67,10 @@ class FileInterface:
         except Exception as e:
             return dict(status='ERROR', data=f"Gagal menghapus file: {str(e)}")
 
+    def stats(self, params=[]):
+        # counter cache isi file GET sejak server dijalankan
+        return dict(status='OK', data=self.cache.stats())
+
 if __name__=='__main__':
     f = FileInterface()
     print(f.list())
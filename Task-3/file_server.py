@@ -4,9 +4,12 @@ import threading
 import logging
 import time
 import sys
+import argparse
 
 
 from file_protocol import  FileProtocol
+from framing import FrameReader
+from file_cache import DEFAULT_MAX_BYTES
 fp = FileProtocol()
 
 
@@ -17,22 +20,16 @@ class ProcessTheClient(threading.Thread):
         threading.Thread.__init__(self)
 
     def run(self):
-        data_received = ""
+        reader = FrameReader(self.connection)
         while True:
-            data = self.connection.recv(4096)
-            if data:
-                data_received += data.decode()
-                if "\r\n\r\n" in data_received:
-                    command_str = data_received.split("\r\n\r\n", 1)[0]
-                    
-                    # Memproses perintah
-                    hasil = fp.proses_string(command_str)
-                    hasil=hasil+"\r\n\r\n"
-                    self.connection.sendall(hasil.encode())
-                    
-                    data_received = data_received.split("\r\n\r\n", 1)[1] if len(data_received.split("\r\n\r\n", 1)) > 1 else ""
-            else:
+            frame = reader.read_frame()
+            if frame is None:
                 break
+
+            # Memproses perintah
+            hasil = fp.proses_string(frame.decode())
+            hasil=hasil+"\r\n\r\n"
+            self.connection.sendall(hasil.encode())
         self.connection.close()
 
 
@@ -58,6 +55,12 @@ class Server(threading.Thread):
 
 
 def main():
+    parser = argparse.ArgumentParser(description="File server dengan satu thread per client.")
+    parser.add_argument('--cache_mb', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help=f"Batas ukuran cache isi file GET (MB), 0 untuk mematikan. Default: {DEFAULT_MAX_BYTES // (1024 * 1024)}")
+    args = parser.parse_args()
+    fp.file.cache.set_max_bytes(args.cache_mb * 1024 * 1024)
+
     svr = Server(ipaddress='0.0.0.0',port=6667)
     svr.start()
 
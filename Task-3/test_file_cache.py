@@ -0,0 +1,52 @@
+import json
+import os
+import unittest
+
+from file_cache import FileCache
+from file_protocol import FileProtocol
+
+"""
+* counter hits/misses/evictions FileCache harus bergerak sesuai pemakaian
+cache, dan bisa dibaca client lewat request STATS
+"""
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class FileCacheCounterTest(unittest.TestCase):
+    def test_hit_miss_eviction(self):
+        cache = FileCache(max_bytes=10)
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', 'x' * 6)
+        self.assertEqual(cache.get('a'), 'x' * 6)
+        # entry kedua melewati batas 10 byte sehingga 'a' dikeluarkan
+        cache.put('b', 'y' * 6)
+        self.assertIsNone(cache.get('a'))
+
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (1, 2, 1))
+        self.assertEqual((stats['entries'], stats['bytes']), (1, 6))
+
+
+class StatsRequestTest(unittest.TestCase):
+    def setUp(self):
+        # FileInterface pindah ke direktori files/ relatif terhadap direktori kerja
+        self.cwd = os.getcwd()
+        os.chdir(SCRIPT_DIR)
+        self.fp = FileProtocol()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def test_stats_reports_get_counters(self):
+        for _ in range(3):
+            self.assertEqual(json.loads(self.fp.proses_string("GET pokijan.jpg"))['status'], 'OK')
+
+        hasil = json.loads(self.fp.proses_string("STATS"))
+        self.assertEqual(hasil['status'], 'OK')
+        self.assertEqual((hasil['data']['hits'], hasil['data']['misses']), (2, 1))
+        self.assertEqual(hasil['data']['entries'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import threading
+
+"""
+* AdmissionControl membatasi jumlah koneksi yang sedang dilayani atau
+menunggu di antrean executor: kapasitas = jumlah worker + panjang antrean.
+Koneksi yang datang saat kapasitas penuh langsung dijawab 503 Service
+Unavailable alih-alih menumpuk di antrean executor yang tidak terbatas,
+sehingga latensi koneksi yang diterima tetap terkendali
+
+* counter admitted/shed dicetak server untuk memantau beban
+"""
+
+
+class AdmissionControl:
+    def __init__(self, max_workers, max_queue):
+        self.capacity = max_workers + max_queue
+        self.lock = threading.Lock()
+        self.in_system = 0
+        self.admitted = 0
+        self.shed = 0
+
+    def try_admit(self):
+        with self.lock:
+            if self.in_system >= self.capacity:
+                self.shed += 1
+                return False
+            self.in_system += 1
+            self.admitted += 1
+            return True
+
+    def release(self, *args):
+        # bisa dipasang langsung sebagai done callback sebuah future
+        with self.lock:
+            self.in_system -= 1
+
+    def stats(self):
+        with self.lock:
+            return dict(in_system=self.in_system, capacity=self.capacity,
+                        admitted=self.admitted, shed=self.shed)
@@ -0,0 +1,102 @@
+import argparse
+import json
+import sys
+from collections import defaultdict
+
+"""
+ringkasan file trace yang ditulis server_thread_pool_http.py dan
+server_process_pool_http.py dengan --trace FILE.
+
+setiap baris adalah satu request: command (method dan route, misalnya
+"GET file"), status, bytes_in, bytes_out, total dan phases (durasi per
+fase dalam detik). Request dikelompokkan per command dan
+per ukuran payload (yang terbesar dari bytes_in dan bytes_out), lalu untuk
+setiap kelompok ditampilkan rata-rata durasi setiap fase beserta porsinya
+dari total. Kolom 'lainnya' adalah sisa total yang tidak masuk fase mana
+pun (menunggu lock, membuat header, /metrics, dan sebagainya)
+"""
+
+PHASES = ('recv', 'parse', 'decode', 'disk', 'encode', 'json', 'send')
+# batas atas kelompok ukuran payload dalam byte
+SIZE_BUCKETS = ((1024 * 1024, '<1MB'), (10 * 1024 * 1024, '1-10MB'),
+                (100 * 1024 * 1024, '10-100MB'), (float('inf'), '>=100MB'))
+
+
+def size_bucket(record):
+    size = max(record.get('bytes_in', 0), record.get('bytes_out', 0))
+    for bound, label in SIZE_BUCKETS:
+        if size < bound:
+            return label
+
+
+def load(paths):
+    records, rusak = [], 0
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    rusak += 1
+    if rusak:
+        print(f"{rusak} baris tidak valid dilewati", file=sys.stderr)
+    return records
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize(records):
+    groups = defaultdict(list)
+    for record in records:
+        groups[record.get('command', 'other'), size_bucket(record)].append(record)
+
+    order = {label: i for i, (_, label) in enumerate(SIZE_BUCKETS)}
+    rows = []
+    for (command, bucket), items in sorted(groups.items(), key=lambda item: (item[0][0], order[item[0][1]])):
+        totals = [item['total'] for item in items]
+        total = sum(totals)
+        phases = {name: sum(item['phases'].get(name, 0.0) for item in items) for name in PHASES}
+        phases['lainnya'] = max(0.0, total - sum(phases.values()))
+        rows.append(dict(command=command, size=bucket, count=len(items),
+                         errors=sum(1 for item in items if item.get('error')),
+                         avg_ms=total * 1000 / len(items), p99_ms=percentile(totals, 0.99) * 1000,
+                         phases={name: (seconds * 1000 / len(items), seconds * 100 / total if total else 0.0)
+                                 for name, seconds in phases.items()}))
+    return rows
+
+
+def print_table(rows):
+    columns = PHASES + ('lainnya',)
+    print(f"{'command':<14}{'ukuran':>10}{'n':>7}{'error':>7}{'avg ms':>10}{'p99 ms':>10}"
+          + "".join(f"{name:>16}" for name in columns))
+    for row in rows:
+        print(f"{row['command']:<14}{row['size']:>10}{row['count']:>7}{row['errors']:>7}"
+              f"{row['avg_ms']:>10.2f}{row['p99_ms']:>10.2f}"
+              + "".join(f"{row['phases'][name][0]:>9.2f} {row['phases'][name][1]:>4.0f}%" for name in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ringkas file trace per fase, per command dan ukuran payload.")
+    parser.add_argument('files', nargs='+', help="File trace (JSON lines) hasil --trace")
+    parser.add_argument('--command', default=None, help="Hanya tampilkan command ini, misalnya 'GET file'")
+    parser.add_argument('--json', action='store_true', help="Cetak ringkasan sebagai JSON alih-alih tabel")
+    args = parser.parse_args()
+
+    records = load(args.files)
+    if args.command:
+        records = [record for record in records if record.get('command') == args.command]
+    if not records:
+        print("Tidak ada request di file trace.")
+        return
+    rows = summarize(records)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
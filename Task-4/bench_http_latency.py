@@ -0,0 +1,60 @@
+import argparse
+import socket
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+"""
+benchmark latensi request HTTP ke server Task-4 yang sedang berjalan.
+Setiap client membuka koneksi baru per request (Connection: close) agar
+biaya accept + dispatch ke worker ikut terukur, lalu dilaporkan
+throughput serta latensi p50/p90/p99/maks.
+
+contoh:
+  python bench_http_latency.py --port 8889 --clients 50 --requests 200
+"""
+
+
+def one_request(host, port, path):
+    start = time.perf_counter()
+    with socket.create_connection((host, port), timeout=10) as sock:
+        sock.sendall(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+        while sock.recv(65536):
+            pass
+    return time.perf_counter() - start
+
+
+def client(host, port, path, count):
+    return [one_request(host, port, path) for _ in range(count)]
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark latensi request HTTP.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8889)
+    parser.add_argument('--path', default='/list')
+    parser.add_argument('--clients', type=int, default=50,
+                        help="Jumlah client bersamaan. Default: 50")
+    parser.add_argument('--requests', type=int, default=100,
+                        help="Jumlah request per client. Default: 100")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.clients) as executor:
+        futures = [executor.submit(client, args.host, args.port, args.path, args.requests)
+                   for _ in range(args.clients)]
+        latencies = sorted(lat for f in futures for lat in f.result())
+    duration = time.perf_counter() - start
+
+    print(f"request     : {len(latencies)} dalam {duration:.2f}s ({len(latencies) / duration:.0f} req/s)")
+    print(f"latensi (ms): p50 {percentile(latencies, 50) * 1000:.2f}  p90 {percentile(latencies, 90) * 1000:.2f}  "
+          f"p99 {percentile(latencies, 99) * 1000:.2f}  maks {latencies[-1] * 1000:.2f}  "
+          f"rata-rata {statistics.mean(latencies) * 1000:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import argparse
+import socket
+import threading
+import time
+
+from http_parser import RequestReader
+
+"""
+micro-benchmark biaya menerima dan mem-parse request HTTP lewat
+socketpair lokal, untuk request kecil (GET tanpa body, dikirim berulang
+pada satu koneksi keep-alive) dan request besar (POST dengan body N MB).
+
+- parser : RequestReader (recv 64 KB ke bytearray, parse header dari bytes,
+           body tetap bytes)
+- legacy : pola lama server Task-4, header dibaca dengan recv(1) dan
+           `headers += data`, body dengan recv 1 KB lalu seluruh request
+           di-decode ke str dan di-split ulang (body dengan `body += data`
+           kuadratik, hanya dijalankan sampai --legacy_max_mb)
+"""
+
+SMALL_REQUEST = (b"GET /list HTTP/1.1\r\nHost: localhost:8885\r\n"
+                 b"User-Agent: bench\r\nAccept: */*\r\n\r\n")
+BODY_SIZES_MB = [1, 10, 50]
+SEND_CHUNK = 64 * 1024
+
+
+def sender(sock, payload):
+    view = memoryview(payload)
+    for i in range(0, len(view), SEND_CHUNK):
+        sock.sendall(view[i:i + SEND_CHUNK])
+
+
+def receive_parser(sock, count):
+    reader = RequestReader(sock)
+    total = 0
+    for _ in range(count):
+        request = reader.read_request()
+        total += len(request.body)
+    return total
+
+
+def receive_legacy(sock, count):
+    total = 0
+    for _ in range(count):
+        headers = b""
+        while not headers.endswith(b'\r\n\r\n'):
+            data = sock.recv(1)
+            if not data:
+                break
+            headers += data
+
+        content_length = 0
+        for line in headers.decode('utf-8').split('\r\n'):
+            if line.lower().startswith('content-length:'):
+                content_length = int(line.split(':')[1].strip())
+                break
+
+        body = b""
+        while len(body) < content_length:
+            data = sock.recv(min(1024, content_length - len(body)))
+            if not data:
+                break
+            body += data
+
+        rcv = (headers + body).decode('utf-8')
+        requests = rcv.split("\r\n")
+        body_start = requests.index("") + 1
+        total += len("\r\n".join(requests[body_start:]))
+    return total
+
+
+def measure(receive_func, payload, count, expected):
+    a, b = socket.socketpair()
+    t = threading.Thread(target=sender, args=(a, payload))
+    start = time.perf_counter()
+    t.start()
+    received = receive_func(b, count)
+    duration = time.perf_counter() - start
+    t.join()
+    a.close()
+    b.close()
+    assert received == expected
+    return duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parser request HTTP vs pola recv(1) lama.")
+    parser.add_argument('--small_count', type=int, default=10000,
+                        help="Jumlah request kecil per koneksi. Default: 10000")
+    parser.add_argument('--sizes', type=int, nargs='+', default=BODY_SIZES_MB,
+                        help="Ukuran body request besar dalam MB. Default: 1 10 50")
+    parser.add_argument('--legacy_max_mb', type=int, default=10,
+                        help="Ukuran body terbesar untuk pola lama (kuadratik). Default: 10")
+    args = parser.parse_args()
+
+    print(f"{'metode':<8} {'request':<16} {'waktu (s)':>10} {'us/req':>10} {'ms/MB':>8}")
+
+    payload = SMALL_REQUEST * args.small_count
+    for name, func in (('parser', receive_parser), ('legacy', receive_legacy)):
+        duration = measure(func, payload, args.small_count, 0)
+        label = f"{args.small_count}x kecil"
+        print(f"{name:<8} {label:<16} {duration:>10.4f} {duration * 1e6 / args.small_count:>10.1f} {'-':>8}")
+
+    for size_mb in args.sizes:
+        # body berupa karakter base64 agar menyerupai upload lewat POST /upload
+        body = b"QUJD" * (size_mb * 1024 * 1024 // 4)
+        payload = (b"POST /upload HTTP/1.1\r\nX-Filename: bench.bin\r\n"
+                   b"Content-Length: %d\r\n\r\n" % len(body)) + body
+        for name, func in (('parser', receive_parser), ('legacy', receive_legacy)):
+            if name == 'legacy' and size_mb > args.legacy_max_mb:
+                continue
+            duration = measure(func, payload, 1, len(body))
+            label = f"body {size_mb} MB"
+            print(f"{name:<8} {label:<16} {duration:>10.4f} {duration * 1e6:>10.1f} {duration * 1000 / size_mb:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import argparse
+import os
+import socket
+import tempfile
+import threading
+import time
+
+from http import HttpServer, send_response
+from http_parser import RequestReader
+from metrics import HttpMetrics
+
+"""
+micro-benchmark biaya instrumentasi /metrics pada jalur request.
+
+- observe : biaya satu HttpMetrics.observe (lock + 4 increment ke shard),
+            dengan 1 thread dan dengan --threads thread yang berebut lock
+- request : satu request GET /list kecil pada koneksi keep-alive lewat
+            socketpair lokal (parse, HttpServer.proses, kirim respons),
+            dibandingkan tanpa dan dengan HttpServer.record; selisihnya
+            adalah overhead per request yang dialami server
+- render  : biaya membuat teks /metrics dengan --shards shard
+"""
+
+SMALL_REQUEST = b"GET /list HTTP/1.1\r\nHost: localhost\r\nUser-Agent: bench\r\n\r\n"
+
+
+def bench_observe(metrics, count):
+    start = time.perf_counter()
+    for i in range(count):
+        metrics.observe('GET', '/list', 200, 0.0004, 180)
+    return time.perf_counter() - start
+
+
+def bench_observe_threads(metrics, count, threads):
+    workers = [threading.Thread(target=bench_observe, args=(metrics, count)) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start
+
+
+def drain(sock, stop):
+    while not stop.is_set():
+        try:
+            if not sock.recv(1024 * 1024):
+                return
+        except OSError:
+            return
+
+
+def bench_requests(httpserver, count, record):
+    a, b = socket.socketpair()
+    stop = threading.Event()
+    reader_thread = threading.Thread(target=drain, args=(a, stop), daemon=True)
+    reader_thread.start()
+    sender = threading.Thread(target=a.sendall, args=(SMALL_REQUEST * count,))
+    sender.start()
+
+    reader = RequestReader(b)
+    start = time.perf_counter()
+    for _ in range(count):
+        request = reader.read_head()
+        mulai = time.perf_counter()
+        reader.read_body(request)
+        hasil = httpserver.proses(request, allow_keep_alive=True)
+        sent = send_response(b, hasil)
+        if record:
+            httpserver.record(request, hasil, time.perf_counter() - mulai, sent)
+    duration = time.perf_counter() - start
+
+    sender.join()
+    stop.set()
+    b.close()
+    a.close()
+    return duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark overhead metrics HTTP pada jalur request.")
+    parser.add_argument('--count', type=int, default=200000,
+                        help="Jumlah panggilan observe per thread. Default: 200000")
+    parser.add_argument('--threads', type=int, default=8,
+                        help="Jumlah thread untuk pengukuran observe bersamaan. Default: 8")
+    parser.add_argument('--requests', type=int, default=20000,
+                        help="Jumlah request GET /list per pengukuran. Default: 20000")
+    parser.add_argument('--shards', type=int, default=5,
+                        help="Jumlah shard untuk pengukuran render. Default: 5")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="Pengulangan tiap pengukuran, diambil yang tercepat. Default: 3")
+    args = parser.parse_args()
+
+    metrics = HttpMetrics()
+    duration = min(bench_observe(metrics, args.count) for _ in range(args.repeat))
+    print(f"observe 1 thread        : {duration * 1e9 / args.count:8.0f} ns/panggilan")
+    duration = min(bench_observe_threads(metrics, args.count, args.threads) for _ in range(args.repeat))
+    print(f"observe {args.threads} thread        : {duration * 1e9 / (args.count * args.threads):8.0f} ns/panggilan (total throughput)")
+
+    # HttpServer membuat direktori upload 'public' di direktori kerja
+    os.chdir(tempfile.mkdtemp(prefix='bench-metrics-'))
+    httpserver = HttpServer()
+    bench_requests(httpserver, 1000, True)
+    tanpa, dengan = [], []
+    for _ in range(args.repeat):
+        tanpa.append(bench_requests(httpserver, args.requests, False))
+        dengan.append(bench_requests(httpserver, args.requests, True))
+    tanpa_us = min(tanpa) * 1e6 / args.requests
+    dengan_us = min(dengan) * 1e6 / args.requests
+    print(f"request tanpa metrics   : {tanpa_us:8.2f} us/request")
+    print(f"request dengan metrics  : {dengan_us:8.2f} us/request "
+          f"(overhead {dengan_us - tanpa_us:.2f} us, {(dengan_us - tanpa_us) * 100 / tanpa_us:.1f}%)")
+
+    sharded = HttpMetrics(shards=args.shards)
+    for shard in range(args.shards):
+        sharded.use_shard(shard)
+        bench_observe(sharded, 1000)
+    start = time.perf_counter()
+    text = sharded.render()
+    print(f"render {args.shards} shard          : {(time.perf_counter() - start) * 1000:8.2f} ms ({len(text)} byte)")
+
+
+if __name__ == "__main__":
+    main()
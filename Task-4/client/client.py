@@ -18,24 +18,84 @@ def print_response_body(body_str):
     except json.JSONDecodeError:
         print(body_str)
 
+class KeepAliveConnection:
+    """
+    satu koneksi TCP yang dipakai ulang untuk banyak request HTTP/1.1.
+    Respons dibaca berdasarkan Content-Length sehingga client tidak perlu
+    menunggu server menutup koneksi, dan koneksi dibuka ulang otomatis bila
+    server sudah menutupnya (idle timeout / batas request per koneksi)
+    """
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.sock = None
+
+    def close(self):
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+    def request(self, request_str):
+        for attempt in range(2):
+            if self.sock is None:
+                self.sock = socket.create_connection((self.host, self.port), timeout=5)
+            try:
+                self.sock.sendall(request_str.encode('utf-8'))
+                return self.read_response()
+            except (ConnectionError, socket.timeout):
+                self.close()
+                if attempt == 1:
+                    raise
+
+    def request_file(self, header_str, fp, size):
+        # header lalu isi file mentah dikirim langsung dengan sendfile
+        for attempt in range(2):
+            if self.sock is None:
+                self.sock = socket.create_connection((self.host, self.port), timeout=5)
+            try:
+                self.sock.sendall(header_str.encode('utf-8'))
+                fp.seek(0)
+                self.sock.sendfile(fp, 0, size)
+                return self.read_response()
+            except (ConnectionError, socket.timeout):
+                self.close()
+                if attempt == 1:
+                    raise
+
+    def read_response(self):
+        response_bytes = b''
+        while b'\r\n\r\n' not in response_bytes:
+            data = self.sock.recv(2048)
+            if not data:
+                raise ConnectionError("Koneksi ditutup server")
+            response_bytes += data
+        header_part, _, body = response_bytes.partition(b'\r\n\r\n')
+
+        content_length = 0
+        close_after = False
+        for line in header_part.decode('utf-8').split('\r\n')[1:]:
+            name, _, value = line.partition(':')
+            if name.strip().lower() == 'content-length':
+                content_length = int(value.strip())
+            elif name.strip().lower() == 'connection' and value.strip().lower() == 'close':
+                close_after = True
+
+        while len(body) < content_length:
+            data = self.sock.recv(min(65536, content_length - len(body)))
+            if not data:
+                break
+            body += data
+        if close_after:
+            self.close()
+        return (header_part + b'\r\n\r\n' + body).decode('utf-8', errors='replace')
+
+connections = {}
+
 def send_request(host, port, request_str):
     try:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-            sock.settimeout(5)
-            sock.connect((host, port))
-            sock.sendall(request_str.encode('utf-8'))
-            
-            response_bytes = b''
-            while True:
-                try:
-                    data = sock.recv(2048)
-                    if not data:
-                        break
-                    response_bytes += data
-                except socket.timeout:
-                    break
-            
-            return response_bytes.decode('utf-8')
+        if (host, port) not in connections:
+            connections[(host, port)] = KeepAliveConnection(host, port)
+        return connections[(host, port)].request(request_str)
     except ConnectionRefusedError:
         return "KONEKSI GAGAL: Pastikan server sudah berjalan."
     except Exception as e:
@@ -43,7 +103,7 @@ def send_request(host, port, request_str):
 
 def list_files(host, port):
     print("\n[INFO] Meminta daftar file dari endpoint /list...")
-    request = "GET /list HTTP/1.0\r\n\r\n"
+    request = f"GET /list HTTP/1.1\r\nHost: {host}\r\n\r\n"
     response = send_request(host, port, request)
     header, body = parse_response(response)
     print("Respons dari Server")
@@ -61,7 +121,8 @@ def upload_file(host, port, filepath):
         
         body = file_content_base64
         headers = [
-            "POST /upload HTTP/1.0",
+            "POST /upload HTTP/1.1",
+            f"Host: {host}",
             f"X-Filename: {filename}",
             f"Content-Length: {len(body)}",
         ]
@@ -75,9 +136,38 @@ def upload_file(host, port, filepath):
     except FileNotFoundError:
         print(f"ERROR: File '{filepath}' tidak ditemukan di client.")
 
+def upload_file_raw(host, port, filepath):
+    # upload biner tanpa base64 lewat PUT /<nama file>, body dialirkan dari disk
+    filename = os.path.basename(filepath)
+    print(f"[INFO] Mengirim file '{filename}' (biner) ke endpoint PUT /{filename}...")
+
+    try:
+        with open(filepath, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            headers = [
+                f"PUT /{filename} HTTP/1.1",
+                f"Host: {host}",
+                "Content-Type: application/octet-stream",
+                f"Content-Length: {size}",
+            ]
+            request = "\r\n".join(headers) + "\r\n\r\n"
+            if (host, port) not in connections:
+                connections[(host, port)] = KeepAliveConnection(host, port)
+            try:
+                response = connections[(host, port)].request_file(request, f, size)
+            except ConnectionRefusedError:
+                response = "KONEKSI GAGAL: Pastikan server sudah berjalan."
+            except Exception as e:
+                response = f"Terjadi Error: {str(e)}"
+        header, body = parse_response(response)
+        print("Respons dari Server")
+        print_response_body(body)
+    except FileNotFoundError:
+        print(f"ERROR: File '{filepath}' tidak ditemukan di client.")
+
 def delete_file(host, port, filename):
     print(f"[INFO] Mengirim permintaan hapus untuk '{filename}'...")
-    request = f"DELETE /delete/{filename} HTTP/1.0\r\n\r\n"
+    request = f"DELETE /delete/{filename} HTTP/1.1\r\nHost: {host}\r\n\r\n"
     response = send_request(host, port, request)
     header, body = parse_response(response)
     print("Respons dari Server")
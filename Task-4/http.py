@@ -1,15 +1,292 @@
 import sys
 import os
 import os.path
+import stat
 import uuid
 import json
 import base64
-from glob import glob
+import threading
+import tempfile
+import gzip
+import zlib
+import hashlib
+from collections import OrderedDict
+from glob import glob, escape as glob_escape
 from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+
+from file_cache import FileCache
+from singleflight import SingleFlight
+import tracing
+from metrics import HttpMetrics, ROUTES, route_index, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from http_parser import HttpRequest, HttpParseError, parse_request, header_value, MAX_BODY_BYTES
+
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# batas koneksi persistent (HTTP/1.1 keep-alive)
+KEEP_ALIVE_TIMEOUT = 5
+KEEP_ALIVE_MAX_REQUESTS = 100
+
+# file yang lebih kecil dari ini dikirim dari cache memori, yang lebih
+# besar dikirim langsung dari disk dengan sendfile
+SENDFILE_MIN_BYTES = 64 * 1024
+
+# batas ukuran body upload biner (PUT / POST application/octet-stream) yang
+# dialirkan ke UploadSink; body POST base64 dibatasi MAX_BODY_BYTES yang jauh
+# lebih kecil karena ditampung utuh di memori
+MAX_UPLOAD_BYTES = 1024 * 1024 * 1024
+UPLOAD_TMP_PREFIX = '.upload-'
+# mode file hasil upload: 0666 dikurangi umask, seperti open() biasa.
+# umask dibaca sekali saat import karena os.umask hanya bisa dibaca dengan mengubahnya
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+UPLOAD_FILE_MODE = 0o666 & ~_UMASK
+
+# jumlah range maksimum dalam satu header Range; lebih dari ini header
+# diabaikan dan file dikirim utuh
+MAX_RANGES = 16
+
+# jumlah entry validator (ETag / Last-Modified) yang disimpan
+VALIDATOR_CACHE_SIZE = 1024
+
+# respons file bertipe teks dengan ukuran di antara batas ini dikompresi
+# sesuai Accept-Encoding; hasil kompresi disimpan di cache per versi file
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'image/svg+xml')
+COMPRESS_MIN_BYTES = 1024
+# file di atas COMPRESS_MAX_BYTES dikirim apa adanya: kompresi on-the-fly
+# untuk file sebesar itu lebih mahal di CPU daripada bandwidth yang dihemat
+COMPRESS_MAX_BYTES = 256 * 1024 * 1024
+COMPRESS_LEVEL = 6
+# varian sampai batas ini disimpan di cache memori; varian file yang lebih
+# besar dikompresi bertahap ke file di COMPRESSED_DIR lalu dikirim dengan
+# sendfile, sehingga file dummy puluhan/ratusan MB tetap bisa dikompresi
+# tanpa menampung isinya di memori
+COMPRESS_MEMORY_MAX_BYTES = 32 * 1024 * 1024
+COMPRESSED_DIR = '.compressed'
+COMPRESS_READ_SIZE = 1024 * 1024
+
+# saran jeda (detik) untuk client yang ditolak karena antrean server penuh
+BUSY_RETRY_AFTER = 1
+
+class FileResponse:
+    """
+    respons file statis: header sudah berupa bytes, sedangkan body dikirim
+    langsung dari file yang terbuka dengan socket.sendfile (os.sendfile),
+    sehingga isi file tidak pernah disalin ke memori Python.
+    segments berisi (prefix, offset, count); prefix dan trailer dipakai
+    untuk batas bagian multipart/byteranges
+    """
+    def __init__(self, header, fp, offset=0, count=0, segments=None, trailer=b''):
+        self.header = header
+        self.fp = fp
+        self.segments = segments if segments is not None else [(b'', offset, count)]
+        self.trailer = trailer
+
+    @property
+    def size(self):
+        # jumlah byte yang dikirim send()
+        return (len(self.header) + sum(len(prefix) + count for prefix, _, count in self.segments)
+                + len(self.trailer))
+
+    def send(self, connection):
+        connection.sendall(self.header)
+        sent = len(self.header)
+        for prefix, offset, count in self.segments:
+            if prefix:
+                connection.sendall(prefix)
+            if count:
+                connection.sendfile(self.fp, offset, count)
+            sent += len(prefix) + count
+        if self.trailer:
+            connection.sendall(self.trailer)
+        return sent + len(self.trailer)
+
+    def close(self):
+        self.fp.close()
+
+
+def choose_encoding(accept_encoding):
+    """
+    memilih content-coding dari header Accept-Encoding: gzip lalu deflate,
+    None (identity) jika keduanya tidak diterima (tidak ada, atau q=0)
+    """
+    if not accept_encoding:
+        return None
+    qvalues = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qvalues[coding.strip().lower()] = q
+    for coding in ('gzip', 'deflate'):
+        if qvalues.get(coding, qvalues.get('*', 0.0)) > 0:
+            return coding
+    return None
+
+
+def compress_body(data, encoding):
+    if encoding == 'gzip':
+        # mtime=0 agar hasil kompresi (dan ETag varian) deterministik
+        return gzip.compress(data, compresslevel=COMPRESS_LEVEL, mtime=0)
+    return zlib.compress(data, COMPRESS_LEVEL)
+
+
+def compress_stream(src, dst, encoding):
+    # seperti compress_body tetapi per potongan dari file src ke file dst;
+    # wbits 31 menghasilkan format gzip (header dengan mtime 0), bawaan zlib untuk deflate
+    trace = tracing.current()
+    compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 31 if encoding == 'gzip' else zlib.MAX_WBITS)
+    while True:
+        with trace.phase('disk'):
+            data = src.read(COMPRESS_READ_SIZE)
+        if not data:
+            break
+        with trace.phase('encode'):
+            data = compressor.compress(data)
+        with trace.phase('disk'):
+            dst.write(data)
+    with trace.phase('encode'):
+        data = compressor.flush()
+    with trace.phase('disk'):
+        dst.write(data)
+
+
+def parse_byte_ranges(value, size):
+    """
+    mem-parse header Range ("bytes=0-99,200-,-500") untuk file berukuran size.
+    Mengembalikan list (awal, akhir) inklusif yang sudah diurutkan dan
+    digabung, [] jika tidak ada range yang bisa dipenuhi (416), atau None
+    jika header tidak valid sehingga harus diabaikan
+    """
+    unit, _, spec = value.partition('=')
+    if unit.strip().lower() != 'bytes' or not spec.strip():
+        return None
+    parts = spec.split(',')
+    if len(parts) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for part in parts:
+        start_str, sep, end_str = part.strip().partition('-')
+        if not sep:
+            return None
+        try:
+            if start_str == '':
+                # suffix range: N byte terakhir
+                length = int(end_str)
+                start, end = max(0, size - length), size - 1
+                if length <= 0:
+                    continue
+            else:
+                start = int(start_str)
+                end = int(end_str) if end_str else size - 1
+                if end_str and end < start:
+                    return None
+                end = min(end, size - 1)
+        except ValueError:
+            return None
+        if start >= size:
+            continue
+        ranges.append((start, end))
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class UploadSink:
+    """
+    menulis body upload biner per potongan ke file sementara di direktori
+    upload, lalu me-rename-nya ke nama tujuan saat commit sehingga client
+    lain tidak pernah melihat file yang setengah jadi
+    """
+    def __init__(self, upload_dir, file_path):
+        self.file_path = file_path
+        self.bytes_written = 0
+        fd, self.tmp_path = tempfile.mkstemp(prefix=UPLOAD_TMP_PREFIX, dir=upload_dir)
+        # mode file sama dengan open() biasa, bukan 0600 bawaan mkstemp
+        os.fchmod(fd, UPLOAD_FILE_MODE)
+        self.fp = os.fdopen(fd, 'wb')
+
+    def write(self, data):
+        with tracing.current().phase('disk'):
+            self.fp.write(data)
+        self.bytes_written += len(data)
+
+    def commit(self):
+        self.fp.close()
+        os.replace(self.tmp_path, self.file_path)
+
+    def abort(self):
+        self.fp.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def send_response(connection, hasil):
+    # mengirim hasil HttpServer.proses: bytes biasa atau FileResponse
+    if isinstance(hasil, FileResponse):
+        try:
+            return hasil.send(connection)
+        finally:
+            hasil.close()
+    connection.sendall(hasil)
+    return len(hasil)
+
+
+def busy_response(retry_after=BUSY_RETRY_AFTER):
+    # respons 503 untuk koneksi yang ditolak sebelum request-nya dibaca
+    body = json.dumps(dict(status='BUSY', data='Server sibuk, coba lagi nanti',
+                           retry_after=retry_after)).encode()
+    header = (f"HTTP/1.1 503 Service Unavailable\r\n"
+              f"Date: {formatdate(usegmt=True)}\r\n"
+              f"Connection: close\r\n"
+              f"Server: myserver/1.0\r\n"
+              f"Retry-After: {retry_after}\r\n"
+              f"Content-Type: application/json\r\n"
+              f"Content-Length: {len(body)}\r\n\r\n")
+    return header.encode() + body
+
+
+def reject_busy(connection):
+    # respons kecil ini muat di buffer socket, sehingga send tidak menunggu client.
+    # Mengembalikan jumlah byte yang terkirim
+    try:
+        connection.setblocking(False)
+        return connection.send(busy_response())
+    except OSError:
+        return 0
+    finally:
+        connection.close()
+
 
 class HttpServer:
-    def __init__(self):
+    def __init__(self, cache_max_bytes=CACHE_MAX_BYTES, max_upload_bytes=MAX_UPLOAD_BYTES, metrics=None,
+                 max_body_bytes=MAX_BODY_BYTES):
         self.sessions = {}
+        # server multi-proses memberikan HttpMetrics bersama agar /metrics
+        # menampilkan angka seluruh worker
+        self.metrics = metrics if metrics is not None else HttpMetrics()
+        self.max_upload_bytes = max_upload_bytes
+        # batas body yang ditampung RequestReader di memori (POST base64)
+        self.max_body_bytes = max_body_bytes
+        self.cache = FileCache(cache_max_bytes)
+        # GET bersamaan untuk varian terkompresi yang belum ada cukup mengompresi sekali
+        self.singleflight = SingleFlight()
+        self.validators = OrderedDict()
+        self.validators_lock = threading.Lock()
+        # status keep-alive request yang sedang diproses, per thread karena
+        # satu instance HttpServer dipakai bersama oleh thread pool
+        self.ctx = threading.local()
         self.types = {}
         self.types['.pdf'] = 'application/pdf'
         self.types['.jpg'] = 'image/jpeg'
@@ -19,86 +296,375 @@ class HttpServer:
         self.upload_dir = 'public'
         if not os.path.exists(self.upload_dir):
             os.makedirs(self.upload_dir)
+        # di luar upload_dir agar varian terkompresi tidak ikut dilayani atau di-list
+        self.compressed_dir = COMPRESSED_DIR
+        os.makedirs(self.compressed_dir, exist_ok=True)
 
-    def response(self, kode=404, message='Not Found', messagebody=bytes(), headers={}):
+    def response_headers(self, kode, message, content_length, headers):
         tanggal = datetime.now().strftime('%c')
         resp = []
-        resp.append(f"HTTP/1.0 {kode} {message}\r\n")
+        resp.append(f"HTTP/1.1 {kode} {message}\r\n")
         resp.append(f"Date: {tanggal}\r\n")
-        resp.append("Connection: close\r\n")
+        if self.should_keep_alive():
+            resp.append("Connection: keep-alive\r\n")
+            resp.append(f"Keep-Alive: timeout={KEEP_ALIVE_TIMEOUT}, max={KEEP_ALIVE_MAX_REQUESTS}\r\n")
+        else:
+            resp.append("Connection: close\r\n")
         resp.append("Server: myserver/1.0\r\n")
-        
-        if isinstance(messagebody, str) and messagebody.startswith('{'):
-            headers['Content-Type'] = 'application/json'
-            
-        resp.append(f"Content-Length: {len(messagebody)}\r\n")
+        if content_length is not None:
+            resp.append(f"Content-Length: {content_length}\r\n")
         for kk in headers:
             resp.append(f"{kk}:{headers[kk]}\r\n")
         resp.append("\r\n")
+        return "".join(resp).encode()
 
-        response_headers = "".join(resp)
+    def response(self, kode=404, message='Not Found', messagebody=bytes(), headers={}):
+        if isinstance(messagebody, str) and messagebody.startswith('{'):
+            headers['Content-Type'] = 'application/json'
 
-        if not isinstance(messagebody, bytes):
-            messagebody = messagebody.encode()
+        with tracing.current().phase('encode'):
+            if not isinstance(messagebody, bytes):
+                messagebody = messagebody.encode()
 
-        response = response_headers.encode() + messagebody
+            response = self.response_headers(kode, message, len(messagebody), headers) + messagebody
         return response
 
-    def proses(self, data):
-        requests = data.split("\r\n")
-        baris = requests[0]
+    def start_trace(self, request, address):
+        # command di trace memakai route yang sama dengan label /metrics, misalnya "GET file"
+        return tracing.start(command=f"{request.method} {ROUTES[route_index(request.path)]}",
+                             client=str(address), path=request.path[:120], bytes_in=request.content_length)
 
-        headers = {}
-        body_start_index = -1
-        for i, line in enumerate(requests[1:]):
-            if line == "":
-                body_start_index = i + 2
-                break
-            parts = line.split(":", 1)
-            if len(parts) == 2:
-                headers[parts[0].strip()] = parts[1].strip()
+    def record(self, request, hasil, duration, sent):
+        """
+        mencatat satu respons ke metrics dan menutup trace request-nya.
+        request bernilai None untuk request yang gagal di-parse; status
+        diambil dari status line respons ("HTTP/1.1 200 ...")
+        """
+        header = hasil.header if isinstance(hasil, FileResponse) else hasil
+        method, path = (request.method, request.path) if request is not None else (None, None)
+        status = int(header[9:12])
+        self.metrics.observe(method, path, status, duration, sent)
+        tracing.current().finish(status=status, bytes_out=sent, error=status >= 400)
 
-        body = ""
-        if body_start_index != -1:
-            body = "\r\n".join(requests[body_start_index:])
+    def head_only(self, hasil):
+        # respons HEAD: header yang sama dengan GET tanpa body
+        if isinstance(hasil, FileResponse):
+            hasil.close()
+            return hasil.header
+        header, _, _ = hasil.partition(b"\r\n\r\n")
+        return header + b"\r\n\r\n"
 
+    def file_response(self, kode, message, fp, offset, count, headers={}):
+        header = self.response_headers(kode, message, count, headers)
+        return FileResponse(header, fp, offset, count)
 
-        j = baris.split(" ")
-        try:
-            method = j[0].upper().strip()
-            object_address = j[1].strip()
+    def parse_error_response(self, error):
+        # request yang gagal di-parse selalu diakhiri dengan menutup koneksi
+        self.ctx.keep_alive = False
+        return self.response(error.status, error.reason, str(error), {})
 
-            if method == 'GET':
-                return self.http_get(object_address, headers)
-            elif method == 'POST':
-                return self.http_post(object_address, headers, body)
-            elif method == 'DELETE':
-                return self.http_delete(object_address, headers)
+    def should_keep_alive(self):
+        # True jika respons terakhir di thread ini mengizinkan koneksi tetap terbuka
+        return getattr(self.ctx, 'keep_alive', False)
+
+    def begin_request(self, request, allow_keep_alive=False):
+        # menentukan status keep-alive untuk respons request ini
+        connection_header = request.header('Connection', '').lower()
+        if request.version == 'HTTP/1.1':
+            self.ctx.keep_alive = allow_keep_alive and connection_header != 'close'
+        else:
+            self.ctx.keep_alive = allow_keep_alive and connection_header == 'keep-alive'
+        return self.ctx.keep_alive
+
+    def proses(self, data, allow_keep_alive=False):
+        """
+        memproses satu request, berupa HttpRequest dari RequestReader atau
+        request lengkap dalam bentuk bytes/str. allow_keep_alive diisi True
+        oleh server yang mendukung koneksi persistent; koneksi tetap dibuka
+        jika request HTTP/1.1 tidak meminta 'Connection: close', atau request
+        HTTP/1.0 meminta 'Connection: keep-alive'
+        """
+        self.ctx.keep_alive = False
+        try:
+            if isinstance(data, HttpRequest):
+                request = data
             else:
-                return self.response(400, 'Bad Request', 'Unsupported method', {})
-        except IndexError:
-            return self.response(400, 'Bad Request', 'Malformed request', {})
+                with tracing.current().phase('parse'):
+                    request = parse_request(data)
+        except HttpParseError as e:
+            return self.parse_error_response(e)
+
+        self.begin_request(request, allow_keep_alive)
+
+        method = request.method
+        if method == 'GET':
+            return self.http_get(request.path, request.headers)
+        elif method == 'HEAD':
+            return self.head_only(self.http_get(request.path, request.headers))
+        elif method == 'POST':
+            if request.body_stream is not None:
+                return self.http_upload_stream(request, self.upload_filename(request))
+            return self.http_post(request.path, request.headers, request.body)
+        elif method == 'PUT':
+            return self.http_upload_stream(request, self.upload_filename(request))
+        elif method == 'DELETE':
+            return self.http_delete(request.path, request.headers)
+        else:
+            return self.response(400, 'Bad Request', 'Unsupported method', {})
 
     def http_get(self, object_address, headers):
+        if object_address == '/metrics':
+            return self.response(200, 'OK', self.metrics.render(), {'Content-Type': METRICS_CONTENT_TYPE})
+
         if object_address == '/list':
+            trace = tracing.current()
             try:
-                files = os.listdir(self.upload_dir)
-                response_data = json.dumps({"status": "success", "files": files})
+                with trace.phase('disk'):
+                    files = [f for f in os.listdir(self.upload_dir) if not f.startswith(UPLOAD_TMP_PREFIX)]
+                with trace.phase('json'):
+                    response_data = json.dumps({"status": "success", "files": files})
                 return self.response(200, 'OK', response_data, {})
             except FileNotFoundError:
                 return self.response(404, 'Not Found', 'Directory not found', {})
 
         file_path = os.path.join(self.upload_dir, object_address.strip('/'))
-        if os.path.exists(file_path) and os.path.isfile(file_path):
-            with open(file_path, 'rb') as fp:
-                isi = fp.read()
+        trace = tracing.current()
+        with trace.phase('disk'):
+            try:
+                stat_result = os.stat(file_path)
+            except OSError:
+                stat_result = None
+        if stat_result is not None and stat.S_ISREG(stat_result.st_mode):
             fext = os.path.splitext(file_path)[1]
             content_type = self.types.get(fext, 'application/octet-stream')
-            headers_response = {'Content-type': content_type}
+
+            size = stat_result.st_size
+            etag, last_modified = self.validators_for(file_path, stat_result)
+            headers_response = {'Content-type': content_type,
+                                'Accept-Ranges': 'bytes',
+                                'ETag': etag,
+                                'Last-Modified': last_modified}
+
+            # varian terkompresi hanya untuk request tanpa Range, sehingga
+            # offset Range selalu mengacu ke isi file asli
+            range_header = header_value(headers, 'Range')
+            encoding = None
+            if self.compressible(content_type, size):
+                headers_response['Vary'] = 'Accept-Encoding'
+                if range_header is None:
+                    encoding = choose_encoding(header_value(headers, 'Accept-Encoding'))
+            if encoding is not None:
+                etag = f'{etag[:-1]}-{encoding}"'
+                headers_response['ETag'] = etag
+
+            # validator dicek dari hasil stat, sehingga 304 tidak pernah membuka file
+            if self.not_modified(headers, etag, stat_result):
+                del headers_response['Content-type']
+                return self.response_headers(304, 'Not Modified', None, headers_response)
+
+            with trace.phase('disk'):
+                fp = open(file_path, 'rb')
+                opened = os.fstat(fp.fileno())
+            if (opened.st_mtime_ns, opened.st_size) != (stat_result.st_mtime_ns, stat_result.st_size):
+                # file ditulis ulang di antara stat dan open: ulangi untuk versi yang terbuka
+                fp.close()
+                return self.http_get(object_address, headers)
+
+            if range_header is not None and self.if_range_matches(header_value(headers, 'If-Range'), etag, stat_result):
+                ranges = parse_byte_ranges(range_header, size)
+                if ranges == []:
+                    fp.close()
+                    return self.response(416, 'Range Not Satisfiable', '', {'Content-Range': f'bytes */{size}'})
+                if ranges is not None:
+                    return self.range_response(fp, size, ranges, content_type, headers_response)
+
+            if encoding is not None:
+                headers_response['Content-Encoding'] = encoding
+                with fp:
+                    if size <= COMPRESS_MEMORY_MAX_BYTES:
+                        isi = self.compressed_variant(file_path, stat_result, fp, encoding)
+                        return self.response(200, 'OK', isi, headers_response)
+                    variant = self.compressed_file(file_path, stat_result, fp, encoding)
+                return self.file_response(200, 'OK', variant, 0, os.fstat(variant.fileno()).st_size, headers_response)
+
+            if size >= SENDFILE_MIN_BYTES:
+                return self.file_response(200, 'OK', fp, 0, size, headers_response)
+
+            with fp:
+                key = self.cache.key_for(file_path, stat_result)
+                isi = self.cache.get(key)
+                trace.set(cache='hit' if isi is not None else 'miss')
+                if isi is None:
+                    with trace.phase('disk'):
+                        isi = fp.read()
+                    self.cache.put(key, isi)
             return self.response(200, 'OK', isi, headers_response)
         
         return self.response(404, 'Not Found', 'File or endpoint not found', {})
 
+    def compressible(self, content_type, size):
+        return (content_type.startswith(COMPRESSIBLE_TYPES)
+                and COMPRESS_MIN_BYTES <= size <= COMPRESS_MAX_BYTES)
+
+    def compressed_variant(self, file_path, stat_result, fp, encoding):
+        """
+        isi file yang sudah dikompresi. Disimpan di cache file dengan key
+        (path, mtime, ukuran, encoding) sehingga kompresi hanya dilakukan
+        sekali per versi file, dan ikut terhapus oleh invalidate(path)
+        """
+        key = self.cache.key_for(file_path, stat_result) + (encoding,)
+        isi = self.cache.get(key)
+        trace = tracing.current()
+        trace.set(cache='hit' if isi is not None else 'miss')
+        if isi is None:
+            isi, shared = self.singleflight.do(key, lambda: self.compress_and_cache(key, fp, encoding))
+            if shared:
+                trace.set(cache='coalesced')
+        return isi
+
+    def compress_and_cache(self, key, fp, encoding):
+        trace = tracing.current()
+        with trace.phase('disk'):
+            data = fp.read()
+        with trace.phase('encode'):
+            isi = compress_body(data, encoding)
+        self.cache.put(key, isi)
+        return isi
+
+    def compressed_prefix(self, file_path):
+        # awalan nama file varian milik satu path, untuk invalidate
+        return os.path.join(self.compressed_dir, hashlib.sha1(os.path.abspath(file_path).encode()).hexdigest())
+
+    def compressed_file(self, file_path, stat_result, fp, encoding):
+        """
+        varian terkompresi file besar sebagai file terbuka di compressed_dir.
+        Nama file memuat mtime dan ukuran file asli, sehingga versi baru
+        otomatis dikompresi ulang; file ditulis ke nama sementara lalu
+        di-rename agar worker proses lain tidak pernah membaca varian setengah jadi
+        """
+        version = f"{self.compressed_prefix(file_path)}-{stat_result.st_mtime_ns}-{stat_result.st_size}"
+        path = f"{version}.{encoding}"
+        trace = tracing.current()
+        try:
+            variant = open(path, 'rb')
+            trace.set(cache='hit')
+            return variant
+        except FileNotFoundError:
+            trace.set(cache='miss')
+        _, shared = self.singleflight.do(path, lambda: self.compress_to_file(file_path, fp, version, path, encoding))
+        if shared:
+            trace.set(cache='coalesced')
+        return open(path, 'rb')
+
+    def compress_to_file(self, file_path, fp, version, path, encoding):
+        fd, tmp_path = tempfile.mkstemp(prefix=UPLOAD_TMP_PREFIX, dir=self.compressed_dir)
+        try:
+            with os.fdopen(fd, 'wb') as dst:
+                compress_stream(fp, dst, encoding)
+            # varian versi lama dari file yang sama tidak akan dipakai lagi
+            self.drop_compressed(file_path, keep=version)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def drop_compressed(self, file_path, keep=None):
+        # keep: versi yang masih berlaku, varian encoding lainnya tidak dibuang
+        for path in glob(glob_escape(self.compressed_prefix(file_path)) + '-*'):
+            if keep is not None and path.startswith(keep + '.'):
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def invalidate(self, file_path):
+        # isi file berubah atau dihapus: buang entry cache memori dan varian di disk
+        self.cache.invalidate(file_path)
+        self.drop_compressed(file_path)
+
+    def validators_for(self, file_path, stat_result):
+        """
+        ETag kuat dan Last-Modified untuk satu versi file. ETag dibentuk dari
+        ukuran dan mtime (ns) sehingga berubah setiap kali file ditulis ulang;
+        hasil format disimpan per (path, mtime, ukuran) agar tidak dihitung
+        ulang pada setiap request
+        """
+        key = self.cache.key_for(file_path, stat_result)
+        with self.validators_lock:
+            validators = self.validators.get(key)
+            if validators is not None:
+                self.validators.move_to_end(key)
+                return validators
+
+        validators = (f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"',
+                      formatdate(stat_result.st_mtime, usegmt=True))
+        with self.validators_lock:
+            self.validators[key] = validators
+            while len(self.validators) > VALIDATOR_CACHE_SIZE:
+                self.validators.popitem(last=False)
+        return validators
+
+    def not_modified(self, headers, etag, stat_result):
+        """
+        True jika client sudah memiliki versi terbaru (304). If-None-Match
+        didahulukan; If-Modified-Since hanya dipakai jika If-None-Match tidak ada
+        """
+        if_none_match = header_value(headers, 'If-None-Match')
+        if if_none_match is not None:
+            if if_none_match.strip() == '*':
+                return True
+            # perbandingan lemah: awalan W/ diabaikan
+            tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+            return etag in tags
+
+        if_modified_since = header_value(headers, 'If-Modified-Since')
+        if if_modified_since is None:
+            return False
+        try:
+            tanggal = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return int(stat_result.st_mtime) <= int(tanggal.timestamp())
+
+    def if_range_matches(self, if_range, etag, stat_result):
+        """
+        True jika Range boleh dipakai: tanpa If-Range, If-Range berisi ETag
+        yang sama persis (perbandingan kuat), atau tanggal yang sama dengan
+        Last-Modified file. Selain itu file dikirim utuh
+        """
+        if if_range is None:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith('"') or if_range.startswith('W/'):
+            return if_range == etag
+        try:
+            tanggal = parsedate_to_datetime(if_range)
+        except (TypeError, ValueError):
+            return False
+        return int(tanggal.timestamp()) == int(stat_result.st_mtime)
+
+    def range_response(self, fp, size, ranges, content_type, headers):
+        # 206 untuk satu range, multipart/byteranges untuk beberapa range
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+            return self.file_response(206, 'Partial Content', fp, start, end - start + 1, headers)
+
+        boundary = uuid.uuid4().hex
+        segments = []
+        for start, end in ranges:
+            prefix = (f"\r\n--{boundary}\r\n"
+                      f"Content-Type: {content_type}\r\n"
+                      f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n").encode()
+            segments.append((prefix, start, end - start + 1))
+        trailer = f"\r\n--{boundary}--\r\n".encode()
+        headers['Content-type'] = f'multipart/byteranges; boundary={boundary}'
+        content_length = sum(len(prefix) + count for prefix, _, count in segments) + len(trailer)
+        header = self.response_headers(206, 'Partial Content', content_length, headers)
+        return FileResponse(header, fp, segments=segments, trailer=trailer)
+
     def http_post(self, object_address, headers, body):
         if object_address != '/upload':
             return self.response(404, 'Not Found', 'Endpoint not found for POST', {})
@@ -108,11 +674,15 @@ class HttpServer:
             if not filename:
                 return self.response(400, 'Bad Request', 'X-Filename header is required', {})
 
-            file_content = base64.b64decode(body)
+            trace = tracing.current()
+            with trace.phase('decode'):
+                file_content = base64.b64decode(body)
             
             file_path = os.path.join(self.upload_dir, filename)
-            with open(file_path, 'wb') as f:
-                f.write(file_content)
+            with trace.phase('disk'):
+                with open(file_path, 'wb') as f:
+                    f.write(file_content)
+            self.invalidate(file_path)
             
             response_data = json.dumps({"status": "success", "message": f"File '{filename}' berhasil diupload"})
             return self.response(201, 'Created', response_data, {})
@@ -120,6 +690,77 @@ class HttpServer:
             response_data = json.dumps({"status": "error", "message": f"Upload failed: {str(e)}"})
             return self.response(500, 'Internal Server Error', response_data, {})
 
+    def is_stream_upload(self, request):
+        """
+        True jika body request ditulis langsung ke file tanpa dibaca ke memori:
+        semua PUT, dan POST /upload dengan Content-Type application/octet-stream
+        (POST /upload dengan body base64 tetap didukung)
+        """
+        if request.method == 'PUT':
+            return True
+        content_type = request.header('Content-Type', '').split(';')[0].strip().lower()
+        return (request.method == 'POST' and request.path == '/upload'
+                and content_type == 'application/octet-stream')
+
+    def upload_filename(self, request):
+        # PUT /<nama file>, atau header X-Filename untuk POST /upload
+        if request.method == 'PUT':
+            return request.path.strip('/')
+        return request.header('X-Filename')
+
+    def begin_upload_stream(self, request, filename):
+        """
+        memvalidasi upload biner dan membuka UploadSink-nya. Mengembalikan
+        (respons_error, None) jika upload ditolak, atau (None, sink) yang
+        harus diisi seluruh body lalu diselesaikan dengan finish_upload_stream
+        """
+        if not filename or '/' in filename or filename.startswith('.'):
+            self.ctx.keep_alive = False
+            return self.response(400, 'Bad Request', 'Invalid filename', {}), None
+        if request.header('Transfer-Encoding') is not None or request.header('Content-Length') is None:
+            # tanpa Content-Length panjang body tidak diketahui (chunked tidak didukung)
+            self.ctx.keep_alive = False
+            return self.response(411, 'Length Required', 'Content-Length header is required', {}), None
+        if request.content_length > self.max_upload_bytes:
+            # body tidak dibaca, koneksi harus ditutup setelah respons
+            self.ctx.keep_alive = False
+            response_data = json.dumps({"status": "error", "message": f"Upload melebihi batas {self.max_upload_bytes} byte"})
+            return self.response(413, 'Payload Too Large', response_data, {}), None
+
+        file_path = os.path.join(self.upload_dir, filename)
+        return None, UploadSink(self.upload_dir, file_path)
+
+    def finish_upload_stream(self, sink):
+        try:
+            with tracing.current().phase('disk'):
+                sink.commit()
+        except Exception as e:
+            return self.upload_failed(sink, e)
+        self.invalidate(sink.file_path)
+
+        filename = os.path.basename(sink.file_path)
+        response_data = json.dumps({"status": "success", "message": f"File '{filename}' berhasil diupload", "size": sink.bytes_written})
+        return self.response(201, 'Created', response_data, {})
+
+    def upload_failed(self, sink, error):
+        # sisa body tidak terbaca, koneksi ditutup setelah respons
+        sink.abort()
+        self.ctx.keep_alive = False
+        response_data = json.dumps({"status": "error", "message": f"Upload failed: {str(error)}"})
+        return self.response(500, 'Internal Server Error', response_data, {})
+
+    def http_upload_stream(self, request, filename):
+        hasil, sink = self.begin_upload_stream(request, filename)
+        if sink is None:
+            return hasil
+        try:
+            # menunggu potongan body dari socket dicatat sebagai fase recv
+            for chunk in tracing.current().timed(request.body_stream, 'recv'):
+                sink.write(chunk)
+        except Exception as e:
+            return self.upload_failed(sink, e)
+        return self.finish_upload_stream(sink)
+
     def http_delete(self, object_address, headers):
         if not object_address.startswith('/delete/'):
             return self.response(400, 'Bad Request', 'Invalid DELETE endpoint', {})
@@ -131,7 +772,9 @@ class HttpServer:
         file_path = os.path.join(self.upload_dir, filename)
 
         try:
-            os.remove(file_path)
+            with tracing.current().phase('disk'):
+                os.remove(file_path)
+            self.invalidate(file_path)
             response_data = json.dumps({"status": "success", "message": f"File {filename} dihapus."})
             return self.response(200, 'OK', response_data, {})
         except FileNotFoundError:
@@ -0,0 +1,176 @@
+"""
+* parser request HTTP/1.x inkremental yang dipakai bersama oleh semua
+server Task-4. Data dari socket diterima dalam potongan besar ke satu
+bytearray, terminator header ("\r\n\r\n") dicari hanya pada byte yang
+baru masuk, lalu request line dan header di-parse langsung dari bytes
+
+* body tidak pernah di-decode: handler menerima body sebagai bytes
+(read_body) atau sebagai potongan-potongan bytes (iter_body) sehingga
+body biner tetap utuh. Byte sisa setelah satu request tetap di buffer
+untuk request berikutnya (keep-alive / pipelining)
+"""
+
+HEADER_TERMINATOR = b"\r\n\r\n"
+RECV_SIZE = 64 * 1024
+MAX_HEADER_BYTES = 64 * 1024
+# batas body yang ditampung utuh di memori (read_body / pop_body), yaitu
+# POST base64 beserta hasil decode-nya; upload streaming (iter_body) tidak
+# dibatasi di sini tetapi oleh handler-nya (MAX_UPLOAD_BYTES di http.py)
+MAX_BODY_BYTES = 8 * 1024 * 1024
+
+
+class HttpParseError(Exception):
+    def __init__(self, message, status=400, reason='Bad Request'):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+
+
+class HttpRequest:
+    def __init__(self, method, path, version, headers, content_length=0):
+        self.method = method
+        self.path = path
+        self.version = version
+        # nama header disimpan sesuai aslinya, lihat header() untuk pencarian case-insensitive
+        self.headers = headers
+        self.content_length = content_length
+        self.body = b""
+        # diisi iterator RequestReader.iter_body jika body dialirkan ke handler
+        self.body_stream = None
+
+    def header(self, name, default=None):
+        return header_value(self.headers, name, default)
+
+
+def header_value(headers, name, default=None):
+    # pencarian header case-insensitive pada dict header hasil parse
+    name = name.lower()
+    for kk in headers:
+        if kk.lower() == name:
+            return headers[kk]
+    return default
+
+
+def parse_head(head):
+    """
+    mem-parse request line dan header dari bytes (tanpa terminator).
+    Header di-decode sebagai latin-1 sesuai RFC 9112
+    """
+    lines = bytes(head).split(b"\r\n")
+    parts = lines[0].split()
+    if len(parts) < 2:
+        raise HttpParseError('Malformed request')
+    method = parts[0].decode('latin-1').upper()
+    path = parts[1].decode('latin-1')
+    version = parts[2].decode('latin-1').upper() if len(parts) > 2 else 'HTTP/1.0'
+
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(b":")
+        if sep:
+            headers[name.strip().decode('latin-1')] = value.strip().decode('latin-1')
+
+    request = HttpRequest(method, path, version, headers)
+    content_length = request.header('Content-Length', '0')
+    try:
+        request.content_length = int(content_length)
+    except ValueError:
+        raise HttpParseError(f'Invalid Content-Length: {content_length}')
+    if request.content_length < 0:
+        raise HttpParseError(f'Invalid Content-Length: {content_length}')
+    return request
+
+
+def parse_request(data):
+    # mem-parse satu request lengkap (header + body) yang sudah ada di memori
+    if isinstance(data, str):
+        data = data.encode('latin-1')
+    head, sep, body = bytes(data).partition(HEADER_TERMINATOR)
+    request = parse_head(head)
+    request.body = body
+    return request
+
+
+class RequestReader:
+    def __init__(self, sock=None, recv_size=RECV_SIZE, max_header_bytes=MAX_HEADER_BYTES, max_body_bytes=MAX_BODY_BYTES):
+        self.sock = sock
+        self.recv_size = recv_size
+        self.max_header_bytes = max_header_bytes
+        self.max_body_bytes = max_body_bytes
+        self.buffer = bytearray()
+        self.scan_from = 0
+
+    def feed(self, data):
+        # menambahkan data yang diterima dari luar (misalnya event loop selectors)
+        self.buffer += data
+
+    def fill(self):
+        # menerima satu potongan data dari socket, False jika koneksi ditutup
+        data = self.sock.recv(self.recv_size)
+        if not data:
+            return False
+        self.feed(data)
+        return True
+
+    def pop_head(self):
+        # mengambil header satu request dari buffer tanpa recv, None jika belum lengkap
+        idx = self.buffer.find(HEADER_TERMINATOR, self.scan_from)
+        if idx == -1:
+            if len(self.buffer) > self.max_header_bytes:
+                raise HttpParseError('Request header too large', 431, 'Request Header Fields Too Large')
+            self.scan_from = max(0, len(self.buffer) - len(HEADER_TERMINATOR) + 1)
+            return None
+        request = parse_head(memoryview(self.buffer)[:idx])
+        del self.buffer[:idx + len(HEADER_TERMINATOR)]
+        self.scan_from = 0
+        return request
+
+    def read_head(self):
+        """
+        menerima header request berikutnya. Mengembalikan None jika koneksi
+        ditutup sebelum ada byte yang diterima, ConnectionError jika ditutup
+        di tengah header
+        """
+        while True:
+            request = self.pop_head()
+            if request is not None:
+                return request
+            if not self.fill():
+                if self.buffer:
+                    raise ConnectionError("Koneksi ditutup sebelum header request lengkap")
+                return None
+
+    def pop_body(self, request):
+        # mengambil body dari buffer tanpa recv jika sudah lengkap. Content-Length
+        # di atas batas ditolak sebelum satu byte body pun ditampung
+        if request.content_length > self.max_body_bytes:
+            raise HttpParseError('Request body too large', 413, 'Payload Too Large')
+        if len(self.buffer) < request.content_length:
+            return False
+        request.body = bytes(memoryview(self.buffer)[:request.content_length])
+        del self.buffer[:request.content_length]
+        return True
+
+    def iter_body(self, request, chunk_size=RECV_SIZE):
+        # menghasilkan body sebagai potongan bytes tanpa menampung seluruhnya di memori
+        remaining = request.content_length
+        while remaining > 0:
+            if not self.buffer and not self.fill():
+                raise ConnectionError("Koneksi ditutup sebelum body request lengkap")
+            take = min(remaining, len(self.buffer), chunk_size)
+            chunk = bytes(memoryview(self.buffer)[:take])
+            del self.buffer[:take]
+            remaining -= take
+            yield chunk
+
+    def read_body(self, request):
+        if not self.pop_body(request):
+            request.body = b"".join(self.iter_body(request))
+        return request.body
+
+    def read_request(self):
+        # header + body lengkap, None jika koneksi ditutup di antara request
+        request = self.read_head()
+        if request is not None:
+            self.read_body(request)
+        return request
@@ -0,0 +1,145 @@
+from bisect import bisect_left
+import threading
+import multiprocessing
+
+"""
+* HttpMetrics mencatat jumlah request dan byte respons per (route, method,
+status) serta histogram latensi per (route, method), lalu menampilkannya
+dalam format teks Prometheus di GET /metrics
+
+* counter disimpan di multiprocessing.RawArray yang dibagi menjadi shard,
+satu shard per proses. Proses worker (process pool, selector multi-proses)
+memilih shard-nya dengan use_shard() setelah fork sehingga setiap proses
+menulis ke bagian array-nya sendiri tanpa lock antar proses; thread dalam
+satu proses cukup memakai threading.Lock. render() menjumlahkan semua
+shard, jadi /metrics dari worker mana pun menampilkan angka seluruh server
+
+* label dibatasi ke nilai yang sudah diketahui (ROUTES, METHODS,
+STATUS_CODES) agar ukuran array tetap; path file digabung ke route 'file'
+dan nilai di luar daftar dicatat sebagai 'other'
+"""
+
+ROUTES = ('list', 'upload', 'delete', 'metrics', 'file', 'other')
+EXACT_ROUTES = {'/list': 0, '/upload': 1, '/metrics': 3}
+ROUTE_DELETE = 2
+ROUTE_FILE = 4
+ROUTE_OTHER = 5
+METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'DELETE', 'other')
+METHOD_INDEX = {method: i for i, method in enumerate(METHODS)}
+METHOD_OTHER = len(METHODS) - 1
+STATUS_CODES = (200, 201, 206, 304, 400, 404, 411, 413, 416, 500, 503)
+STATUS_INDEX = {code: i for i, code in enumerate(STATUS_CODES)}
+STATUS_OTHER = len(STATUS_CODES)
+STATUS_LABELS = tuple(str(code) for code in STATUS_CODES) + ('other',)
+
+# batas atas bucket histogram latensi (detik), seperti bucket bawaan client Prometheus
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# tata letak satu shard: [jumlah request, byte] per (route, method, status),
+# lalu [bucket..., +Inf, sum] per (route, method)
+SERIES = len(ROUTES) * len(METHODS)
+COUNTER_SLOTS = SERIES * len(STATUS_LABELS) * 2
+HISTOGRAM_WIDTH = len(LATENCY_BUCKETS) + 2
+SHARD_SLOTS = COUNTER_SLOTS + SERIES * HISTOGRAM_WIDTH
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def route_index(path):
+    if path is None:
+        return ROUTE_OTHER
+    index = EXACT_ROUTES.get(path)
+    if index is not None:
+        return index
+    if path.startswith('/delete/'):
+        return ROUTE_DELETE
+    return ROUTE_FILE
+
+
+class HttpMetrics:
+    def __init__(self, shards=1):
+        self.shards = max(1, shards)
+        self.values = multiprocessing.RawArray('d', self.shards * SHARD_SLOTS)
+        # akses lewat memoryview lebih murah daripada indeks ctypes
+        self.view = memoryview(self.values).cast('B').cast('d')
+        self.use_shard(0)
+
+    def use_shard(self, index):
+        # dipanggil sekali di setiap proses worker setelah fork
+        self.offset = index * SHARD_SLOTS
+        self.lock = threading.Lock()
+        # (method, route, status) -> (indeks counter, indeks histogram) di shard ini
+        self.slots = {}
+
+    def slots_for(self, method, route, status):
+        series = route * len(METHODS) + METHOD_INDEX.get(method, METHOD_OTHER)
+        counter = self.offset + (series * len(STATUS_LABELS) + STATUS_INDEX.get(status, STATUS_OTHER)) * 2
+        histogram = self.offset + COUNTER_SLOTS + series * HISTOGRAM_WIDTH
+        slots = self.slots[method, route, status] = (counter, histogram)
+        return slots
+
+    def observe(self, method, path, status, duration, bytes_sent):
+        # dipanggil sekali per request: indeks diambil dari cache dan hanya
+        # empat increment yang dilakukan di dalam lock
+        route = route_index(path)
+        slots = self.slots.get((method, route, status))
+        if slots is None:
+            slots = self.slots_for(method, route, status)
+        counter, histogram = slots
+        bucket = histogram + bisect_left(LATENCY_BUCKETS, duration)
+        values = self.view
+        with self.lock:
+            values[counter] += 1
+            values[counter + 1] += bytes_sent
+            values[bucket] += 1
+            values[histogram + HISTOGRAM_WIDTH - 1] += duration
+
+    def observe_rejected(self, bytes_sent=0):
+        # koneksi yang dijawab 503 sebelum request-nya dibaca, tanpa histogram
+        counter, _ = self.slots_for(None, ROUTE_OTHER, 503)
+        with self.lock:
+            self.view[counter] += 1
+            self.view[counter + 1] += bytes_sent
+
+    def totals(self):
+        # jumlah seluruh shard; dibaca tanpa lock, nilai yang sedang ditulis
+        # proses lain paling jauh tertinggal satu request
+        totals = [0.0] * SHARD_SLOTS
+        for shard in range(self.shards):
+            start = shard * SHARD_SLOTS
+            for i, value in enumerate(self.view[start:start + SHARD_SLOTS]):
+                totals[i] += value
+        return totals
+
+    def render(self):
+        totals = self.totals()
+        requests, bytes_sent, durations = [], [], []
+        for series in range(SERIES):
+            route, method = ROUTES[series // len(METHODS)], METHODS[series % len(METHODS)]
+            for status, label in enumerate(STATUS_LABELS):
+                index = (series * len(STATUS_LABELS) + status) * 2
+                if totals[index]:
+                    labels = f'route="{route}",method="{method}",status="{label}"'
+                    requests.append(f'http_requests_total{{{labels}}} {totals[index]:.0f}')
+                    bytes_sent.append(f'http_response_bytes_total{{{labels}}} {totals[index + 1]:.0f}')
+
+            base = COUNTER_SLOTS + series * HISTOGRAM_WIDTH
+            count = sum(totals[base:base + HISTOGRAM_WIDTH - 1])
+            if not count:
+                continue
+            labels = f'route="{route}",method="{method}"'
+            cumulative = 0
+            for bound, value in zip(LATENCY_BUCKETS, totals[base:]):
+                cumulative += value
+                durations.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative:.0f}')
+            durations.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count:.0f}')
+            durations.append(f'http_request_duration_seconds_sum{{{labels}}} {totals[base + HISTOGRAM_WIDTH - 1]:.6f}')
+            durations.append(f'http_request_duration_seconds_count{{{labels}}} {count:.0f}')
+
+        lines = ['# HELP http_requests_total Jumlah request HTTP per route, method dan status.',
+                 '# TYPE http_requests_total counter', *requests,
+                 '# HELP http_response_bytes_total Jumlah byte respons HTTP yang dikirim.',
+                 '# TYPE http_response_bytes_total counter', *bytes_sent,
+                 '# HELP http_request_duration_seconds Latensi request HTTP sampai respons terkirim.',
+                 '# TYPE http_request_duration_seconds histogram', *durations]
+        return "\n".join(lines) + "\n"
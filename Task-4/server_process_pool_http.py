@@ -1,74 +1,319 @@
 from socket import *
 import socket
 import sys
-from concurrent.futures import ProcessPoolExecutor
+import os
+import time
+import signal
+import argparse
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
 
-def ProcessTheClient(connection, address):
-    from http import HttpServer
-    httpserver = HttpServer()
+from http import HttpServer, send_response, reject_busy, KEEP_ALIVE_TIMEOUT, KEEP_ALIVE_MAX_REQUESTS, CACHE_MAX_BYTES, MAX_UPLOAD_BYTES
+from http_parser import RequestReader, HttpParseError
+import tracing
+from metrics import HttpMetrics
+
+"""
+* proses worker persisten, masing-masing memiliki satu HttpServer (beserta
+cache-nya) dan thread pool kecil untuk melayani koneksi. Jumlah worker
+elastis antara --min_workers dan --max_workers: worker baru di-fork saat
+semua thread di worker yang ada sedang terpakai, dan worker yang menganggur
+selama --idle_timeout dihentikan dengan menutup socket Unix-nya
+
+* proses utama hanya accept, lalu mengirim fd koneksi ke worker lewat
+socket Unix (SCM_RIGHTS, socket.send_fds) dan langsung menutup salinannya.
+Worker dipilih yang jumlah koneksi in-flight-nya paling sedikit; hitungan
+tersebut disimpan di multiprocessing.Array yang dinaikkan proses utama saat
+dispatch dan diturunkan worker saat koneksi selesai
+
+* metrics HTTP memakai satu shard per slot worker (ditambah satu untuk
+penolakan 503 di proses utama), sehingga GET /metrics di worker mana pun
+menampilkan jumlah seluruh pool. Slot worker yang dihentikan baru dipakai
+ulang setelah prosesnya benar-benar keluar, agar satu shard tidak pernah
+ditulis dua proses sekaligus
+"""
+
+PORT = 8889
+MIN_WORKERS = 1
+MAX_WORKERS = 4
+THREADS_PER_WORKER = 5
+# koneksi yang boleh menunggu thread bebas di seluruh worker; kelebihannya dijawab 503
+MAX_QUEUE = 64
+IDLE_TIMEOUT = 10
+# accept menunggu paling lama selama ini sebelum memeriksa worker yang menganggur
+SCALE_INTERVAL = 0.5
 
+# HttpServer milik proses worker, dibuat sekali di worker_main
+httpserver = None
+
+def ProcessTheClient(connection, address):
+    reader = RequestReader(connection, max_body_bytes=httpserver.max_body_bytes)
+    requests_served = 0
     try:
-        headers = b""
-        while not headers.endswith(b'\r\n\r\n'):
-            data = connection.recv(1)
-            if not data:
+        while requests_served < KEEP_ALIVE_MAX_REQUESTS:
+            # menunggu request berikutnya pada koneksi persistent
+            connection.settimeout(KEEP_ALIVE_TIMEOUT)
+            request = reader.read_head()
+            if request is None:
                 break
-            headers += data
-        
-        if not headers:
-            connection.close()
-            return
-        
-        header_str = headers.decode('utf-8')
-        
-        content_length = 0
-        lines = header_str.split('\r\n')
-        for line in lines:
-            if line.lower().startswith('content-length:'):
-                content_length = int(line.split(':')[1].strip())
-                break
-                
-        body = b""
-        if content_length > 0:
-            body_read = 0
-            while body_read < content_length:
-                data = connection.recv(min(1024, content_length - body_read))
-                if not data:
-                    break
-                body += data
-                body_read += len(data)
-
-        full_request = headers + body
-        
-        rcv = full_request.decode('utf-8')
-        hasil = httpserver.proses(rcv)
-        connection.sendall(hasil)
+            mulai = time.perf_counter()
+            connection.settimeout(None)
+            trace = httpserver.start_trace(request, address)
+            if httpserver.is_stream_upload(request):
+                request.body_stream = reader.iter_body(request)
+            else:
+                with trace.phase('recv'):
+                    reader.read_body(request)
 
+            requests_served += 1
+            hasil = httpserver.proses(request, allow_keep_alive=requests_served < KEEP_ALIVE_MAX_REQUESTS)
+            with trace.phase('send'):
+                sent = send_response(connection, hasil)
+            httpserver.record(request, hasil, time.perf_counter() - mulai, sent)
+            if not httpserver.should_keep_alive():
+                break
+    except socket.timeout:
+        pass
+    except HttpParseError as e:
+        hasil = httpserver.parse_error_response(e)
+        httpserver.record(None, hasil, 0.0, send_response(connection, hasil))
     except Exception as e:
+        tracing.current().finish(error=True, message=str(e)[:200])
         print(f"Error processing request from {address}: {e}")
     finally:
         connection.close()
     return
 
-def Server():
+def worker_main(index, channel, in_flight, threads, metrics, cache_max_bytes=CACHE_MAX_BYTES,
+                max_upload_bytes=MAX_UPLOAD_BYTES):
+    global httpserver
+    metrics.use_shard(index)
+    httpserver = HttpServer(cache_max_bytes=cache_max_bytes, max_upload_bytes=max_upload_bytes, metrics=metrics)
+    signal.signal(signal.SIGTERM, lambda signum, frame: os._exit(0))
+
+    def selesai(future):
+        with in_flight.get_lock():
+            in_flight[index] -= 1
+
+    with ThreadPoolExecutor(threads) as executor:
+        while True:
+            try:
+                msg, fds, flags, addr = socket.recv_fds(channel, 1024, 1)
+            except KeyboardInterrupt:
+                break
+            if not fds:
+                # proses utama sudah berhenti
+                break
+            connection = socket.socket(fileno=fds[0])
+            host, _, port = msg.decode().rpartition(':')
+            future = executor.submit(ProcessTheClient, connection, (host, int(port)))
+            future.add_done_callback(selesai)
+
+
+class WorkerPool:
+    def __init__(self, min_size, max_size, threads, listen_socket, max_queue=MAX_QUEUE, idle_timeout=IDLE_TIMEOUT,
+                 cache_max_bytes=CACHE_MAX_BYTES, max_upload_bytes=MAX_UPLOAD_BYTES):
+        self.max_size = max(1, max_size)
+        self.min_size = max(1, min(min_size, self.max_size))
+        self.threads = threads
+        # batas cache per worker; setiap worker memiliki cache sendiri
+        self.cache_max_bytes = cache_max_bytes
+        self.max_upload_bytes = max_upload_bytes
+        self.listen_socket = listen_socket
+        self.idle_timeout = idle_timeout
+        # in_flight menghitung koneksi yang dilayani atau menunggu di tiap worker,
+        # sehingga jumlahnya sekaligus menjadi isi antrean seluruh pool. Slot
+        # disediakan untuk max_size worker; slot tanpa channel sedang tidak dipakai
+        self.in_flight = multiprocessing.Array('i', self.max_size)
+        # shard terakhir milik proses utama
+        self.metrics = HttpMetrics(shards=self.max_size + 1)
+        self.metrics.use_shard(self.max_size)
+        self.capacity = self.max_size * threads + max_queue
+        self.shed = 0
+        self.ctx = multiprocessing.get_context('fork')
+        self.processes = [None] * self.max_size
+        self.channels = [None] * self.max_size
+        self.last_busy = [0.0] * self.max_size
+        self.retired = []
+        for index in range(self.min_size):
+            self.start_worker(index)
+        self.report_size()
+
+    def active(self):
+        return [i for i in range(self.max_size) if self.channels[i] is not None]
+
+    def report_size(self):
+        print(f"Ukuran pool worker: {len(self.active())} worker (min {self.min_size}, max {self.max_size}, in-flight {sum(self.in_flight)})")
+
+    def start_worker(self, index, inherited=()):
+        # SOCK_SEQPACKET menjaga batas pesan sehingga setiap pesan membawa tepat satu fd
+        parent_end, child_end = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        process = self.ctx.Process(target=self.run_worker, args=(index, child_end, inherited), daemon=True)
+        process.start()
+        child_end.close()
+        with self.in_flight.get_lock():
+            self.in_flight[index] = 0
+        self.processes[index] = process
+        self.channels[index] = parent_end
+        self.last_busy[index] = time.monotonic()
+
+    def run_worker(self, index, child_end, inherited):
+        # fd milik proses utama yang ikut terwarisi saat fork tidak dipakai worker,
+        # termasuk socket client yang sedang di-dispatch saat worker dimulai ulang
+        self.listen_socket.close()
+        for sock in list(self.channels) + list(inherited):
+            if sock is not None:
+                sock.close()
+        worker_main(index, child_end, self.in_flight, self.threads, self.metrics, self.cache_max_bytes,
+                    self.max_upload_bytes)
+
+    def admit(self, connection, address):
+        # menolak koneksi dengan 503 jika seluruh worker dan antreannya penuh
+        if sum(self.in_flight) < self.capacity:
+            return True
+        self.shed += 1
+        self.metrics.observe_rejected(reject_busy(connection))
+        print(f"Connection from {address} rejected (503), total shed: {self.shed}")
+        return False
+
+    def choose_worker(self, connection):
+        # worker paling sedikit in-flight; jika semua thread-nya terpakai dan
+        # masih ada slot, worker baru di-fork (koneksi yang sedang di-dispatch
+        # ditutup di worker baru itu)
+        active = self.active()
+        index = min(active, key=lambda i: self.in_flight[i])
+        if self.in_flight[index] >= self.threads and len(active) < self.max_size:
+            free = self.free_slot()
+            if free is not None:
+                index = free
+                self.start_worker(index, inherited=(connection,))
+                self.report_size()
+        return index
+
+    def free_slot(self):
+        # slot tanpa worker aktif yang worker lamanya (jika ada) sudah keluar
+        retiring = {index for index, process in self.retired}
+        for index in range(self.max_size):
+            if self.channels[index] is None and index not in retiring:
+                return index
+        return None
+
+    def stop_worker(self, index):
+        # worker keluar dari loop recv_fds setelah channel-nya ditutup
+        self.channels[index].close()
+        self.channels[index] = None
+        self.retired.append((index, self.processes[index]))
+        self.processes[index] = None
+
+    def maintain(self):
+        # menghentikan worker yang menganggur melebihi idle_timeout
+        now = time.monotonic()
+        for index in self.active():
+            if self.in_flight[index] > 0:
+                self.last_busy[index] = now
+            elif len(self.active()) > self.min_size and now - self.last_busy[index] >= self.idle_timeout:
+                self.stop_worker(index)
+                self.report_size()
+        for entry in [e for e in self.retired if not e[1].is_alive()]:
+            entry[1].join()
+            self.retired.remove(entry)
+
+    def dispatch(self, connection, address):
+        try:
+            for attempt in range(2):
+                index = self.choose_worker(connection)
+                self.last_busy[index] = time.monotonic()
+                with self.in_flight.get_lock():
+                    self.in_flight[index] += 1
+                try:
+                    socket.send_fds(self.channels[index], [f"{address[0]}:{address[1]}".encode()], [connection.fileno()])
+                    return
+                except OSError as e:
+                    print(f"Worker {index} tidak dapat dihubungi ({e}), memulai ulang worker")
+                    self.channels[index].close()
+                    self.processes[index].kill()
+                    self.processes[index].join()
+                    self.start_worker(index, inherited=(connection,))
+            # kedua percobaan gagal: client tetap mendapat 503 alih-alih koneksi yang diputus
+            self.shed += 1
+            self.metrics.observe_rejected(reject_busy(connection))
+            print(f"Connection from {address} rejected (503): tidak ada worker yang menerima koneksi, total shed: {self.shed}")
+        finally:
+            # fd sudah diduplikasi ke pesan SCM_RIGHTS, salinan di proses utama
+            # ditutup agar koneksi benar-benar selesai saat worker menutupnya
+            connection.close()
+
+    def shutdown(self):
+        for index in self.active():
+            self.stop_worker(index)
+        for index, process in self.retired:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
+
+def Server(port=PORT, min_workers=MIN_WORKERS, max_workers=MAX_WORKERS, threads=THREADS_PER_WORKER,
+           max_queue=MAX_QUEUE, idle_timeout=IDLE_TIMEOUT, cache_max_bytes=CACHE_MAX_BYTES,
+           max_upload_bytes=MAX_UPLOAD_BYTES):
     my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 
-    port = 8889
     my_socket.bind(('0.0.0.0', port))
     my_socket.listen(50)
-    print(f"Process Pool Server running on port {port}...")
 
-    with ProcessPoolExecutor(max_workers=20) as executor:
+    # worker minimum di-fork sebelum accept pertama; worker tambahan di-fork
+    # saat dispatch dan menutup socket client yang ikut terwarisi
+    pool = WorkerPool(min_workers, max_workers, threads, my_socket, max_queue, idle_timeout, cache_max_bytes,
+                      max_upload_bytes)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"Process Pool Server running on port {port} with {pool.min_size}-{pool.max_size} workers x {threads} threads...")
+    my_socket.settimeout(SCALE_INTERVAL)
+
+    try:
         while True:
             try:
                 connection, client_address = my_socket.accept()
-                print(f"Connection from {client_address}")
-                executor.submit(ProcessTheClient, connection, client_address)
-                
+            except socket.timeout:
+                pool.maintain()
+                continue
             except Exception as e:
                 print(f"Error accepting connections: {e}")
                 break
+            try:
+                if not pool.admit(connection, client_address):
+                    continue
+                print(f"Connection from {client_address}")
+                pool.dispatch(connection, client_address)
+                pool.maintain()
+            except Exception as e:
+                print(f"Error dispatching connection from {client_address}: {e}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.shutdown()
 
 if __name__ == "__main__":
-    Server()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Server HTTP dengan worker process persisten.")
+    parser.add_argument('--port', type=int, default=PORT,
+                        help=f"Port server. Default: {PORT}")
+    parser.add_argument('--min_workers', type=int, default=MIN_WORKERS,
+                        help=f"Jumlah minimum proses worker. Default: {MIN_WORKERS}")
+    parser.add_argument('--max_workers', type=int, default=MAX_WORKERS,
+                        help=f"Jumlah maksimum proses worker saat beban tinggi. Default: {MAX_WORKERS}")
+    parser.add_argument('--threads', type=int, default=THREADS_PER_WORKER,
+                        help=f"Jumlah thread per worker. Default: {THREADS_PER_WORKER}")
+    parser.add_argument('--max_queue', type=int, default=MAX_QUEUE,
+                        help=f"Jumlah koneksi yang boleh menunggu thread; sisanya dijawab 503. Default: {MAX_QUEUE}")
+    parser.add_argument('--idle_timeout', type=float, default=IDLE_TIMEOUT,
+                        help=f"Cooldown (detik) sebelum worker yang menganggur dihentikan. Default: {IDLE_TIMEOUT}")
+    parser.add_argument('--cache_mb', type=int, default=CACHE_MAX_BYTES // (1024 * 1024),
+                        help=f"Batas ukuran cache isi file (MB) per worker, 0 untuk mematikan. Default: {CACHE_MAX_BYTES // (1024 * 1024)}")
+    parser.add_argument('--max_upload_mb', type=int, default=MAX_UPLOAD_BYTES // (1024 * 1024),
+                        help=f"Batas ukuran upload biner (PUT / octet-stream) dalam MB. Default: {MAX_UPLOAD_BYTES // (1024 * 1024)}")
+    parser.add_argument('--trace', metavar='FILE', default=None,
+                        help="Tulis durasi fase (recv, parse, disk, encode, send) setiap request sebagai JSON lines ke FILE, ringkas dengan analyze_trace.py. Default: mati")
+    args = parser.parse_args()
+    if args.trace:
+        tracing.enable(args.trace)
+    Server(args.port, args.min_workers, args.max_workers, args.threads, args.max_queue, args.idle_timeout,
+           args.cache_mb * 1024 * 1024, args.max_upload_mb * 1024 * 1024)
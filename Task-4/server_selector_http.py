@@ -0,0 +1,454 @@
+from socket import *
+import socket
+import selectors
+import os
+import sys
+import time
+import signal
+import argparse
+import resource
+import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from http import HttpServer, FileResponse, reject_busy, KEEP_ALIVE_TIMEOUT, KEEP_ALIVE_MAX_REQUESTS, CACHE_MAX_BYTES, MAX_UPLOAD_BYTES
+from http_parser import RequestReader, HttpParseError, RECV_SIZE
+from metrics import HttpMetrics
+
+"""
+* server HTTP event-driven: satu thread per proses melayani banyak koneksi
+non-blocking sekaligus lewat selectors (epoll di Linux), sehingga client
+yang lambat tidak menahan client lain seperti pada pool 20 thread
+
+* request di-parse dengan RequestReader yang diisi dari recv non-blocking.
+Respons ditulis bertahap: bytes dengan send(), body file dengan
+os.sendfile() per potongan yang diterima kernel. Selama respons belum
+terkirim semua koneksi tidak dibaca (backpressure), sehingga request
+pipelined berikutnya menunggu di buffer socket milik kernel
+
+* upload biner (PUT / octet-stream) ditulis ke UploadSink setiap kali data
+datang, tanpa menampung body di memori
+
+* request yang menyentuh isi file (membaca seluruh file ke cache,
+mengompresi varian gzip/deflate, menulis upload base64, menghapus file)
+dijalankan di thread pool kecil agar tidak menahan event loop; hasilnya
+dikembalikan ke event loop lewat antrean dan pipe wakeup. Hanya /metrics
+dan /list yang dijawab langsung di event loop
+
+* latensi untuk /metrics diukur dari header request selesai di-parse sampai
+byte terakhir respons diterima kernel; dengan --processes N setiap proses
+menulis ke shard metrics-nya sendiri
+"""
+
+PORT = 8887
+LISTEN_BACKLOG = 1024
+ACCEPT_BATCH = 64
+SWEEP_INTERVAL = 1.0
+# batas koneksi terbuka per proses; koneksi berikutnya dijawab 503
+MAX_CONNECTIONS = 10000
+# thread untuk request yang bisa blocking (disk, kompresi)
+BLOCKING_THREADS = 4
+# route yang cukup murah untuk dijawab langsung di event loop
+INLINE_ROUTES = ('/metrics', '/list')
+
+
+class Connection:
+    def __init__(self, server, sock, address):
+        self.server = server
+        self.httpserver = server.httpserver
+        self.sock = sock
+        self.address = address
+        self.reader = RequestReader(None, max_body_bytes=self.httpserver.max_body_bytes)
+        # isi antrean: memoryview (bytes), [fp, offset, sisa] (potongan file),
+        # FileResponse (penanda file selesai dikirim dan boleh ditutup), atau
+        # tuple (request, hasil, mulai, ukuran) penanda respons selesai terkirim
+        self.outgoing = deque()
+        self.pending_request = None
+        self.request_started = 0.0
+        self.upload = None
+        self.upload_request = None
+        self.upload_remaining = 0
+        self.upload_allow_keep_alive = False
+        # True selama request sedang diproses di thread pool
+        self.waiting = False
+        self.requests_served = 0
+        self.closing = False
+        self.closed = False
+        self.events = selectors.EVENT_READ
+        self.last_active = time.monotonic()
+
+    def on_readable(self):
+        try:
+            data = self.sock.recv(RECV_SIZE)
+        except BlockingIOError:
+            return
+        except OSError:
+            self.close()
+            return
+        if not data:
+            self.close()
+            return
+        self.last_active = time.monotonic()
+
+        if self.upload is not None:
+            data = self.write_upload(data)
+        if data:
+            self.reader.feed(data)
+        self.process()
+
+    def on_writable(self):
+        self.flush()
+        self.process()
+
+    def process(self):
+        # memproses request yang sudah lengkap di buffer satu per satu; request
+        # berikutnya baru diambil setelah respons sebelumnya terkirim semua
+        while not self.closed and not self.closing and not self.outgoing and self.upload is None and not self.waiting:
+            if not self.next_request():
+                break
+            self.flush()
+        self.update_interest()
+
+    def next_request(self):
+        try:
+            if self.pending_request is None:
+                request = self.reader.pop_head()
+                if request is None:
+                    return False
+                self.request_started = time.perf_counter()
+                if self.httpserver.is_stream_upload(request):
+                    self.start_upload(request)
+                    return True
+                self.pending_request = request
+            if not self.reader.pop_body(self.pending_request):
+                return False
+        except HttpParseError as e:
+            self.pending_request = None
+            self.queue(self.httpserver.parse_error_response(e), False, started=time.perf_counter())
+            return True
+
+        request, self.pending_request = self.pending_request, None
+        self.requests_served += 1
+        allow_keep_alive = self.requests_served < KEEP_ALIVE_MAX_REQUESTS
+        if request.path not in INLINE_ROUTES:
+            self.waiting = True
+            self.server.submit(self, request, allow_keep_alive)
+            return False
+        hasil = self.httpserver.proses(request, allow_keep_alive=allow_keep_alive)
+        self.queue(hasil, self.httpserver.should_keep_alive(), request)
+        return True
+
+    def on_complete(self, request, hasil, keep_alive):
+        # dipanggil di event loop setelah request selesai diproses di thread pool
+        self.waiting = False
+        if self.closed:
+            if isinstance(hasil, FileResponse):
+                hasil.close()
+            return
+        if isinstance(hasil, Exception):
+            print(f"Error processing request from {self.address}: {hasil}")
+            self.close()
+            return
+        self.queue(hasil, keep_alive, request)
+        self.flush()
+        self.process()
+
+    def start_upload(self, request):
+        self.requests_served += 1
+        self.upload_allow_keep_alive = self.requests_served < KEEP_ALIVE_MAX_REQUESTS
+        self.httpserver.begin_request(request, self.upload_allow_keep_alive)
+        hasil, sink = self.httpserver.begin_upload_stream(request, self.httpserver.upload_filename(request))
+        if sink is None:
+            self.queue(hasil, self.httpserver.should_keep_alive(), request)
+            return
+        self.upload = sink
+        self.upload_request = request
+        self.upload_remaining = request.content_length
+
+        # sebagian body mungkin sudah ikut terbaca bersama header
+        buffered = bytes(self.reader.buffer)
+        self.reader.buffer.clear()
+        leftover = self.write_upload(buffered)
+        if leftover:
+            self.reader.feed(leftover)
+
+    def write_upload(self, data):
+        # menulis bagian body upload dari data, mengembalikan sisa data milik request berikutnya
+        take = min(self.upload_remaining, len(data))
+        if take:
+            try:
+                self.upload.write(data[:take])
+            except Exception as e:
+                hasil = self.httpserver.upload_failed(self.upload, e)
+                self.upload = None
+                self.queue(hasil, False, self.upload_request)
+                return b""
+            self.upload_remaining -= take
+        if self.upload_remaining == 0:
+            # keep-alive ditentukan ulang karena status di HttpServer dipakai
+            # bersama oleh semua koneksi dalam event loop ini
+            self.httpserver.begin_request(self.upload_request, self.upload_allow_keep_alive)
+            hasil = self.httpserver.finish_upload_stream(self.upload)
+            self.upload = None
+            self.queue(hasil, self.httpserver.should_keep_alive(), self.upload_request)
+            self.upload_request = None
+            self.flush()
+        return data[take:]
+
+    def queue(self, hasil, keep_alive, request=None, started=None):
+        size = hasil.size if isinstance(hasil, FileResponse) else len(hasil)
+        if isinstance(hasil, FileResponse):
+            self.outgoing.append(memoryview(hasil.header))
+            for prefix, offset, count in hasil.segments:
+                if prefix:
+                    self.outgoing.append(memoryview(prefix))
+                if count:
+                    self.outgoing.append([hasil.fp, offset, count])
+            if hasil.trailer:
+                self.outgoing.append(memoryview(hasil.trailer))
+            self.outgoing.append(hasil)
+        else:
+            self.outgoing.append(memoryview(hasil))
+        self.outgoing.append((request, hasil, self.request_started if started is None else started, size))
+        if not keep_alive:
+            self.closing = True
+
+    def flush(self):
+        # mengirim antrean sebanyak yang diterima kernel tanpa blocking
+        while self.outgoing and not self.closed:
+            item = self.outgoing[0]
+            try:
+                if isinstance(item, FileResponse):
+                    item.close()
+                    self.outgoing.popleft()
+                    continue
+                if isinstance(item, tuple):
+                    request, hasil, started, size = self.outgoing.popleft()
+                    self.httpserver.record(request, hasil, time.perf_counter() - started, size)
+                    continue
+                if isinstance(item, memoryview):
+                    sent = self.sock.send(item)
+                    if sent < len(item):
+                        self.outgoing[0] = item[sent:]
+                    else:
+                        self.outgoing.popleft()
+                else:
+                    fp, offset, remaining = item
+                    sent = os.sendfile(self.sock.fileno(), fp.fileno(), offset, remaining)
+                    if sent == 0:
+                        raise IOError(f"File {fp.name} berubah ukuran saat dikirim")
+                    item[1] += sent
+                    item[2] -= sent
+                    if item[2] == 0:
+                        self.outgoing.popleft()
+            except BlockingIOError:
+                break
+            except OSError:
+                self.close()
+                return
+            self.last_active = time.monotonic()
+
+        if not self.outgoing and self.closing:
+            self.close()
+
+    def update_interest(self):
+        if self.closed:
+            return
+        events = selectors.EVENT_WRITE if self.outgoing else selectors.EVENT_READ
+        if events != self.events:
+            self.server.selector.modify(self.sock, events, self)
+            self.events = events
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for item in self.outgoing:
+            if isinstance(item, FileResponse):
+                item.close()
+        self.outgoing.clear()
+        if self.upload is not None:
+            self.upload.abort()
+            self.upload = None
+        self.server.selector.unregister(self.sock)
+        del self.server.connections[self.sock.fileno()]
+        self.sock.close()
+
+
+class SelectorServer:
+    def __init__(self, listen_socket, max_connections=MAX_CONNECTIONS, metrics=None, cache_max_bytes=CACHE_MAX_BYTES,
+                 max_upload_bytes=MAX_UPLOAD_BYTES):
+        self.listen_socket = listen_socket
+        self.max_connections = max_connections
+        self.shed = 0
+        self.listen_socket.setblocking(False)
+        self.httpserver = HttpServer(cache_max_bytes=cache_max_bytes, max_upload_bytes=max_upload_bytes, metrics=metrics)
+        self.selector = selectors.DefaultSelector()
+        self.connections = {}
+        self.executor = ThreadPoolExecutor(max_workers=BLOCKING_THREADS, thread_name_prefix='blocking')
+        # hasil dari thread pool: (koneksi, request, hasil, keep_alive); satu byte
+        # di pipe wakeup membangunkan select() agar hasil segera dikirim
+        self.completed = deque()
+        self.wakeup_r, self.wakeup_w = os.pipe()
+        os.set_blocking(self.wakeup_r, False)
+        os.set_blocking(self.wakeup_w, False)
+
+    def accept(self):
+        for _ in range(ACCEPT_BATCH):
+            try:
+                connection, client_address = self.listen_socket.accept()
+            except BlockingIOError:
+                return
+            except OSError as e:
+                # misalnya EMFILE: koneksi tetap di backlog sampai ada fd yang bebas
+                print(f"Error accepting connections: {e}")
+                return
+            if len(self.connections) >= self.max_connections:
+                self.shed += 1
+                self.httpserver.metrics.observe_rejected(reject_busy(connection))
+                print(f"Connection from {client_address} rejected (503), total shed: {self.shed}")
+                continue
+            print(f"Connection from {client_address}")
+            connection.setblocking(False)
+            conn = Connection(self, connection, client_address)
+            self.connections[connection.fileno()] = conn
+            self.selector.register(connection, selectors.EVENT_READ, conn)
+
+    def submit(self, conn, request, allow_keep_alive):
+        self.executor.submit(self.run_blocking, conn, request, allow_keep_alive)
+
+    def run_blocking(self, conn, request, allow_keep_alive):
+        # berjalan di thread pool; status keep-alive HttpServer disimpan per thread
+        try:
+            hasil = self.httpserver.proses(request, allow_keep_alive=allow_keep_alive)
+            keep_alive = self.httpserver.should_keep_alive()
+        except Exception as e:
+            hasil, keep_alive = e, False
+        self.completed.append((conn, request, hasil, keep_alive))
+        try:
+            os.write(self.wakeup_w, b"\0")
+        except BlockingIOError:
+            # pipe penuh: event loop pasti sudah akan bangun
+            pass
+
+    def drain_completed(self):
+        try:
+            while os.read(self.wakeup_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        while self.completed:
+            conn, request, hasil, keep_alive = self.completed.popleft()
+            try:
+                conn.on_complete(request, hasil, keep_alive)
+            except Exception as e:
+                print(f"Error processing request from {conn.address}: {e}")
+                conn.close()
+
+    def sweep_idle(self):
+        # menutup koneksi yang tidak ada aktivitas melebihi batas keep-alive
+        batas = time.monotonic() - KEEP_ALIVE_TIMEOUT
+        for conn in [c for c in self.connections.values() if c.last_active < batas and not c.waiting]:
+            conn.close()
+
+    def serve_forever(self):
+        self.selector.register(self.listen_socket, selectors.EVENT_READ, None)
+        self.selector.register(self.wakeup_r, selectors.EVENT_READ, self)
+        next_sweep = time.monotonic() + SWEEP_INTERVAL
+        while True:
+            for key, mask in self.selector.select(timeout=SWEEP_INTERVAL):
+                conn = key.data
+                if conn is None:
+                    self.accept()
+                    continue
+                if conn is self:
+                    self.drain_completed()
+                    continue
+                try:
+                    if mask & selectors.EVENT_READ:
+                        conn.on_readable()
+                    elif mask & selectors.EVENT_WRITE:
+                        conn.on_writable()
+                except Exception as e:
+                    print(f"Error processing request from {conn.address}: {e}")
+                    conn.close()
+            if time.monotonic() >= next_sweep:
+                self.sweep_idle()
+                next_sweep = time.monotonic() + SWEEP_INTERVAL
+
+
+def raise_fd_limit():
+    # ribuan koneksi bersamaan butuh fd lebih banyak dari batas default (1024)
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        except (ValueError, OSError):
+            pass
+
+
+def create_listen_socket(port, reuse_port=False):
+    my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    my_socket.bind(('0.0.0.0', port))
+    my_socket.listen(LISTEN_BACKLOG)
+    return my_socket
+
+
+def serve_process(port, reuse_port, max_connections, metrics=None, index=0, cache_max_bytes=CACHE_MAX_BYTES,
+                  max_upload_bytes=MAX_UPLOAD_BYTES):
+    if metrics is not None:
+        metrics.use_shard(index)
+    try:
+        SelectorServer(create_listen_socket(port, reuse_port), max_connections, metrics, cache_max_bytes,
+                       max_upload_bytes).serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def Server(port=PORT, processes=1, max_connections=MAX_CONNECTIONS, cache_max_bytes=CACHE_MAX_BYTES,
+           max_upload_bytes=MAX_UPLOAD_BYTES):
+    raise_fd_limit()
+    if processes <= 1:
+        print(f"Selector Server running on port {port}...")
+        serve_process(port, False, max_connections, cache_max_bytes=cache_max_bytes, max_upload_bytes=max_upload_bytes)
+        return
+
+    # N proses event loop, masing-masing dengan listening socket sendiri
+    # (SO_REUSEPORT) sehingga kernel yang membagi koneksi antar proses
+    ctx = multiprocessing.get_context('fork')
+    metrics = HttpMetrics(shards=processes)
+    workers = [ctx.Process(target=serve_process, args=(port, True, max_connections, metrics, i, cache_max_bytes, max_upload_bytes), daemon=True)
+               for i in range(processes)]
+    print(f"Selector Server running on port {port} with {processes} processes...")
+    try:
+        for worker in workers:
+            worker.start()
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Server HTTP event-driven berbasis selectors.")
+    parser.add_argument('--port', type=int, default=PORT,
+                        help=f"Port server. Default: {PORT}")
+    parser.add_argument('--processes', type=int, default=1,
+                        help="Jumlah proses event loop (SO_REUSEPORT). Default: 1")
+    parser.add_argument('--max_connections', type=int, default=MAX_CONNECTIONS,
+                        help=f"Batas koneksi terbuka per proses; sisanya dijawab 503. Default: {MAX_CONNECTIONS}")
+    parser.add_argument('--cache_mb', type=int, default=CACHE_MAX_BYTES // (1024 * 1024),
+                        help=f"Batas ukuran cache isi file (MB) per proses, 0 untuk mematikan. Default: {CACHE_MAX_BYTES // (1024 * 1024)}")
+    parser.add_argument('--max_upload_mb', type=int, default=MAX_UPLOAD_BYTES // (1024 * 1024),
+                        help=f"Batas ukuran upload biner (PUT / octet-stream) dalam MB. Default: {MAX_UPLOAD_BYTES // (1024 * 1024)}")
+    args = parser.parse_args()
+    Server(args.port, args.processes, args.max_connections, args.cache_mb * 1024 * 1024, args.max_upload_mb * 1024 * 1024)
@@ -1,67 +1,108 @@
 from socket import *
 import socket
 import sys
-from concurrent.futures import ThreadPoolExecutor
-from http import HttpServer
+import time
+import argparse
+from http import HttpServer, send_response, reject_busy, KEEP_ALIVE_TIMEOUT, KEEP_ALIVE_MAX_REQUESTS, CACHE_MAX_BYTES, MAX_UPLOAD_BYTES
+from http_parser import RequestReader, HttpParseError
+import tracing
+from admission import AdmissionControl
+from elastic_pool import ElasticPool, DEFAULT_IDLE_TIMEOUT
+
+# pool thread elastis: tumbuh sampai MAX_WORKERS saat ramai, menyusut ke MIN_WORKERS saat sepi
+MIN_WORKERS = 2
+MAX_WORKERS = 20
+# koneksi yang boleh menunggu thread bebas; kelebihannya dijawab 503
+MAX_QUEUE = 64
+# backlog kernel cukup besar agar lonjakan koneksi sampai ke accept (dan ke admission)
+LISTEN_BACKLOG = 128
+
+# satu instance dipakai bersama semua thread agar cache file-nya berguna
+httpserver = HttpServer()
 
 def ProcessTheClient(connection, address):
-    httpserver = HttpServer()
 
-    headers = b""
-    while not headers.endswith(b'\r\n\r\n'):
-        data = connection.recv(1)
-        if not data:
-            break
-        headers += data
-    
-    header_str = headers.decode('utf-8')
-    
-    content_length = 0
-    lines = header_str.split('\r\n')
-    for line in lines:
-        if line.lower().startswith('content-length:'):
-            content_length = int(line.split(':')[1].strip())
-            break
-            
-    body = b""
-    if content_length > 0:
-        body_read = 0
-        while body_read < content_length:
-            data = connection.recv(min(1024, content_length - body_read))
-            if not data:
+    reader = RequestReader(connection, max_body_bytes=httpserver.max_body_bytes)
+    requests_served = 0
+    try:
+        while requests_served < KEEP_ALIVE_MAX_REQUESTS:
+            # menunggu request berikutnya pada koneksi persistent
+            connection.settimeout(KEEP_ALIVE_TIMEOUT)
+            request = reader.read_head()
+            if request is None:
                 break
-            body += data
-            body_read += len(data)
+            mulai = time.perf_counter()
+            connection.settimeout(None)
+            trace = httpserver.start_trace(request, address)
+            if httpserver.is_stream_upload(request):
+                request.body_stream = reader.iter_body(request)
+            else:
+                with trace.phase('recv'):
+                    reader.read_body(request)
 
-    full_request = headers + body
-    try:
-        rcv = full_request.decode('utf-8')
-        hasil = httpserver.proses(rcv)
-        connection.sendall(hasil)
+            requests_served += 1
+            hasil = httpserver.proses(request, allow_keep_alive=requests_served < KEEP_ALIVE_MAX_REQUESTS)
+            with trace.phase('send'):
+                sent = send_response(connection, hasil)
+            httpserver.record(request, hasil, time.perf_counter() - mulai, sent)
+            if not httpserver.should_keep_alive():
+                break
+    except socket.timeout:
+        pass
+    except HttpParseError as e:
+        hasil = httpserver.parse_error_response(e)
+        httpserver.record(None, hasil, 0.0, send_response(connection, hasil))
     except Exception as e:
+        tracing.current().finish(error=True, message=str(e)[:200])
         print(f"Error processing request from {address}: {e}")
-
-    connection.close()
+    finally:
+        connection.close()
     return
 
-def Server():
+def Server(max_queue=MAX_QUEUE, min_workers=MIN_WORKERS, max_workers=MAX_WORKERS, idle_timeout=DEFAULT_IDLE_TIMEOUT):
     my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 
     port = 8885
     my_socket.bind(('0.0.0.0', port))
-    my_socket.listen(1)
+    my_socket.listen(LISTEN_BACKLOG)
     print(f"Thread Pool Server running on port {port}...")
 
-    with ThreadPoolExecutor(20) as executor:
+    admission = AdmissionControl(max_workers, max_queue)
+    with ElasticPool('thread', min_workers, max_workers, idle_timeout, name='http', log=print) as executor:
         while True:
             try:
                 connection, client_address = my_socket.accept()
+                if not admission.try_admit():
+                    httpserver.metrics.observe_rejected(reject_busy(connection))
+                    print(f"Connection from {client_address} rejected (503), total shed: {admission.shed}")
+                    continue
                 print(f"Connection from {client_address}")
-                executor.submit(ProcessTheClient, connection, client_address)
+                future = executor.submit(ProcessTheClient, connection, client_address)
+                future.add_done_callback(admission.release)
             except Exception as e:
                 print(f"Error accepting connections: {e}")
                 break
 
 if __name__ == "__main__":
-    Server()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Server HTTP dengan thread pool.")
+    parser.add_argument('--max_queue', type=int, default=MAX_QUEUE,
+                        help=f"Jumlah koneksi yang boleh menunggu thread; sisanya dijawab 503. Default: {MAX_QUEUE}")
+    parser.add_argument('--min_workers', type=int, default=MIN_WORKERS,
+                        help=f"Jumlah minimum thread yang selalu hidup. Default: {MIN_WORKERS}")
+    parser.add_argument('--max_workers', type=int, default=MAX_WORKERS,
+                        help=f"Jumlah maksimum thread saat beban tinggi. Default: {MAX_WORKERS}")
+    parser.add_argument('--idle_timeout', type=float, default=DEFAULT_IDLE_TIMEOUT,
+                        help=f"Cooldown (detik) sebelum thread yang menganggur dihentikan. Default: {DEFAULT_IDLE_TIMEOUT}")
+    parser.add_argument('--cache_mb', type=int, default=CACHE_MAX_BYTES // (1024 * 1024),
+                        help=f"Batas ukuran cache isi file (MB), 0 untuk mematikan. Default: {CACHE_MAX_BYTES // (1024 * 1024)}")
+    parser.add_argument('--max_upload_mb', type=int, default=MAX_UPLOAD_BYTES // (1024 * 1024),
+                        help=f"Batas ukuran upload biner (PUT / octet-stream) dalam MB. Default: {MAX_UPLOAD_BYTES // (1024 * 1024)}")
+    parser.add_argument('--trace', metavar='FILE', default=None,
+                        help="Tulis durasi fase (recv, parse, disk, encode, send) setiap request sebagai JSON lines ke FILE, ringkas dengan analyze_trace.py. Default: mati")
+    args = parser.parse_args()
+    httpserver.cache.set_max_bytes(args.cache_mb * 1024 * 1024)
+    httpserver.max_upload_bytes = args.max_upload_mb * 1024 * 1024
+    if args.trace:
+        tracing.enable(args.trace)
+    Server(args.max_queue, args.min_workers, args.max_workers, args.idle_timeout)
\ No newline at end of file
@@ -0,0 +1,58 @@
+import threading
+
+"""
+* SingleFlight menggabungkan pemanggilan bersamaan dengan key yang sama:
+thread pertama (leader) menjalankan fungsi, thread lain yang datang
+selama fungsi masih berjalan hanya menunggu lalu menerima objek hasil
+yang sama, sehingga GET bersamaan untuk file teks yang varian terkompresinya
+belum ada cukup mengompresi file sekali
+
+* penggabungan hanya berlaku di dalam satu proses (thread pool, atau
+masing-masing proses worker pada server process pool / selector)
+"""
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """
+        menjalankan fn() sekali untuk setiap key yang sedang berjalan.
+        Mengembalikan tuple (hasil, shared); shared True jika hasil
+        diperoleh dari pemanggilan milik thread lain
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self.calls[key] = call
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.event.set()
+        return call.result, False
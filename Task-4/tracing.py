@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import threading
+
+"""
+* tracing opsional per request HTTP: setiap fase (recv, parse, disk, encode,
+json, decode, send) diukur dengan jam monotonic (time.perf_counter) dan
+durasinya dijumlahkan per fase, lalu satu request ditulis sebagai satu
+baris JSON ke file trace (lihat analyze_trace.py untuk ringkasannya)
+
+* trace request yang sedang berjalan disimpan per thread, sehingga
+HttpServer cukup memanggil current().phase(...) tanpa mengubah signature
+http_get, http_post dan seterusnya
+
+* selama tracing tidak diaktifkan, start() dan current() mengembalikan
+NULL_TRACE yang tidak mencatat apa pun, sehingga biaya di jalur request
+hanya satu pemanggilan fungsi per fase
+
+* file dibuka dengan O_APPEND dan setiap baris ditulis dengan satu
+os.write, sehingga thread dan proses worker (yang mewarisi file ini lewat
+fork) bisa menulis ke file yang sama tanpa baris yang bercampur
+"""
+
+_fd = None
+_path = None
+_local = threading.local()
+
+
+def enable(path):
+    global _fd, _path
+    if _fd is not None and _path == path:
+        return
+    _fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    _path = path
+
+
+def enabled_path():
+    # path file trace, None jika tracing tidak aktif
+    return _path
+
+
+class Phase:
+    __slots__ = ('trace', 'name', 'start')
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Trace:
+    def __init__(self, **fields):
+        self.fields = fields
+        self.start = time.perf_counter()
+        self.wall = time.time()
+        self.phases = {}
+
+    def phase(self, name):
+        return Phase(self, name)
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def prepend(self, name, seconds):
+        # fase yang terjadi sebelum trace dimulai (misalnya recv request), awal trace dimundurkan
+        self.add(name, seconds)
+        self.start -= seconds
+        self.wall -= seconds
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def timed(self, iterable, name):
+        # menghasilkan isi iterable sambil mencatat waktu mengambil setiap item sebagai fase name
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(name, time.perf_counter() - start)
+                return
+            self.add(name, time.perf_counter() - start)
+            yield item
+
+    def finish(self, **fields):
+        self.fields.update(fields)
+        record = dict(ts=round(self.wall, 6), pid=os.getpid(), **self.fields,
+                      total=round(time.perf_counter() - self.start, 6),
+                      phases={name: round(seconds, 6) for name, seconds in self.phases.items()})
+        if getattr(_local, 'trace', None) is self:
+            _local.trace = None
+        try:
+            os.write(_fd, (json.dumps(record) + "\n").encode())
+        except OSError:
+            pass
+
+
+class NullTrace:
+    def phase(self, name):
+        return NULL_PHASE
+
+    def add(self, name, seconds):
+        pass
+
+    def prepend(self, name, seconds):
+        pass
+
+    def set(self, **fields):
+        pass
+
+    def timed(self, iterable, name):
+        return iterable
+
+    def finish(self, **fields):
+        pass
+
+
+class NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TRACE = NullTrace()
+NULL_PHASE = NullPhase()
+
+
+def start(**fields):
+    # memulai trace satu request di thread ini
+    if _fd is None:
+        return NULL_TRACE
+    trace = Trace(**fields)
+    _local.trace = trace
+    return trace
+
+
+def current():
+    return getattr(_local, 'trace', None) or NULL_TRACE